@@ -1,15 +1,36 @@
 import os
+import json
+import logging
+import hashlib
 import random
-from io import BytesIO
-from flask import Flask, request, jsonify, render_template, redirect, url_for, flash, g, session
-from werkzeug.security import generate_password_hash, check_password_hash
+import time
+import atexit
+from flask import Flask, request, jsonify, render_template, redirect, url_for, flash, g, session, send_from_directory, \
+    has_request_context, before_render_template, template_rendered
+from werkzeug.exceptions import RequestEntityTooLarge
 from math import ceil
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
+import click
 import pymysql
 import boto3
 from botocore.client import Config
 from urllib.parse import urlparse
 from dotenv import load_dotenv
+from db_pool import ConnectionPool, ReplicaSet
+from indices import GeoIndex, TextIndex, FacetIndex
+from cache import RedisCache, crear_cache
+from contacto import ContactoBuffer
+from fragmentos import FragmentCache
+from fotos import FotoPipeline, FotoDemasiadoGrande, foto_variante, VARIANTES
+from ratings import aplicar_calificacion, recalcular_agregados, validar_calificacion
+from servicios import cargar_catalogo, normalizar_servicios, registrar_en_catalogo
+from migrate import aplicar_migraciones, pendientes, verificar_planes
+from passwords import crear_hasher
+import bulk
+import sys
+import metricas
+import mimetypes
+from static_assets import StaticAssets
 load_dotenv()
 
 # --- CONFIGURACIÓN DE LA APLICACIÓN ---
@@ -17,25 +38,176 @@ app = Flask(__name__)
 app.config['SECRET_KEY'] = 'compunube'
 
 # --- CONFIGURACIÓN DE MYSQL ---
+def connect_db(host=None, port=None, **kwargs):
+    return pymysql.connect(
+        host=host or os.getenv("DB_HOST"),
+        user=os.getenv("DB_USER"),
+        password=os.getenv("DB_PASSWORD"),
+        database=os.getenv("DB_NAME" ),
+        port=int(port or os.getenv("DB_PORT")),
+        ssl={"ssl_mode": "REQUIRED"},
+        cursorclass=metricas.CursorInstrumentado,
+        **kwargs
+    )
+
+DB_POOL_CONFIG = dict(
+    min_size=int(os.getenv("DB_POOL_MIN", 0)),
+    max_size=int(os.getenv("DB_POOL_MAX", 10)),
+    idle_timeout=float(os.getenv("DB_POOL_IDLE_TIMEOUT", 300)),
+    max_lifetime=float(os.getenv("DB_POOL_MAX_LIFETIME", 3600)),
+    ping_on_borrow=os.getenv("DB_POOL_PING", "1").lower() in ("1", "true", "yes"),
+    timeout=float(os.getenv("DB_POOL_TIMEOUT", 10)),
+)
+
+# Pool de conexiones por worker: evita el handshake TCP+TLS+auth en cada request
+db_pool = ConnectionPool(connect_db, **DB_POOL_CONFIG)
+
+# --- RÉPLICAS DE LECTURA ---
+# DB_REPLICAS=host1:3306,host2:3306 (mismo usuario, contraseña y base que el primario).
+# Sin réplicas configuradas get_read_db() es lo mismo que get_db()
+def factory_replica(direccion):
+    host, _, port = direccion.strip().partition(':')
+    timeout = int(os.getenv("DB_REPLICA_CONNECT_TIMEOUT", 2))
+    return lambda: connect_db(host, port or None, connect_timeout=timeout)
+
+db_replicas = ReplicaSet(
+    [(direccion.strip(), factory_replica(direccion)) for direccion in os.getenv("DB_REPLICAS", "").split(',') if direccion.strip()],
+    intervalo_chequeo=float(os.getenv("DB_REPLICA_CHECK_INTERVAL", 5)),
+    reintento=float(os.getenv("DB_REPLICA_RETRY", 30)),
+    max_retraso=float(os.environ["DB_REPLICA_MAX_LAG"]) if os.getenv("DB_REPLICA_MAX_LAG") else None,
+    **DB_POOL_CONFIG
+)
+
+# Segundos que, después de escribir, las lecturas siguen yendo al primario: las del mismo usuario
+# (marca en la sesión) y, con CACHE_BACKEND=redis, las de todos (marca en Redis), para no guardar
+# en el cache compartido lo que todavía no llegó a las réplicas. Con el cache en memoria la marca
+# global no se usa: solo la vería el worker que escribió, y su cache no lo comparte nadie
+LECTURA_PROPIA_SEGUNDOS = float(os.getenv("DB_READ_YOUR_WRITES", 5))
+
 def get_db():
     if 'db' not in g:
-        g.db = pymysql.connect(
-            host=os.getenv("DB_HOST"),
-            user=os.getenv("DB_USER"),
-            password=os.getenv("DB_PASSWORD"),
-            database=os.getenv("DB_NAME" ),
-            port=int(os.getenv("DB_PORT")),
-            ssl={"ssl_mode": "REQUIRED"},
-            cursorclass=pymysql.cursors.DictCursor
-        )
-        print(g)
+        g.db = db_pool.acquire()
     return g.db
 
+def leer_del_primario():
+    if not len(db_replicas) or 'db' in g or not has_request_context():
+        return True
+    if request.method not in ('GET', 'HEAD'):
+        return True
+    ahora = time.time()
+    if session.get('primario_hasta', 0) > ahora:
+        return True
+    return MARCA_ESCRITURA_COMPARTIDA and (cache.get('db:escritura') or 0) > ahora
+
+def get_read_db():
+    """Conexión para consultas de solo lectura: una réplica si se puede, si no el primario."""
+    if 'db_lectura' not in g:
+        lectura = None if leer_del_primario() else db_replicas.acquire()
+        if lectura is None:
+            return get_db()
+        g.db_lectura = lectura
+    return g.db_lectura[1]
+
+@app.after_request
+def marcar_escritura(response):
+    # Un request que modifica datos usó el primario: lo que sigue lee del primario un rato
+    if len(db_replicas) and 'db' in g and request.method not in ('GET', 'HEAD'):
+        hasta = time.time() + LECTURA_PROPIA_SEGUNDOS
+        session['primario_hasta'] = hasta
+        if MARCA_ESCRITURA_COMPARTIDA:
+            cache.set('db:escritura', hasta, ttl=LECTURA_PROPIA_SEGUNDOS)
+    return response
+
 @app.teardown_appcontext
 def close_db(exception):
     db = g.pop('db', None)
     if db is not None:
-        db.close()
+        # Si el request falló a mitad de camino no confiamos en el estado de la conexión
+        db_pool.release(db, discard=isinstance(exception, pymysql.err.OperationalError))
+    lectura = g.pop('db_lectura', None)
+    if lectura is not None:
+        pool, conn = lectura
+        pool.release(conn, discard=isinstance(exception, pymysql.err.OperationalError))
+
+# --- INSTRUMENTACIÓN POR REQUEST ---
+# Una línea JSON por request en el logger `petcare.requests` (LOG_LEVEL=WARNING deja solo los lentos)
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), format="%(asctime)s %(levelname)s %(name)s %(message)s")
+SERVER_TIMING = os.getenv("SERVER_TIMING", "1").lower() in ("1", "true", "yes")
+REQUEST_LENTO_MS = float(os.getenv("REQUEST_LENTO_MS", 500))
+
+@app.before_request
+def iniciar_medicion():
+    metricas.iniciar_medicion()
+
+@app.after_request
+def registrar_medicion(response):
+    medicion = metricas.terminar_medicion()
+    if medicion is None:
+        return response
+    total_ms = medicion.total_ms
+    endpoint = request.endpoint or 'sin_endpoint'
+    metricas.metricas.registrar_request(endpoint, response.status_code, medicion, total_ms)
+    metricas.log_request(endpoint, request.method, request.path, response.status_code, medicion, total_ms,
+                         REQUEST_LENTO_MS)
+    if SERVER_TIMING:
+        response.headers['Server-Timing'] = metricas.server_timing(medicion, total_ms)
+    return response
+
+# Tiempo de CPU de cada render_template del request (las páginas son de una sola plantilla raíz)
+def empezar_render(sender, **extra):
+    medicion = metricas.medicion_actual()
+    if medicion is not None:
+        medicion.empezar_render()
+
+def terminar_render(sender, **extra):
+    medicion = metricas.medicion_actual()
+    if medicion is not None:
+        medicion.terminar_render()
+
+before_render_template.connect(empezar_render, app)
+template_rendered.connect(terminar_render, app)
+
+# --- CACHE DE LECTURAS ---
+cache = crear_cache()
+# La marca de "hubo una escritura" para todos los workers solo sirve si el cache es compartido
+MARCA_ESCRITURA_COMPARTIDA = isinstance(cache, RedisCache)
+
+def clave_listado(*partes):
+    # La generación cambia con cada escritura de cuidadores e invalida todas las páginas del listado
+    generacion = cache.get_counter('cuidadores:gen')
+    digest = hashlib.sha1(json.dumps(partes, sort_keys=True).encode()).hexdigest()
+    return f"listado:{generacion}:{digest}"
+
+def invalidar_listado():
+    cache.incr('cuidadores:gen')
+
+def clave_reseñas(cuidador_id):
+    return f"reseñas:{int(cuidador_id)}"
+
+def invalidar_reseñas(*cuidador_ids):
+    cache.delete(*(clave_reseñas(cuidador_id) for cuidador_id in cuidador_ids))
+
+# --- GET CONDICIONAL ---
+# El ETag se calcula una vez, al llenar el cache, a partir del contenido: es el mismo en
+# todos los workers y cambia exactamente cuando cambian los datos
+def etag_de(valor):
+    return hashlib.sha1(json.dumps(valor, sort_keys=True, default=str).encode()).hexdigest()[:20]
+
+def no_modificado(etag, privado=False):
+    """Respuesta 304 si el cliente ya tiene la versión `etag`; None si hay que mandar el cuerpo."""
+    if not request.if_none_match.contains(etag):
+        return None
+    return con_etag(app.response_class(status=304), etag, privado)
+
+def con_etag(response, etag, privado=False):
+    # no-cache: el navegador guarda la respuesta pero revalida siempre (barato gracias al 304)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = f"{'private' if privado else 'public'}, no-cache"
+    return response
+
+def cuidadores_reseñados_por(cursor, cliente_id):
+    cursor.execute("SELECT DISTINCT cuidador_id FROM reseñas WHERE cliente_id = %s", (cliente_id,))
+    return [row['cuidador_id'] for row in cursor.fetchall()]
 
 # --- CONFIGURACIÓN DE DIGITALOCEAN SPACES ---
 SPACE_NAME = os.getenv("SPACE_NAME")
@@ -43,17 +215,116 @@ SPACE_REGION = os.getenv("SPACE_REGION")
 ACCESS_KEY = os.getenv("SPACE_ACCESS_KEY")
 SECRET_KEY = os.getenv("SPACE_SECRET_KEY")
 
+# Permiten apuntar a un S3 local (MinIO, moto) en desarrollo y pruebas
+SPACE_ENDPOINT_URL = os.getenv("SPACE_ENDPOINT_URL", f'https://{SPACE_REGION}.digitaloceanspaces.com')
+SPACE_PUBLIC_URL = os.getenv("SPACE_PUBLIC_URL", f"https://{SPACE_NAME}.{SPACE_REGION}.digitaloceanspaces.com")
+FOTOS_WORKERS = int(os.getenv("FOTOS_WORKERS", 2))
+FOTO_MAX_BYTES = int(os.getenv("FOTO_MAX_MB", 10)) * 1024 * 1024
+FOTO_CHUNK_BYTES = int(os.getenv("FOTO_CHUNK_MB", 8)) * 1024 * 1024
+FOTO_MULTIPART_THRESHOLD = int(os.getenv("FOTO_MULTIPART_THRESHOLD_MB", 8)) * 1024 * 1024
+
+# Rechaza el request por Content-Length antes de leer el cuerpo (y corta la lectura si viene sin él)
+app.config['MAX_CONTENT_LENGTH'] = FOTO_MAX_BYTES + 1024 * 1024
+
 def get_space_client():
-    return boto3.client(
+    return metricas.instrumentar_boto3(boto3.client(
         's3',
         region_name=SPACE_REGION,
-        endpoint_url=f'https://{SPACE_REGION}.digitaloceanspaces.com', 
+        endpoint_url=SPACE_ENDPOINT_URL,
         aws_access_key_id=ACCESS_KEY,
-        aws_secret_access_key=SECRET_KEY
-    )
+        aws_secret_access_key=SECRET_KEY,
+        config=Config(max_pool_connections=max(10, FOTOS_WORKERS * 2), retries={'max_attempts': 3})
+    ))
+
+FOTO_CACHE_TTL = float(os.getenv("FOTO_CACHE_TTL", 3600))
+FOTO_REDIRECT_MAX_AGE = int(os.getenv("FOTO_REDIRECT_MAX_AGE", 300))
+PLACEHOLDER_FOTO = 'assets/img/placeholder.svg'
+
+def foto_actualizada(usuario_id, url):
+    recordar_fotos({usuario_id: url})
+    invalidar_listado()
+
+# Las fotos se redimensionan y suben en segundo plano con un único cliente S3 por worker
+fotos = FotoPipeline(get_space_client, db_pool, SPACE_NAME, SPACE_PUBLIC_URL,
+                     max_workers=FOTOS_WORKERS, al_terminar=foto_actualizada,
+                     max_bytes=FOTO_MAX_BYTES, chunk_size=FOTO_CHUNK_BYTES,
+                     multipart_threshold=FOTO_MULTIPART_THRESHOLD)
+app.add_template_filter(foto_variante)
+
+# --- URLS DE FOTOS ---
+# Mapa id -> URL de la foto `full` en el cache ('' = sin foto, también se cachea).
+# Los listados ya traen c.foto y lo cargan en el mapa, así /api/foto no consulta la base.
+def clave_foto(usuario_id):
+    return f"foto:{int(usuario_id)}"
+
+def recordar_fotos(urls):
+    cache.set_many({clave_foto(id): url or '' for id, url in urls.items()}, ttl=FOTO_CACHE_TTL)
+
+def invalidar_fotos(*usuario_ids):
+    cache.delete(*(clave_foto(id) for id in usuario_ids))
+
+def urls_de_fotos(usuario_ids):
+    """{id: url o None} de todos los ids, con una sola consulta para los que no están en el cache."""
+    usuario_ids = list(dict.fromkeys(int(id) for id in usuario_ids))
+    cacheadas = cache.get_many(clave_foto(id) for id in usuario_ids)
+    urls = {id: cacheadas[clave_foto(id)] for id in usuario_ids if clave_foto(id) in cacheadas}
+    faltan = [id for id in usuario_ids if id not in urls]
+    if faltan:
+        cursor = get_read_db().cursor()
+        cursor.execute(f"SELECT usuario_id, foto FROM cuidadores WHERE usuario_id IN ({', '.join(['%s'] * len(faltan))})",
+                       faltan)
+        leidas = {id: '' for id in faltan}
+        leidas.update((row['usuario_id'], row['foto'] or '') for row in cursor.fetchall())
+        recordar_fotos(leidas)
+        urls.update(leidas)
+    return {id: url or None for id, url in urls.items()}
+
+@app.errorhandler(RequestEntityTooLarge)
+def request_demasiado_grande(e):
+    flash(f'El archivo supera el máximo de {FOTO_MAX_BYTES // (1024 * 1024)} MB.', 'danger')
+    return redirect(request.referrer or url_for('index'))
+
+# --- CONTRASEÑAS ---
+# Hashing con parámetros configurables, en un pool de procesos acotado
+hasher = crear_hasher()
+
+# --- ARCHIVOS ESTÁTICOS ---
+# url_for('static', ...) agrega ?v=<hash del contenido>; con esa versión el archivo se
+# cachea un año sin revalidar, y si cambia el contenido cambia la URL
+STATIC_MAX_AGE = 365 * 24 * 3600
+assets = StaticAssets(app.static_folder)
+
+@app.url_defaults
+def versionar_estaticos(endpoint, values):
+    if endpoint == 'static' and 'filename' in values and 'v' not in values:
+        version = assets.version(values['filename'])
+        if version:
+            values['v'] = version
+
+def servir_estatico(filename):
+    """Reemplaza a la vista `static` de Flask: sirve la variante .br/.gz si existe y el cliente la acepta."""
+    filename = assets.normalizar(filename)
+    variante = assets.variante_comprimida(filename, request.headers.get('Accept-Encoding'))
+    if variante:
+        archivo, codificacion = variante
+        response = send_from_directory(app.static_folder, archivo,
+                                       mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+        response.headers['Content-Encoding'] = codificacion
+    else:
+        response = send_from_directory(app.static_folder, filename)
+    response.vary.add('Accept-Encoding')
+    if request.args.get('v') and request.args.get('v') == assets.version(filename):
+        response.headers['Cache-Control'] = f'public, max-age={STATIC_MAX_AGE}, immutable'
+    return response
+
+app.view_functions['static'] = servir_estatico
 
 # --- FLASK-LOGIN CONFIG ---
 class User(UserMixin):
+    # Solo los campos que usan las vistas: el hash de la contraseña nunca queda en la sesión ni en el cache
+    CAMPOS = ('id', 'email', 'nombre', 'tipo_usuario')
+    __slots__ = CAMPOS
+
     def __init__(self, user_data):
         self.id = user_data['id']
         self.email = user_data['email']
@@ -63,6 +334,11 @@ class User(UserMixin):
     def get_id(self):
         return str(self.id)
 
+    def to_dict(self):
+        return {campo: getattr(self, campo) for campo in self.CAMPOS}
+
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", 30))
+
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
@@ -71,59 +347,159 @@ login_manager.login_message_category = "warning"
 
 @login_manager.user_loader
 def load_user(user_id):
-    db = get_db()
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM usuarios WHERE id = %s", (user_id,))
-    user_data = cursor.fetchone()
+    try:
+        user_id = int(user_id)
+    except (TypeError, ValueError):
+        return None
+
+    # Se ejecuta en cada request autenticado: el usuario se cachea unos segundos
+    def consultar():
+        cursor = get_read_db().cursor()
+        cursor.execute("SELECT id, email, nombre, tipo_usuario FROM usuarios WHERE id = %s", (user_id,))
+        user_data = cursor.fetchone()
+        return User(user_data).to_dict() if user_data else None
+
+    user_data = cache.get_or_set(f"usuario:{user_id}", consultar, ttl=USER_CACHE_TTL)
     if user_data:
         return User(user_data)
     return None
 
+def invalidar_usuario(*user_ids):
+    cache.delete(*(f"usuario:{int(user_id)}" for user_id in user_ids))
+
 # --- VARIABLES GLOBALES ---
-PER_PAGE = 5
+PER_PAGE = int(os.getenv("ADMIN_PER_PAGE", 20))
+ADMIN_MAX_PER_PAGE = 100
+ADMIN_COUNT_TTL = float(os.getenv("ADMIN_COUNT_TTL", 300))
+BUSCAR_USUARIOS_LIMIT = 20
+NEAR_MAX_RADIUS_KM = float(os.getenv("NEAR_MAX_RADIUS_KM", 100))
+NEAR_MAX_LIMIT = int(os.getenv("NEAR_MAX_LIMIT", 100))
+DASHBOARD_PAGE_SIZE = int(os.getenv("DASHBOARD_PAGE_SIZE", 24))
+DASHBOARD_MAX_PAGE_SIZE = 100
 
 class Pagination:
-    def __init__(self, page, per_page, total, items):
+    """
+    Página obtenida por cursor: `prev_cursor`/`next_cursor` son los ids de la primera y la
+    última fila. `total` viene de un conteo cacheado y `page` solo se usa para mostrar.
+    """
+    def __init__(self, page, per_page, total, items, has_prev=False, has_next=False):
         self.page = page
         self.per_page = per_page
         self.total = total
         self.items = items
+        self.has_prev = has_prev
+        self.has_next = has_next
 
     @property
-    def pages(self): return int(ceil(self.total / self.per_page))
+    def pages(self): return max(1, int(ceil(self.total / self.per_page)))
 
     @property
-    def has_prev(self): return self.page > 1
+    def prev_num(self): return max(1, self.page - 1)
 
     @property
-    def has_next(self): return self.page < self.pages
+    def next_num(self): return self.page + 1
 
     @property
-    def prev_num(self): return self.page - 1
+    def prev_cursor(self): return self.items[0]['id'] if self.items else None
 
     @property
-    def next_num(self): return self.page + 1
+    def next_cursor(self): return self.items[-1]['id'] if self.items else None
+
+# --- ÍNDICE GEOGRÁFICO DE CUIDADORES ---
+def cargar_coordenadas():
+    cursor = get_read_db().cursor()
+    cursor.execute("SELECT usuario_id AS id, lat, lng FROM cuidadores WHERE lat IS NOT NULL AND lng IS NOT NULL")
+    return cursor.fetchall()
+
+geo_index = GeoIndex(cargar_coordenadas,
+                     ttl=float(os.getenv("GEO_INDEX_TTL", 300)),
+                     celda=float(os.getenv("GEO_INDEX_CELDA", 0.05)),
+                     celda_px=int(os.getenv("GEO_CLUSTER_PX", 64)))
+# Si un pedido de clusters devuelve más grupos que esto, se responde con el zoom anterior
+CLUSTERS_MAX = int(os.getenv("CLUSTERS_MAX", 500))
+
+# --- ÍNDICE DE TEXTO DE CUIDADORES ---
+# Búsqueda por nombre, descripción, ubicación y servicios, sin tildes y ordenada por relevancia
+BUSQUEDA_MAX_RESULTADOS = int(os.getenv("BUSQUEDA_MAX_RESULTADOS", 1000))
+
+def cargar_textos():
+    cursor = get_read_db().cursor()
+    cursor.execute("""
+        SELECT u.id, u.nombre, c.descripcion, c.ubicacion, GROUP_CONCAT(s.servicio SEPARATOR '|') AS servicios
+        FROM usuarios u
+        JOIN cuidadores c ON u.id = c.usuario_id
+        LEFT JOIN servicios_cuidadores s ON u.id = s.cuidador_id
+        GROUP BY u.id
+    """)
+    return cursor.fetchall()
 
-    def iter_pages(self, left_edge=1, right_edge=1, left_current=1, right_current=2):
-        last = 0
-        for num in range(1, self.pages + 1):
-            if num <= left_edge or (self.page - left_current - 1 < num < self.page + right_current) or num > self.pages - right_edge:
-                if last + 1 != num: yield None
-                yield num
-                last = num
+texto_index = TextIndex(cargar_textos, ttl=float(os.getenv("TEXT_INDEX_TTL", 300)))
 
-# --- INICIALIZAR TABLAS EN MYSQL ---
-def init_db():
-    db = get_db()
-    with app.open_resource('schema.sql', mode='r') as f:
-        schema_sql = f.read()
-    for statement in schema_sql.split(";"):
-        if statement.strip():
-            try:
-                db.cursor().execute(statement)
-            except Exception as e:
-                print(f"⚠️ Error al ejecutar: {statement[:50]}... -> {e}")
-    db.commit()
+# --- FACETAS DE SERVICIOS ---
+# Bitsets servicio -> cuidadores para filtrar por servicios y contar facetas sin ir a la base
+SERVICIOS_CATALOGO_TTL = 300
+
+def cargar_servicios_cuidadores():
+    cursor = get_read_db().cursor()
+    cursor.execute("""
+        SELECT c.usuario_id AS id, GROUP_CONCAT(s.servicio SEPARATOR '|') AS servicios
+        FROM cuidadores c
+        LEFT JOIN servicios_cuidadores s ON c.usuario_id = s.cuidador_id
+        GROUP BY c.usuario_id
+    """)
+    return cursor.fetchall()
+
+facetas_index = FacetIndex(cargar_servicios_cuidadores, ttl=float(os.getenv("FACET_INDEX_TTL", 300)))
+
+def catalogo_servicios():
+    """Servicios que se ofrecen en formularios y filtros, en orden."""
+    return cache.get_or_set("servicios:catalogo", lambda: cargar_catalogo(get_read_db().cursor()),
+                            ttl=SERVICIOS_CATALOGO_TTL)
+
+@app.context_processor
+def inyectar_catalogo_servicios():
+    return {'catalogo_servicios': catalogo_servicios}
+
+def facetas_servicios(texto='', servicios=()):
+    """(total, [{servicio, total}]) del filtro actual: cuántos cuidadores quedan al sumar cada servicio del catálogo."""
+    facetas_index.asegurar()
+    base = None
+    if texto:
+        texto_index.asegurar()
+        base = FacetIndex.bitset(texto_index.buscar(texto, BUSQUEDA_MAX_RESULTADOS))
+    nombres = catalogo_servicios()
+    total, conteos = facetas_index.facetas(nombres, servicios, base)
+    return total, [{"servicio": nombre, "total": conteos[nombre]} for nombre in nombres]
+
+def guardar_servicios(cursor, cuidador_id, servicios):
+    """Inserta los servicios del cuidador (agregando al catálogo los nuevos) y devuelve los guardados."""
+    servicios = registrar_en_catalogo(cursor, servicios)
+    if servicios:
+        # PyMySQL convierte executemany de un INSERT ... VALUES en un único INSERT multi-fila
+        cursor.executemany("INSERT INTO servicios_cuidadores (cuidador_id, servicio) VALUES (%s, %s)",
+                           [(cuidador_id, servicio) for servicio in servicios])
+    return servicios
+
+def formatear_cuidador(row):
+    cuidador_dict = dict(row)
+    servicios_str = row['servicios'] if row['servicios'] else ''
+    cuidador_dict['servicios'] = servicios_str.split(',') if servicios_str else []
+    return cuidador_dict
+
+# --- FRAGMENTOS RENDERIZADOS ---
+# Tarjetas del dashboard y filas del panel (macros de _fragmentos.html): cada una se renderiza
+# una vez por versión de su fila y por worker. Ver fragmentos.py
+fragmentos = FragmentCache(max_items=int(os.getenv("FRAGMENTOS_MAX", 5000)))
+
+def fragmento(macro, fila):
+    """HTML de `fila` con la macro `macro` de _fragmentos.html, reutilizado mientras la fila no cambie."""
+    renderizar = getattr(app.jinja_env.get_template('_fragmentos.html').module, macro)
+    # Con recarga de plantillas (modo debug) se renderiza siempre, para ver los cambios al momento
+    if app.jinja_env.auto_reload:
+        return renderizar(fila)
+    return fragmentos.obtener(macro, fila, renderizar)
+
+app.add_template_global(fragmento)
 
 # --- RUTAS PÚBLICAS Y DE AUTENTICACIÓN ---
 @app.route('/')
@@ -144,7 +520,24 @@ def login():
         cursor.execute("SELECT * FROM usuarios WHERE email = %s", (email,))
         user_data = cursor.fetchone()
 
-        if user_data and check_password_hash(user_data['password'], password):
+        try:
+            valida = bool(user_data) and hasher.verificar(user_data['password'], password)
+        except TimeoutError:
+            # El pool de hashing está saturado: mejor un reintento que un 500
+            flash('Hay muchos inicios de sesión en este momento. Intentá de nuevo en unos segundos.', 'warning')
+            return render_template('login.html'), 503
+
+        if valida:
+            # Si cambiaron los parámetros de hashing, se aprovecha que tenemos la contraseña en claro
+            if hasher.necesita_rehash(user_data['password']):
+                try:
+                    cursor.execute("UPDATE usuarios SET password = %s WHERE id = %s AND password = %s",
+                                   (hasher.hashear(password), user_data['id'], user_data['password']))
+                    db.commit()
+                    hasher.registrar_rehash()
+                except Exception as e:
+                    db.rollback()
+                    app.logger.warning("No se pudo actualizar el hash del usuario %s: %s", user_data['id'], e)
             user_obj = User(user_data)
             login_user(user_obj)
             if current_user.tipo_usuario == 'admin': # Asumiendo que tu User object tiene 'tipo_usuario'
@@ -190,44 +583,64 @@ def register():
             flash('El correo electrónico ya está registrado.', 'danger')
             return redirect(url_for('register'))
 
-        hashed_password = generate_password_hash(password, method='pbkdf2:sha256')
-        cursor.execute("INSERT INTO usuarios (nombre, email, password, tipo_usuario) VALUES (%s, %s, %s, %s)",
-                       (nombre, email, hashed_password, tipo_usuario))
-        usuario_id = cursor.lastrowid
-        db.commit()
-
-        if tipo_usuario == 'cuidador':
-            descripcion = request.form.get('descripcion', '').strip()
-            localidad = request.form.get('localidad', '').strip()
-            partido = request.form.get('partido', '').strip()
-            lat = request.form.get('lat')
-            lng = request.form.get('lng')
-            foto = request.files.get('foto')
-            ubicacion = f"{localidad}, {partido}".strip()
-
+        ruta_foto = None
+        foto = request.files.get('foto')
+        if tipo_usuario == 'cuidador' and foto and foto.filename:
             try:
-                lat = float(lat) if lat else None
-                lng = float(lng) if lng else None
-            except ValueError:
-                lat = None
-                lng = None
-
-            image_url = None
-            if foto and foto.filename:
-                s3 = get_space_client()
-                filename = f"cuidadores/{usuario_id}_{foto.filename}"
-                s3.upload_fileobj(BytesIO(foto.read()), SPACE_NAME, filename, ExtraArgs={'ACL': 'public-read'})
-                image_url = f"https://{SPACE_NAME}.{SPACE_REGION}.digitaloceanspaces.com/{filename}" 
-
-            cursor.execute('''INSERT INTO cuidadores (usuario_id, descripcion, ubicacion, lat, lng, rating, foto)
-                              VALUES (%s, %s, %s, %s, %s, %s, %s)''',
-                          (usuario_id, descripcion, ubicacion, lat, lng, float(request.form.get('rating') or 0), image_url))
-            db.commit()
+                ruta_foto = fotos.guardar_temporal(foto)
+            except FotoDemasiadoGrande as e:
+                flash(str(e), 'danger')
+                return redirect(url_for('register'))
 
-            servicios = request.form.getlist('servicios')
-            for servicio in servicios:
-                cursor.execute("INSERT INTO servicios_cuidadores (cuidador_id, servicio) VALUES (%s, %s)", (usuario_id, servicio))
+        try:
+            hashed_password = hasher.hashear(password)
+        except TimeoutError:
+            fotos.descartar(ruta_foto)
+            flash('Hay muchos registros en este momento. Intentá de nuevo en unos segundos.', 'warning')
+            return render_template('register.html'), 503
+        # Usuario, cuidador y servicios en una sola transacción: o se crea todo o nada
+        try:
+            cursor.execute("INSERT INTO usuarios (nombre, email, password, tipo_usuario) VALUES (%s, %s, %s, %s)",
+                           (nombre, email, hashed_password, tipo_usuario))
+            usuario_id = cursor.lastrowid
+
+            if tipo_usuario == 'cuidador':
+                descripcion = request.form.get('descripcion', '').strip()
+                localidad = request.form.get('localidad', '').strip()
+                partido = request.form.get('partido', '').strip()
+                lat = request.form.get('lat')
+                lng = request.form.get('lng')
+                ubicacion = f"{localidad}, {partido}".strip()
+
+                try:
+                    lat = float(lat) if lat else None
+                    lng = float(lng) if lng else None
+                except ValueError:
+                    lat = None
+                    lng = None
+
+                cursor.execute('''INSERT INTO cuidadores (usuario_id, descripcion, ubicacion, lat, lng)
+                                  VALUES (%s, %s, %s, %s, %s)''',
+                              (usuario_id, descripcion, ubicacion, lat, lng))
+                servicios = guardar_servicios(cursor, usuario_id, request.form.getlist('servicios'))
             db.commit()
+        except Exception as e:
+            db.rollback()
+            fotos.descartar(ruta_foto)
+            flash(f'Ocurrió un error al registrarte: {e}', 'danger')
+            return redirect(url_for('register'))
+
+        invalidar_totales_admin('cu' if tipo_usuario == 'cuidador' else 'cl')
+        if tipo_usuario == 'cuidador':
+            geo_index.upsert(usuario_id, lat, lng)
+            texto_index.upsert(usuario_id, nombre=nombre, descripcion=descripcion, ubicacion=ubicacion,
+                               servicios=servicios)
+            facetas_index.upsert(usuario_id, servicios)
+            invalidar_listado()
+
+            # La foto se procesa en segundo plano y actualiza cuidadores.foto al terminar
+            if ruta_foto:
+                fotos.encolar(usuario_id, ruta_foto)
 
         flash('¡Registro completado! Ahora puedes iniciar sesión.', 'success')
         return redirect(url_for('login'))
@@ -243,47 +656,345 @@ def logout():
     return redirect(url_for('index'))
 
 # --- DASHBOARD ---
-@app.route('/dashboard')
-@login_required
-def dashboard():
-    db = get_db()
-    cursor = db.cursor()
-    cursor.execute("""
-        SELECT u.id, u.nombre, c.descripcion, c.ubicacion, c.lat, c.lng, c.rating, c.foto,
+def escapar_like(texto):
+    return texto.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def sql_listado_cuidadores(after=None, limite=DASHBOARD_PAGE_SIZE):
+    """Consulta (sql, params) de una página del listado sin filtros; trae `limite + 1` filas para saber si hay más."""
+    condiciones = ["u.tipo_usuario = 'cuidador'"]
+    params = []
+    if after is not None:
+        condiciones.append("u.id > %s")
+        params.append(after)
+
+    sql = f"""
+        SELECT u.id, u.nombre, c.descripcion, c.ubicacion, c.lat, c.lng, c.rating, c.reseñas_total, c.foto,
                GROUP_CONCAT(s.servicio) AS servicios
         FROM usuarios u
         JOIN cuidadores c ON u.id = c.usuario_id
         LEFT JOIN servicios_cuidadores s ON u.id = s.cuidador_id
-        WHERE u.tipo_usuario = 'cuidador'
+        WHERE {' AND '.join(condiciones)}
         GROUP BY u.id
-    """)
-    rows = cursor.fetchall()
+        ORDER BY u.id
+        LIMIT %s
+    """
+    return sql, params + [limite + 1]
+
+def sql_cuidadores_por_id(ids):
+    return f"""
+        SELECT u.id, u.nombre, c.descripcion, c.ubicacion, c.lat, c.lng, c.rating, c.reseñas_total, c.foto,
+               GROUP_CONCAT(s.servicio) AS servicios
+        FROM usuarios u
+        JOIN cuidadores c ON u.id = c.usuario_id
+        LEFT JOIN servicios_cuidadores s ON u.id = s.cuidador_id
+        WHERE u.id IN ({', '.join(['%s'] * len(ids))})
+        GROUP BY u.id
+    """, list(ids)
+
+def cuidadores_por_id(cursor, ids):
+    """{id: cuidador} de los ids pedidos, en una sola consulta por clave primaria."""
+    if not ids:
+        return {}
+    cursor.execute(*sql_cuidadores_por_id(ids))
+    return {row['id']: formatear_cuidador(row) for row in cursor.fetchall()}
+
+def buscar_cuidadores(texto='', servicios=(), after=None, limite=DASHBOARD_PAGE_SIZE):
+    """
+    Una página del listado de cuidadores. Sin texto, paginada por cursor (id ascendente) y
+    filtrada por servicios con el índice de facetas; con texto, ordenada por relevancia según
+    el índice de texto y `after` es la posición en el ranking. Devuelve (cuidadores, next_cursor, etag); next_cursor es None en la última página.
+    """
+    servicios = sorted(set(servicios))
+
+    def consultar():
+        cursor = get_read_db().cursor()
+        pagina = ids_de_pagina(texto, servicios, after, limite)
+        if pagina is None:
+            cursor.execute(*sql_listado_cuidadores(after, limite))
+            return armar_pagina_sql(cursor.fetchall(), limite)
+        ids, next_cursor = pagina
+        return armar_pagina(ids, cuidadores_por_id(cursor, ids), next_cursor)
+
+    cuidadores, next_cursor, etag = cache.get_or_set(clave_listado(texto, servicios, after, limite), consultar)
+    return cuidadores, next_cursor, etag
+
+# Piezas de buscar_cuidadores sin acceso a la base, compartidas con el modo ASGI (asgi.py)
+def ids_de_pagina(texto, servicios, after, limite):
+    """
+    Con texto o servicios la página sale de los índices en memoria: devuelve (ids, next_cursor)
+    y falta leer las filas por id. Sin filtros devuelve None: la página es sql_listado_cuidadores.
+    """
+    if texto:
+        inicio = after or 0
+        texto_index.asegurar()
+        ids = texto_index.buscar(texto, min(inicio + limite + 1, BUSQUEDA_MAX_RESULTADOS), servicios)
+        return ids[inicio:inicio + limite], (inicio + limite if len(ids) > inicio + limite else None)
+    if servicios:
+        # Solo cuidadores que ofrecen TODOS los servicios seleccionados
+        facetas_index.asegurar()
+        ids = facetas_index.ids(servicios, after, limite + 1)
+        return ids[:limite], (ids[limite - 1] if len(ids) > limite else None)
+    return None
+
+def armar_pagina(ids, por_id, next_cursor):
+    cuidadores = [por_id[id] for id in ids if id in por_id]
+    recordar_fotos({c['id']: c['foto'] for c in cuidadores})
+    return [cuidadores, next_cursor, etag_de([cuidadores, next_cursor])]
 
-    cuidadores = []
-    for row in rows:
-        cuidador_dict = dict(row)
-        servicios_str = row['servicios'] if row['servicios'] else ''
-        cuidador_dict['servicios'] = servicios_str.split(',') if servicios_str else []
-        cuidador_dict['foto'] = row['foto']
-        cuidadores.append(cuidador_dict)
+def armar_pagina_sql(rows, limite):
+    cuidadores = [formatear_cuidador(row) for row in rows[:limite]]
+    next_cursor = cuidadores[-1]['id'] if len(rows) > limite else None
+    return armar_pagina([c['id'] for c in cuidadores], {c['id']: c for c in cuidadores}, next_cursor)
 
-    return render_template('dashboard.html', cuidadores=cuidadores)
+@app.route('/dashboard')
+@login_required
+def dashboard():
+    # Solo la primera página; el resto se pide a /api/cuidadores a medida que se hace scroll
+    cuidadores, next_cursor, _ = buscar_cuidadores()
+    total, facetas = facetas_servicios()
+    return render_template('dashboard.html', cuidadores=cuidadores, next_cursor=next_cursor,
+                           total_cuidadores=total, facetas=facetas)
+
+@app.route('/api/cuidadores/facetas')
+@login_required
+def api_facetas():
+    """
+    Conteos del filtro actual (`q`, `servicios` repetible): `total` cuidadores lo cumplen y,
+    por cada servicio del catálogo, cuántos de ellos también lo ofrecen.
+    """
+    total, facetas = facetas_servicios(texto=request.args.get('q', '').strip(),
+                                       servicios=normalizar_servicios(request.args.getlist('servicios')))
+    return jsonify({"status": "success", "total": total, "data": facetas})
+
+@app.route('/api/cuidadores')
+@login_required
+def api_cuidadores():
+    """
+    Búsqueda paginada de cuidadores: texto (`q`, ordena por relevancia), servicios requeridos
+    (`servicios`, repetible) y cursor (`after`, el `next_cursor` de la página anterior).
+    Con `html=1` incluye las tarjetas ya renderizadas para el dashboard.
+    """
+    try:
+        after = request.args.get('after', type=int)
+        limite = min(int(request.args.get('limit', DASHBOARD_PAGE_SIZE)), DASHBOARD_MAX_PAGE_SIZE)
+    except ValueError:
+        return jsonify({"status": "error", "message": "Parámetros de paginación inválidos."}), 400
+
+    cuidadores, next_cursor, etag = buscar_cuidadores(
+        texto=request.args.get('q', '').strip(),
+        servicios=normalizar_servicios(request.args.getlist('servicios')),
+        after=after,
+        limite=max(limite, 1),
+    )
+    # La variante con HTML es otro cuerpo: otro ETag
+    html = bool(request.args.get('html'))
+    etag = f"{etag}-html" if html else etag
+    no_cambio = no_modificado(etag, privado=True)
+    if no_cambio is not None:
+        return no_cambio
+
+    respuesta = {"status": "success", "data": cuidadores, "next_cursor": next_cursor}
+    if html:
+        respuesta['html'] = render_template('_cuidador_cards.html', cuidadores=cuidadores)
+    return con_etag(jsonify(respuesta), etag, privado=True)
+
+@app.route('/api/cuidadores/near')
+@login_required
+def cuidadores_cercanos():
+    """
+    Devuelve los cuidadores dentro de `radius_km` del punto (lat, lng), ordenados por distancia.
+    """
+    try:
+        lat = float(request.args['lat'])
+        lng = float(request.args['lng'])
+        radio_km = min(float(request.args.get('radius_km', 10)), NEAR_MAX_RADIUS_KM)
+        limite = min(int(request.args.get('limit', 20)), NEAR_MAX_LIMIT)
+    except (KeyError, ValueError):
+        return jsonify({
+            "status": "error",
+            "message": "Parámetros inválidos: se requieren lat y lng numéricos."
+        }), 400
+
+    geo_index.asegurar()
+    cercanos = geo_index.cercanos(lat, lng, radio_km, limite)
+    if not cercanos:
+        return jsonify({"status": "success", "data": []})
+
+    por_id = cuidadores_por_id(get_read_db().cursor(), [id for id, _ in cercanos])
+    recordar_fotos({id: cuidador['foto'] for id, cuidador in por_id.items()})
+
+    data = []
+    for id, distancia in cercanos:
+        if id in por_id:
+            cuidador = por_id[id]
+            cuidador['distancia_km'] = round(distancia, 3)
+            data.append(cuidador)
+    return jsonify({"status": "success", "data": data})
+
+@app.route('/api/cuidadores/clusters')
+@login_required
+def cuidadores_clusters():
+    """
+    Marcadores del mapa agrupados para el rectángulo visible: `bbox=oeste,sur,este,norte`,
+    `zoom` del mapa y `servicios` (repetible). Cada grupo trae su centroide, cuántos cuidadores
+    tiene y hasta tres ids; los grupos de un solo cuidador traen además su nombre.
+    """
+    try:
+        oeste, sur, este, norte = (float(valor) for valor in request.args['bbox'].split(','))
+        zoom = int(request.args['zoom'])
+    except (KeyError, ValueError):
+        return jsonify({
+            "status": "error",
+            "message": "Parámetros inválidos: se requieren bbox=oeste,sur,este,norte y zoom."
+        }), 400
+    if not (-90 <= sur <= norte <= 90):
+        return jsonify({"status": "error", "message": "bbox inválido."}), 400
+
+    servicios = normalizar_servicios(request.args.getlist('servicios'))
+    filtro = tuple(sorted(servicios)) or None
+
+    calculados = []
+
+    def permitidos():
+        # Solo corre si el nivel de ese filtro no está en cache, fuera del lock del índice geo,
+        # y una vez por request aunque se baje de zoom
+        if not calculados:
+            facetas_index.asegurar()
+            calculados.append(frozenset(facetas_index.ids(servicios)))
+        return calculados[0]
+
+    geo_index.asegurar()
+    zoom = max(0, min(zoom, geo_index.ZOOM_MAX))
+    grupos = geo_index.clusters(zoom, sur, oeste, norte, este, filtro, permitidos if filtro else None)
+    # Un rectángulo muy grande para su zoom se agrupa más grueso en vez de mandar miles de puntos
+    while len(grupos) > CLUSTERS_MAX and zoom > 0:
+        zoom -= 1
+        grupos = geo_index.clusters(zoom, sur, oeste, norte, este, filtro, permitidos if filtro else None)
+
+    solos = [ids[0] for _, _, cantidad, ids in grupos if cantidad == 1]
+    nombres = {}
+    if solos:
+        cursor = get_read_db().cursor()
+        cursor.execute(f"SELECT id, nombre FROM usuarios WHERE id IN ({', '.join(['%s'] * len(solos))})", solos)
+        nombres = {row['id']: row['nombre'] for row in cursor.fetchall()}
+
+    data = []
+    for lat, lng, cantidad, ids in grupos:
+        grupo = {"lat": round(lat, 6), "lng": round(lng, 6), "total": cantidad, "ids": ids}
+        if cantidad == 1:
+            grupo['nombre'] = nombres.get(ids[0])
+        data.append(grupo)
+    return jsonify({"status": "success", "zoom": zoom, "data": data})
 
 @app.route('/api/foto/<int:user_id>')
 @login_required
 def get_foto(user_id):
-    db = get_db()
-    cursor = db.cursor()
-    cursor.execute("SELECT foto FROM cuidadores WHERE usuario_id = %s", (user_id,))
-    row = cursor.fetchone()
-    if row and row['foto']:
-        return redirect(row['foto'])
-    return url_for('static', filename='assets/img/placeholder.jpg')
+    # ?variante=card|popup|full (default full). Sin foto redirige al placeholder estático,
+    # que por llevar ?v=<hash> el navegador guarda un año
+    url = urls_de_fotos([user_id])[user_id]
+    variante = request.args.get('variante', 'full')
+    if url and variante in VARIANTES:
+        destino = foto_variante(url, variante)
+    else:
+        destino = url_for('static', filename=PLACEHOLDER_FOTO)
+    response = redirect(destino)
+    # Las URLs de las fotos no cambian (cada subida usa otro prefijo): el redirect solo puede
+    # quedar viejo si el cuidador sube otra foto, por eso vence en FOTO_REDIRECT_MAX_AGE
+    response.headers['Cache-Control'] = f'private, max-age={FOTO_REDIRECT_MAX_AGE}'
+    return response
 
 # --- ADMINISTRACIÓN ---
+# Por solapa del panel: columna del cursor, orden, filtros fijos, conteo total y página.
+# Las páginas se piden por cursor (id > / id <), así que la página 500 cuesta lo mismo que la 1.
+ADMIN_LISTADOS = {
+    'cu': {
+        'nombre': 'cuidadores',
+        'clave': 'u.id',
+        'descendente': False,
+        'filtros': ["u.tipo_usuario = 'cuidador'"],
+        'total': "SELECT COUNT(*) AS count FROM usuarios WHERE tipo_usuario = 'cuidador'",
+        'pagina': """SELECT u.*, c.descripcion, c.ubicacion, c.lat, c.lng, c.rating, c.reseñas_total, c.foto, GROUP_CONCAT(s.servicio) as servicios
+                     FROM usuarios u LEFT JOIN cuidadores c ON u.id = c.usuario_id LEFT JOIN servicios_cuidadores s ON u.id = s.cuidador_id
+                     {where} GROUP BY u.id ORDER BY u.id {orden} LIMIT %s""",
+    },
+    'cl': {
+        'nombre': 'clientes',
+        'clave': 'id',
+        'descendente': False,
+        'filtros': ["tipo_usuario = 'cliente'"],
+        'total': "SELECT COUNT(*) AS count FROM usuarios WHERE tipo_usuario = 'cliente'",
+        'pagina': "SELECT * FROM usuarios {where} ORDER BY id {orden} LIMIT %s",
+    },
+    # # MODIFICADO: Join para obtener nombres
+    're': {
+        'nombre': 'reseñas',
+        'clave': 'r.id',
+        'descendente': False,
+        'filtros': [],
+        'total': "SELECT COUNT(*) AS count FROM reseñas",
+        'pagina': """SELECT r.*, cu.nombre as cuidador_nombre, cl.nombre as cliente_nombre
+                     FROM reseñas r
+                     JOIN usuarios cu ON r.cuidador_id = cu.id
+                     JOIN usuarios cl ON r.cliente_id = cl.id
+                     {where} ORDER BY r.id {orden} LIMIT %s""",
+    },
+    'co': {
+        'nombre': 'comentarios',
+        'clave': 'id',
+        'descendente': True,
+        'filtros': [],
+        # Lo usa contadores_contacto(), que cachea el resultado hasta la próxima escritura
+        'total': "SELECT COUNT(*) AS count, COALESCE(SUM(leido = 0), 0) AS sin_leer FROM mensajes_contacto",
+        'pagina': "SELECT * FROM mensajes_contacto {where} ORDER BY id {orden} LIMIT %s",
+    },
+}
+
+# Búsqueda por prefijo: recorre el índice (tipo_usuario, nombre) y corta en LIMIT
+SQL_BUSCAR_USUARIOS = """
+    SELECT id, nombre FROM usuarios
+    WHERE tipo_usuario = %s AND nombre LIKE %s
+    ORDER BY nombre, id
+    LIMIT %s
+"""
+
+def sql_pagina_admin(listado, after=None, before=None, per_page=PER_PAGE, ultima=False):
+    """
+    Consulta (sql, params) de una página de `listado`. Con `before` o `ultima` recorre el
+    índice en sentido inverso; las filas vuelven invertidas y hay que darlas vuelta.
+    """
+    condiciones = list(listado['filtros'])
+    params = []
+    hacia_atras = before is not None or ultima
+    mayor, menor = ('<', '>') if listado['descendente'] else ('>', '<')
+    if after is not None:
+        condiciones.append(f"{listado['clave']} {mayor} %s")
+        params.append(after)
+    elif before is not None:
+        condiciones.append(f"{listado['clave']} {menor} %s")
+        params.append(before)
+    orden = 'DESC' if listado['descendente'] != hacia_atras else 'ASC'
+    where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+    return listado['pagina'].format(where=where, orden=orden), params + [per_page + 1]
+
+def total_admin(cursor, page_type):
+    if page_type == 'co':
+        return contadores_contacto(cursor)['total']
+
+    # Conteo exacto cacheado: se invalida en cada alta o baja y vence a los ADMIN_COUNT_TTL segundos
+    def contar():
+        cursor.execute(ADMIN_LISTADOS[page_type]['total'])
+        return cursor.fetchone()['count']
+    return cache.get_or_set(f"admin:total:{page_type}", contar, ttl=ADMIN_COUNT_TTL)
+
+def invalidar_totales_admin(*page_types):
+    cache.delete(*(f"admin:total:{page_type}" for page_type in page_types))
 
 def handle_crud_redirect():
     # # NUEVO: Función central para manejar la redirección
+    # Vuelve a la misma página (con su cursor) desde donde se hizo la operación
+    source_url = request.form.get('source_url', '')
+    if source_url.startswith('/admin/') and urlparse(source_url).netloc == '':
+        return redirect(source_url)
     source_page = request.form.get('source_page', 'cu-1')
     return redirect(url_for('admin_main', page=source_page))
 @app.route('/admin/')
@@ -297,71 +1008,73 @@ def admin_main(page="cu-1"):
     try:
         page_type, page_num = page.split('-', 1)
         page_num = int(page_num)
+        after = request.args.get('after', type=int)
+        before = request.args.get('before', type=int)
+        ultima = bool(request.args.get('last'))
+        per_page = max(1, min(int(request.args.get('per_page', PER_PAGE)), ADMIN_MAX_PER_PAGE))
     except ValueError:
         flash("Página no válida.", "danger")
         return redirect(url_for("admin_main"))
 
-    offset = (page_num - 1) * PER_PAGE
-    db = get_db()
+    db = get_read_db()
     cursor = db.cursor()
 
-    cuidadores = clientes = reseñas = comentarios = None # # NUEVO: Añadido `comentarios`
+    paginas = {}
     page_type_name = ""
 
-    if page_type == "cu":
-        cursor.execute("SELECT COUNT(*) AS count FROM usuarios WHERE tipo_usuario = 'cuidador'")
-        total = cursor.fetchone()['count']
-        cursor.execute("""
-            SELECT u.*, c.descripcion, c.ubicacion, c.lat, c.lng, c.rating,c.foto, GROUP_CONCAT(s.servicio) as servicios
-            FROM usuarios u LEFT JOIN cuidadores c ON u.id = c.usuario_id LEFT JOIN servicios_cuidadores s ON u.id = s.cuidador_id
-            WHERE u.tipo_usuario = 'cuidador' GROUP BY u.id ORDER BY u.id ASC LIMIT %s OFFSET %s""", (PER_PAGE, offset))
-        rows = cursor.fetchall()
-        cuidadores = Pagination(page_num, PER_PAGE, total, rows)
-        page_type_name = "cuidadores"
-    elif page_type == "cl":
-        cursor.execute("SELECT COUNT(*) AS count FROM usuarios WHERE tipo_usuario = 'cliente'")
-        total = cursor.fetchone()['count']
-        cursor.execute("SELECT * FROM usuarios WHERE tipo_usuario = 'cliente' LIMIT %s OFFSET %s", (PER_PAGE, offset))
-        rows = cursor.fetchall()
-        clientes = Pagination(page_num, PER_PAGE, total, rows)
-        page_type_name = "clientes"
-    elif page_type == "re":
-        cursor.execute("SELECT COUNT(*) AS count FROM reseñas")
-        total = cursor.fetchone()['count']
-        # # MODIFICADO: Join para obtener nombres
-        cursor.execute("""
-            SELECT r.*, cu.nombre as cuidador_nombre, cl.nombre as cliente_nombre
-            FROM reseñas r
-            JOIN usuarios cu ON r.cuidador_id = cu.id
-            JOIN usuarios cl ON r.cliente_id = cl.id
-            LIMIT %s OFFSET %s""", (PER_PAGE, offset))
+    if page_type in ADMIN_LISTADOS:
+        listado = ADMIN_LISTADOS[page_type]
+        page_type_name = listado['nombre']
+        total = total_admin(cursor, page_type)
+        cursor.execute(*sql_pagina_admin(listado, after, before, per_page, ultima))
         rows = cursor.fetchall()
-        reseñas = Pagination(page_num, PER_PAGE, total, rows)
-        page_type_name = "reseñas"
-    # # NUEVO: Bloque para manejar los comentarios
-    elif page_type == "co":
-        cursor.execute("SELECT COUNT(*) AS count FROM mensajes_contacto")
-        total = cursor.fetchone()['count']
-        cursor.execute("SELECT * FROM mensajes_contacto ORDER BY id DESC LIMIT %s OFFSET %s", (PER_PAGE, offset))
-        rows = cursor.fetchall()
-        comentarios = Pagination(page_num, PER_PAGE, total, rows)
-        page_type_name = "comentarios"
-
-    # Datos para los modales
-    cursor.execute("SELECT id, nombre FROM usuarios WHERE tipo_usuario = 'cuidador' ORDER BY nombre")
-    all_cuidadores = cursor.fetchall()
-    cursor.execute("SELECT id, nombre FROM usuarios WHERE tipo_usuario = 'cliente' ORDER BY nombre")
-    all_clientes = cursor.fetchall()
+        hay_mas = len(rows) > per_page
+        rows = list(rows[:per_page])
+
+        if before is not None or ultima:
+            rows.reverse()
+            has_prev, has_next = hay_mas, not ultima
+            if ultima:
+                page_num = max(1, int(ceil(total / per_page)))
+        else:
+            has_prev, has_next = after is not None, hay_mas
+            if after is None:
+                page_num = 1
+        paginas[page_type_name] = Pagination(page_num, per_page, total, rows, has_prev, has_next)
 
     return render_template("admin.html",
-                           cuidadores=cuidadores,
-                           clientes=clientes,
-                           reseñas=reseñas,
-                           comentarios=comentarios, # # NUEVO
-                           all_cuidadores=all_cuidadores,
-                           all_clientes=all_clientes,
+                           cuidadores=paginas.get('cuidadores'),
+                           clientes=paginas.get('clientes'),
+                           reseñas=paginas.get('reseñas'),
+                           comentarios=paginas.get('comentarios'), # # NUEVO
                            type=page_type_name,
-                           current_page=page) # #
+                           page_type=page_type,
+                           contacto=contadores_contacto(cursor),
+                           current_page=page,
+                           current_url=request.full_path.rstrip('?')) # #
+
+@app.route('/api/usuarios/buscar')
+@login_required
+def buscar_usuarios():
+    """
+    Autocompletado de los modales del panel: hasta `limit` usuarios de tipo `tipo`
+    cuyo nombre empieza con `q`, ordenados por nombre.
+    """
+    if current_user.tipo_usuario != 'admin':
+        return jsonify({"status": "error", "message": "No autorizado."}), 403
+
+    tipo = request.args.get('tipo', 'cliente')
+    if tipo not in ('cliente', 'cuidador'):
+        return jsonify({"status": "error", "message": "Tipo de usuario inválido."}), 400
+    try:
+        limite = max(1, min(int(request.args.get('limit', BUSCAR_USUARIOS_LIMIT)), BUSCAR_USUARIOS_LIMIT))
+    except ValueError:
+        return jsonify({"status": "error", "message": "Límite inválido."}), 400
+
+    prefijo = escapar_like(request.args.get('q', '').strip()) + '%'
+    cursor = get_read_db().cursor()
+    cursor.execute(SQL_BUSCAR_USUARIOS, (tipo, prefijo, limite))
+    return jsonify({"status": "success", "data": cursor.fetchall()})
 
 # --- CRUD CUIDADORES ---
 @app.route('/admin/cuidador/add', methods=['POST'])
@@ -371,41 +1084,43 @@ def add_cuidador():
         return redirect(url_for('dashboard'))
 
     db = get_db()
+    ruta_foto = None
     try:
-        password = generate_password_hash("default_password", method='pbkdf2:sha256')
+        foto = request.files.get('foto')
+        if foto and foto.filename:
+            ruta_foto = fotos.guardar_temporal(foto)
+
+        # Un hash por alta, cada uno con su salt: no se reutiliza el de otro cuidador
+        password = hasher.hashear("default_password")
         cursor = db.cursor()
         cursor.execute("INSERT INTO usuarios (nombre, email, password, tipo_usuario) VALUES (%s, %s, %s, 'cuidador')",
                       (request.form['nombre'], request.form['email'], password))
         usuario_id = cursor.lastrowid
-        db.commit()
 
         descripcion = request.form.get('descripcion', '').strip()
         ubicacion = request.form.get('ubicacion', '').strip()
         lat = float(request.form.get('lat') or 0)
         lng = float(request.form.get('lng') or 0)
-        rating = float(request.form.get('rating') or 0)
 
-        foto = request.files.get('foto')
-        image_url = None
-        if foto and foto.filename:
-            s3 = get_space_client()
-            filename = f"cuidadores/{usuario_id}_{foto.filename}"
-            s3.upload_fileobj(BytesIO(foto.read()), SPACE_NAME, filename, ExtraArgs={'ACL': 'public-read'})
-            image_url = f"https://{SPACE_NAME}.{SPACE_REGION}.digitaloceanspaces.com/{filename}" 
-
-        cursor.execute('''INSERT INTO cuidadores (usuario_id, descripcion, ubicacion, lat, lng, rating, foto)
-                         VALUES (%s, %s, %s, %s, %s, %s, %s)''',
-                      (usuario_id, descripcion, ubicacion, lat, lng, rating, image_url))
+        cursor.execute('''INSERT INTO cuidadores (usuario_id, descripcion, ubicacion, lat, lng)
+                         VALUES (%s, %s, %s, %s, %s)''',
+                      (usuario_id, descripcion, ubicacion, lat, lng))
+        servicios = guardar_servicios(cursor, usuario_id, request.form.getlist('servicios'))
         db.commit()
+        geo_index.upsert(usuario_id, lat, lng)
+        texto_index.upsert(usuario_id, nombre=request.form['nombre'], descripcion=descripcion, ubicacion=ubicacion,
+                           servicios=servicios)
+        facetas_index.upsert(usuario_id, servicios)
+        invalidar_listado()
+        invalidar_totales_admin('cu')
 
-        servicios = request.form.getlist('servicios')
-        for servicio in servicios:
-            cursor.execute("INSERT INTO servicios_cuidadores (cuidador_id, servicio) VALUES (%s, %s)", (usuario_id, servicio))
-        db.commit()
+        if ruta_foto:
+            fotos.encolar(usuario_id, ruta_foto)
 
         flash('🐾 Cuidador añadido!', 'success')
     except Exception as e:
         db.rollback()
+        fotos.descartar(ruta_foto)
         flash(f'Ocurrió un error: {e}', 'danger')
     return handle_crud_redirect()
 
@@ -416,39 +1131,40 @@ def edit_cuidador(id):
         return redirect(url_for('dashboard'))
 
     db = get_db()
+    ruta_foto = None
     try:
+        foto = request.files.get('foto')
+        if foto and foto.filename:
+            ruta_foto = fotos.guardar_temporal(foto)
+
         cursor = db.cursor()
         cursor.execute("UPDATE usuarios SET nombre = %s, email = %s WHERE id = %s",
                       (request.form['nombre'], request.form['email'], id))
 
         params = [request.form['descripcion'], request.form['ubicacion'],
-                  float(request.form.get('lat') or 0), float(request.form.get('lng') or 0),
-                  float(request.form.get('rating') or 0)]
-
-        foto_query_part = ""
-        if 'foto' in request.files and request.files['foto'].filename:
-            foto = request.files['foto']
-            s3 = get_space_client()
-            filename = f"cuidadores/{id}_{foto.filename}"
-            s3.upload_fileobj(BytesIO(foto.read()), SPACE_NAME, filename, ExtraArgs={'ACL': 'public-read'})
-            nueva_url = f"https://{SPACE_NAME}.{SPACE_REGION}.digitaloceanspaces.com/{filename}" 
-            params.append(nueva_url)
-            foto_query_part = ", foto = %s"
+                  float(request.form.get('lat') or 0), float(request.form.get('lng') or 0)]
 
         params.append(id)
-        cursor.execute(f"UPDATE cuidadores SET descripcion=%s, ubicacion=%s, lat=%s, lng=%s, rating=%s{foto_query_part} WHERE usuario_id=%s",
+        cursor.execute("UPDATE cuidadores SET descripcion=%s, ubicacion=%s, lat=%s, lng=%s WHERE usuario_id=%s",
                        tuple(params))
-        db.commit()
 
         cursor.execute("DELETE FROM servicios_cuidadores WHERE cuidador_id = %s", (id,))
-        servicios = request.form.getlist('servicios')
-        for servicio in servicios:
-            cursor.execute("INSERT INTO servicios_cuidadores (cuidador_id, servicio) VALUES (%s, %s)", (id, servicio))
+        servicios = guardar_servicios(cursor, id, request.form.getlist('servicios'))
         db.commit()
+        geo_index.upsert(id, params[2], params[3])
+        texto_index.upsert(id, nombre=request.form['nombre'], descripcion=params[0], ubicacion=params[1],
+                           servicios=servicios)
+        facetas_index.upsert(id, servicios)
+        invalidar_listado()
+        invalidar_usuario(id)
+
+        if ruta_foto:
+            fotos.encolar(id, ruta_foto)
 
         flash('🐾 Cuidador actualizado!', 'success')
     except Exception as e:
         db.rollback()
+        fotos.descartar(ruta_foto)
         flash(f'Ocurrió un error: {e}', 'danger')
     return handle_crud_redirect()
 
@@ -462,12 +1178,40 @@ def delete_cuidador(id):
     try:
         db.cursor().execute("DELETE FROM usuarios WHERE id = %s", (id,))
         db.commit()
+        geo_index.remove(id)
+        texto_index.remove(id)
+        facetas_index.remove(id)
+        invalidar_listado()
+        invalidar_reseñas(id)
+        invalidar_totales_admin('cu', 're')
+        invalidar_usuario(id)
+        invalidar_fotos(id)
         flash('🐾 Cuidador eliminado.', 'success')
     except Exception as e:
         db.rollback()
         flash(f'Ocurrió un error: {e}', 'danger')
     return handle_crud_redirect()
 
+# --- MÉTRICAS ---
+@app.route('/admin/metrics')
+@login_required
+def admin_metrics():
+    if current_user.tipo_usuario != 'admin':
+        return jsonify({"status": "error", "message": "No autorizado."}), 403
+
+    return jsonify({
+        "status": "success",
+        "data": {
+            "db_pool": db_pool.stats(),
+            "db_replicas": db_replicas.stats(),
+            "contacto": contacto_buffer.stats(),
+            "fragmentos": fragmentos.stats(),
+            "cache": cache.stats(),
+            "passwords": hasher.stats(),
+            **metricas.metricas.stats()
+        }
+    })
+
 # --- CLIENTES ---
 @app.route('/admin/cliente/add', methods=['POST'])
 @login_required
@@ -477,10 +1221,11 @@ def add_cliente():
 
     db = get_db()
     try:
-        password = generate_password_hash(request.form['password'], method='pbkdf2:sha256')
+        password = hasher.hashear(request.form['password'])
         db.cursor().execute("INSERT INTO usuarios (nombre, email, password, tipo_usuario) VALUES (%s, %s, %s, 'cliente')",
                            (request.form['nombre'], request.form['email'], password))
         db.commit()
+        invalidar_totales_admin('cl')
         flash('👤 Cliente añadido!', 'success')
     except Exception as e:
         db.rollback()
@@ -500,8 +1245,11 @@ def edit_cliente(id):
                       (request.form['nombre'], request.form['email'], id))
         if request.form['password']:
             cursor.execute("UPDATE usuarios SET password = %s WHERE id = %s",
-                          (generate_password_hash(request.form['password'], method='pbkdf2:sha256'), id))
+                          (hasher.hashear(request.form['password']), id))
         db.commit()
+        invalidar_usuario(id)
+        # El nombre del cliente aparece en las reseñas que escribió
+        invalidar_reseñas(*cuidadores_reseñados_por(cursor, id))
         flash('👤 Cliente actualizado!', 'success')
     except Exception as e:
         db.rollback()
@@ -516,8 +1264,20 @@ def delete_cliente(id):
 
     db = get_db()
     try:
-        db.cursor().execute("DELETE FROM usuarios WHERE id = %s", (id,))
+        cursor = db.cursor()
+        # El borrado en cascada se lleva sus reseñas: descontamos sus calificaciones antes
+        cursor.execute("""SELECT cuidador_id, calificacion, COUNT(*) AS cantidad FROM reseñas
+                          WHERE cliente_id = %s GROUP BY cuidador_id, calificacion""", (id,))
+        calificaciones = cursor.fetchall()
+        for row in calificaciones:
+            aplicar_calificacion(cursor, row['cuidador_id'], row['calificacion'], -row['cantidad'])
+        cursor.execute("DELETE FROM usuarios WHERE id = %s", (id,))
         db.commit()
+        invalidar_totales_admin('cl', 're')
+        invalidar_usuario(id)
+        invalidar_reseñas(*{row['cuidador_id'] for row in calificaciones})
+        if calificaciones:
+            invalidar_listado()
         flash('👤 Cliente eliminado.', 'success')
     except Exception as e:
         db.rollback()
@@ -534,10 +1294,15 @@ def add_reseña():
     db = get_db()
     try:
         cursor = db.cursor()
+        calificacion = validar_calificacion(request.form['calificacion'])
         cursor.execute("""INSERT INTO reseñas (cuidador_id, cliente_id, texto, calificacion)
                           VALUES (%s, %s, %s, %s)""",
-                      (request.form['cuidador_id'], request.form['cliente_id'], request.form['texto'], request.form['calificacion']))
+                      (request.form['cuidador_id'], request.form['cliente_id'], request.form['texto'], calificacion))
+        aplicar_calificacion(cursor, request.form['cuidador_id'], calificacion)
         db.commit()
+        invalidar_reseñas(request.form['cuidador_id'])
+        invalidar_listado()
+        invalidar_totales_admin('re')
         flash('⭐ Reseña añadida!', 'success')
     except Exception as e:
         db.rollback()
@@ -553,10 +1318,20 @@ def edit_reseña(id):
     db = get_db()
     try:
         cursor = db.cursor()
+        calificacion = validar_calificacion(request.form['calificacion'])
+        # FOR UPDATE: la calificación anterior no puede cambiar antes de descontarla
+        cursor.execute("SELECT cuidador_id, calificacion FROM reseñas WHERE id = %s FOR UPDATE", (id,))
+        anterior = cursor.fetchone()
         cursor.execute("""UPDATE reseñas SET cuidador_id=%s, cliente_id=%s, texto=%s, calificacion=%s WHERE id=%s""",
                       (request.form['cuidador_id'], request.form['cliente_id'], request.form['texto'],
-                       int(request.form['calificacion']), id))
+                       calificacion, id))
+        if anterior:
+            aplicar_calificacion(cursor, anterior['cuidador_id'], anterior['calificacion'], -1)
+            aplicar_calificacion(cursor, request.form['cuidador_id'], calificacion)
         db.commit()
+        # Si la reseña cambió de cuidador hay que invalidar a ambos
+        invalidar_reseñas(request.form['cuidador_id'], *([anterior['cuidador_id']] if anterior else []))
+        invalidar_listado()
         flash('⭐ Reseña actualizada!', 'success')
     except Exception as e:
         db.rollback()
@@ -571,38 +1346,55 @@ def delete_reseña(id):
 
     db = get_db()
     try:
-        db.cursor().execute("DELETE FROM reseñas WHERE id = %s", (id,))
+        cursor = db.cursor()
+        cursor.execute("SELECT cuidador_id, calificacion FROM reseñas WHERE id = %s FOR UPDATE", (id,))
+        anterior = cursor.fetchone()
+        cursor.execute("DELETE FROM reseñas WHERE id = %s", (id,))
+        if anterior:
+            aplicar_calificacion(cursor, anterior['cuidador_id'], anterior['calificacion'], -1)
         db.commit()
+        if anterior:
+            invalidar_reseñas(anterior['cuidador_id'])
+            invalidar_listado()
+            invalidar_totales_admin('re')
         flash('⭐ Reseña eliminada.', 'success')
     except Exception as e:
         db.rollback()
         flash(f'Ocurrió un error: {e}', 'danger')
     return handle_crud_redirect()
 
+# Hacemos un JOIN con la tabla de usuarios para obtener el nombre del cliente que hizo la reseña
+SQL_RESEÑAS_CUIDADOR = """
+    SELECT r.texto, r.calificacion, u.nombre as cliente_nombre
+    FROM reseñas r
+    JOIN usuarios u ON r.cliente_id = u.id
+    WHERE r.cuidador_id = %s
+    ORDER BY r.id DESC
+"""
+
 @app.route('/api/reviews/<int:cuidador_id>')
 def get_reviews(cuidador_id):
     """
     Devuelve las reseñas de un cuidador específico en formato JSON.
     """
-    try:
-        db = get_db()
+    def consultar():
+        db = get_read_db()
         cursor = db.cursor()
-        
-        # Hacemos un JOIN con la tabla de usuarios para obtener el nombre del cliente que hizo la reseña
-        cursor.execute("""
-            SELECT r.texto, r.calificacion, u.nombre as cliente_nombre
-            FROM reseñas r
-            JOIN usuarios u ON r.cliente_id = u.id
-            WHERE r.cuidador_id = %s
-            ORDER BY r.id DESC
-        """, (cuidador_id,))
-        
-        reseñas = cursor.fetchall()
-        
-        return jsonify({
+
+        cursor.execute(SQL_RESEÑAS_CUIDADOR, (cuidador_id,))
+        reseñas = list(cursor.fetchall())
+        return {"etag": etag_de(reseñas), "data": reseñas}
+
+    try:
+        reseñas = cache.get_or_set(clave_reseñas(cuidador_id), consultar)
+        no_cambio = no_modificado(reseñas['etag'])
+        if no_cambio is not None:
+            return no_cambio
+
+        return con_etag(jsonify({
             "status": "success",
-            "data": reseñas
-        })
+            "data": reseñas['data']
+        }), reseñas['etag'])
 
     except Exception as e:
         print(f"Error fetching reviews for cuidador {cuidador_id}: {e}")
@@ -612,18 +1404,50 @@ def get_reviews(cuidador_id):
         }), 500
 
 # --- CONTACTO ---
+# Los mensajes se anotan en disco y se insertan por lotes desde un hilo de fondo (contacto.py)
+CONTACTO_LOTE = int(os.getenv("CONTACTO_LOTE", 100))
+CONTACTO_INTERVALO = float(os.getenv("CONTACTO_INTERVALO", 1))
+CONTACTO_SPOOL_DIR = os.getenv("CONTACTO_SPOOL_DIR", os.path.join(app.root_path, 'spool', 'contacto'))
+CONTACTO_FSYNC = os.getenv("CONTACTO_FSYNC", "0").lower() in ("1", "true", "yes")
+
+def contacto_guardado(cantidad):
+    invalidar_contadores_contacto()
+
+contacto_buffer = ContactoBuffer(db_pool, CONTACTO_SPOOL_DIR, lote=CONTACTO_LOTE, intervalo=CONTACTO_INTERVALO,
+                                 fsync=CONTACTO_FSYNC, al_guardar=contacto_guardado)
+# Al apagar el worker se inserta lo pendiente; lo que no se pueda queda en disco para el próximo
+atexit.register(contacto_buffer.cerrar)
+
+@app.before_request
+def iniciar_contacto_buffer():
+    # Arranca el hilo en cada worker e inserta lo que hayan dejado workers anteriores
+    contacto_buffer.iniciar()
+
+def contadores_contacto(cursor=None):
+    """
+    {'total', 'sin_leer'} de mensajes_contacto sin COUNT(*) por request: el conteo se cachea
+    hasta ADMIN_COUNT_TTL segundos y se vuelve a contar de la tabla después de cada lote
+    insertado, baja o mensaje marcado como leído. No se llevan sumas por proceso: con varios
+    workers cada uno vería solo sus propios cambios.
+    """
+    def contar():
+        consulta = cursor or get_read_db().cursor()
+        consulta.execute(ADMIN_LISTADOS['co']['total'])
+        fila = consulta.fetchone()
+        return {'total': int(fila['count']), 'sin_leer': int(fila['sin_leer'])}
+    return cache.get_or_set('contacto:contadores', contar, ttl=ADMIN_COUNT_TTL)
+
+def invalidar_contadores_contacto():
+    cache.delete('contacto:contadores')
+
 @app.route('/contact', methods=['GET', 'POST'])
 def contact():
     if request.method == 'POST':
-        db = get_db()
         try:
-            cursor = db.cursor()
-            cursor.execute("INSERT INTO mensajes_contacto (nombre, email, asunto, mensaje) VALUES (%s, %s, %s, %s)",
-                          (request.form['name'], request.form['email'], request.form['subject'], request.form['message']))
-            db.commit()
+            contacto_buffer.agregar(request.form['name'], request.form['email'],
+                                    request.form['subject'], request.form['message'])
             flash('¡Gracias por tu mensaje!', 'success')
         except Exception as e:
-            db.rollback()
             flash('Error al enviar tu mensaje.', 'danger')
         return redirect(url_for('contact'))
     return render_template('contact.html')
@@ -636,14 +1460,155 @@ def delete_comentario(id):
 
     db = get_db()
     try:
-        db.cursor().execute("DELETE FROM mensajes_contacto WHERE id = %s", (id,))
+        cursor = db.cursor()
+        cursor.execute("DELETE FROM mensajes_contacto WHERE id = %s", (id,))
         db.commit()
+        if cursor.rowcount:
+            invalidar_contadores_contacto()
         flash('💬 Comentario eliminado.', 'success')
     except Exception as e:
         db.rollback()
         flash(f'Ocurrió un error: {e}', 'danger')
     return handle_crud_redirect()
 
+@app.route('/admin/comentario/leido/<int:id>', methods=['POST'])
+@login_required
+def marcar_comentario_leido(id):
+    if current_user.tipo_usuario != 'admin':
+        return redirect(url_for('dashboard'))
+
+    db = get_db()
+    try:
+        cursor = db.cursor()
+        # Solo si pasó de no leído a leído se vuelve a contar
+        cursor.execute("UPDATE mensajes_contacto SET leido = 1 WHERE id = %s AND leido = 0", (id,))
+        db.commit()
+        if cursor.rowcount:
+            invalidar_contadores_contacto()
+    except Exception as e:
+        db.rollback()
+        flash(f'Ocurrió un error: {e}', 'danger')
+    return handle_crud_redirect()
+
+# --- COMANDOS DE MANTENIMIENTO ---
+@app.cli.command('recalcular-ratings')
+@click.option('--lote', default=1000, show_default=True, help='Cuidadores por transacción.')
+def recalcular_ratings_command(lote):
+    """Recalcula promedio, cantidad e histograma de reseñas de todos los cuidadores."""
+    db = get_db()
+    cursor = db.cursor()
+    cursor.execute("SELECT MIN(usuario_id) AS desde, MAX(usuario_id) AS hasta FROM cuidadores")
+    rango = cursor.fetchone()
+    if rango['desde'] is None:
+        click.echo("No hay cuidadores.")
+        return
+
+    # Por rangos de id, para no bloquear toda la tabla en una sola transacción
+    actualizados = 0
+    for desde in range(rango['desde'], rango['hasta'] + 1, lote):
+        actualizados += recalcular_agregados(cursor, desde, desde + lote - 1)
+        db.commit()
+    invalidar_listado()
+    click.echo(f"📊 Ratings recalculados ({actualizados} cuidadores actualizados).")
+
+def abrir_archivo(ruta, modo):
+    # "-" es la entrada o salida estándar; newline='' es lo que espera el módulo csv
+    if ruta == '-':
+        return sys.stdin if 'r' in modo else sys.stdout
+    return open(ruta, modo, encoding='utf-8', newline='')
+
+@app.cli.command('importar')
+@click.argument('entidad', type=click.Choice(list(bulk.IMPORTADORES)))
+@click.argument('archivo')
+@click.option('--formato', type=click.Choice(['csv', 'jsonl']), help='Por defecto, según la extensión del archivo.')
+@click.option('--lote', default=1000, show_default=True, help='Registros por transacción.')
+@click.option('--procesos', default=os.cpu_count() or 1, show_default=True, help='Procesos para hashear contraseñas.')
+def importar_command(entidad, archivo, formato, lote, procesos):
+    """Importa clientes, cuidadores o reseñas desde CSV/JSONL sin borrar datos existentes."""
+    hasher_importacion = crear_hasher(workers=procesos)
+    entrada = abrir_archivo(archivo, 'r')
+    try:
+        registros = bulk.leer_registros(entrada, bulk.formato_de(archivo, formato))
+        estadisticas = bulk.IMPORTADORES[entidad](get_db(), registros, hasher_importacion, lote)
+    finally:
+        hasher_importacion.shutdown()
+        if entrada is not sys.stdin:
+            entrada.close()
+
+    invalidar_listado()
+    invalidar_totales_admin('cu', 'cl', 're')
+    geo_index.invalidar()
+    texto_index.invalidar()
+    facetas_index.invalidar()
+    cache.delete("servicios:catalogo")
+    click.echo(f"📥 {entidad}: {estadisticas['importados']} importados, {estadisticas['omitidos']} omitidos "
+               f"de {estadisticas['leidos']} leídos.", err=archivo == '-')
+
+@app.cli.command('exportar')
+@click.argument('entidad', type=click.Choice(list(bulk.EXPORTADORES)))
+@click.argument('archivo')
+@click.option('--formato', type=click.Choice(['csv', 'jsonl']), help='Por defecto, según la extensión del archivo.')
+@click.option('--lote', default=1000, show_default=True, help='Filas por consulta.')
+@click.option('--con-hashes', is_flag=True, help='Incluye los hashes de contraseña (para migrar a otra base).')
+def exportar_command(entidad, archivo, formato, lote, con_hashes):
+    """Exporta clientes, cuidadores o reseñas a CSV/JSONL."""
+    campos = [c for c in bulk.CAMPOS[entidad] if c != 'password' and (con_hashes or c != 'password_hash')]
+    salida = abrir_archivo(archivo, 'w')
+    try:
+        total = bulk.escribir_registros(salida, bulk.formato_de(archivo, formato), campos,
+                                        bulk.EXPORTADORES[entidad](get_db(), lote, con_hashes))
+    finally:
+        if salida is not sys.stdout:
+            salida.close()
+    click.echo(f"📤 {entidad}: {total} registros exportados.", err=archivo == '-')
+
+@app.cli.command('comprimir-estaticos')
+def comprimir_estaticos_command():
+    """Genera las variantes .gz/.br de los CSS/JS/SVG de static/ (correr en cada deploy)."""
+    generados = assets.comprimir()
+    click.echo(f"🗜️ {len(generados)} archivos precomprimidos.")
+
+def consultas_criticas():
+    """Consultas de las rutas más usadas, con parámetros representativos, para `flask verificar-indices`."""
+    consultas = {
+        'dashboard': sql_listado_cuidadores(),
+        'dashboard_siguiente': sql_listado_cuidadores(after=1),
+        'dashboard_por_id': sql_cuidadores_por_id([1, 2, 3]),
+        'get_reviews': (SQL_RESEÑAS_CUIDADOR, (1,)),
+        'reseñas_de_cliente': ("SELECT DISTINCT cuidador_id FROM reseñas WHERE cliente_id = %s", (1,)),
+        'buscar_usuarios': (SQL_BUSCAR_USUARIOS, ('cuidador', 'Ju%', BUSCAR_USUARIOS_LIMIT)),
+    }
+    for listado in ADMIN_LISTADOS.values():
+        consultas[f"admin_{listado['nombre']}_total"] = (listado['total'], ())
+        consultas[f"admin_{listado['nombre']}"] = sql_pagina_admin(listado)
+        consultas[f"admin_{listado['nombre']}_siguiente"] = sql_pagina_admin(listado, after=1)
+        consultas[f"admin_{listado['nombre']}_ultima"] = sql_pagina_admin(listado, ultima=True)
+    return consultas
+
+@app.cli.command('migrar')
+def migrar_command():
+    """Aplica las migraciones pendientes de migrations/ (no borra datos)."""
+    aplicadas = aplicar_migraciones(get_db(), log=click.echo)
+    click.echo(f"🗂️ {len(aplicadas)} migraciones aplicadas." if aplicadas else "El esquema está al día.")
+
+@app.cli.command('verificar-indices')
+@click.option('--min-filas', default=1000, show_default=True,
+              help='Filas estimadas a partir de las cuales un scan completo con índices disponibles falla.')
+def verificar_indices_command(min_filas):
+    """Falla si alguna consulta crítica recorre una tabla completa según EXPLAIN."""
+    db = get_db()
+    faltantes = pendientes(db)
+    if faltantes:
+        raise click.ClickException(f"Hay migraciones pendientes: {', '.join(m[1] for m in faltantes)}")
+
+    problemas = verificar_planes(db, consultas_criticas(), min_filas=min_filas)
+    for nombre, detalles in problemas.items():
+        for detalle in detalles:
+            click.echo(f"❌ {nombre}: {detalle}", err=True)
+    if problemas:
+        raise click.ClickException(f"{len(problemas)} consultas sin índice adecuado.")
+    click.echo("✅ Todas las consultas críticas usan índices.")
+
 # --- ARRANQUE ---
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
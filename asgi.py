@@ -0,0 +1,311 @@
+"""
+Modo de servicio ASGI: las rutas que pasan la mayor parte del tiempo esperando a MySQL
+(/api/reviews/<id>, /api/cuidadores y /api/cuidadores/facetas) se atienden con corutinas
+sobre aiomysql, así un worker sigue atendiendo mientras espera a la base. El POST de /contact
+también es async y usa el mismo buffer de escritura diferida que la app Flask. Todo lo demás lo sigue sirviendo la app Flask de app.py, montada como WSGI.
+
+    gunicorn asgi:app -k uvicorn.workers.UvicornWorker
+
+Las dependencias extra están en requirements-async.txt. `gunicorn app:app` sigue
+funcionando igual.
+
+Falta, a propósito: no hay cliente S3 async (las fotos las sirve la app Flask montada, en
+hilos) y el pool de aiomysql apunta solo al primario, sin el ruteo a réplicas de get_read_db().
+"""
+import logging
+import os
+import ssl
+import time
+from contextlib import asynccontextmanager
+
+import aiomysql
+from a2wsgi import WSGIMiddleware
+from itsdangerous import BadSignature
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import RedirectResponse, Response
+from starlette.routing import Mount, Route
+from werkzeug.http import parse_etags, quote_etag
+
+import metricas
+from app import (
+    app as flask_app, cache, clave_listado, clave_reseñas, etag_de, contacto_buffer, ids_de_pagina,
+    armar_pagina, armar_pagina_sql, facetas_servicios, formatear_cuidador, sql_cuidadores_por_id,
+    sql_listado_cuidadores, normalizar_servicios, User, USER_CACHE_TTL, DASHBOARD_PAGE_SIZE,
+    DASHBOARD_MAX_PAGE_SIZE, SQL_RESEÑAS_CUIDADOR, SERVER_TIMING, REQUEST_LENTO_MS,
+)
+
+logger = logging.getLogger(__name__)
+
+ASYNC_DB_POOL_MAX = int(os.getenv("ASYNC_DB_POOL_MAX", 50))
+# Hilos para las rutas Flask montadas (y para el trabajo bloqueante de las rutas async)
+ASYNC_WSGI_HILOS = int(os.getenv("ASYNC_WSGI_HILOS", 10))
+
+_FALTA = object()
+
+
+# --- MYSQL ASÍNCRONO ---
+def _contexto_ssl():
+    # Equivalente a ssl_mode=REQUIRED de connect_db: cifrado, sin verificar el certificado
+    contexto = ssl.create_default_context()
+    contexto.check_hostname = False
+    contexto.verify_mode = ssl.CERT_NONE
+    return contexto
+
+
+async def crear_pool():
+    return await aiomysql.create_pool(
+        host=os.getenv("DB_HOST"),
+        user=os.getenv("DB_USER"),
+        password=os.getenv("DB_PASSWORD"),
+        db=os.getenv("DB_NAME"),
+        port=int(os.getenv("DB_PORT")),
+        ssl=_contexto_ssl(),
+        charset='utf8mb4',
+        cursorclass=aiomysql.DictCursor,
+        # Solo hay lecturas: sin autocommit cada SELECT deja una transacción abierta y el pool
+        # de aiomysql cierra la conexión al devolverla en lugar de reutilizarla
+        autocommit=True,
+        minsize=int(os.getenv("DB_POOL_MIN", 0)),
+        maxsize=ASYNC_DB_POOL_MAX,
+        pool_recycle=float(os.getenv("DB_POOL_MAX_LIFETIME", 3600)),
+    )
+
+
+async def consultar(request, sql, params=()):
+    """Ejecuta la consulta de solo lectura `sql` con una conexión del pool y devuelve sus filas."""
+    inicio = time.perf_counter()
+    try:
+        async with request.app.state.pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(sql, params)
+                filas = await cursor.fetchall()
+        return list(filas)
+    finally:
+        ms = (time.perf_counter() - inicio) * 1000
+        request.state.medicion.registrar_consulta(sql, ms)
+        metricas.metricas.registrar_consulta(sql, ms)
+
+
+# --- CACHE ---
+# Es el mismo objeto que usa Flask en el proceso: las invalidaciones de una app valen para la otra.
+# Con Redis las llamadas son de red y bloqueantes, así que van a un hilo.
+async def _en_hilo_si_redis(funcion, *args):
+    if cache.backend == 'redis':
+        return await run_in_threadpool(funcion, *args)
+    return funcion(*args)
+
+
+async def cache_get_or_set(clave, calcular, ttl=None):
+    valor = await _en_hilo_si_redis(cache.get, clave, _FALTA)
+    if valor is _FALTA:
+        valor = await calcular()
+        await _en_hilo_si_redis(cache.set, clave, valor, ttl)
+    return valor
+
+
+def en_contexto_flask(funcion, *args, **kwargs):
+    """Corre `funcion` (en un hilo) dentro del contexto de la app Flask, para lo que usa get_db()."""
+    with flask_app.app_context():
+        return funcion(*args, **kwargs)
+
+
+# --- SESIÓN DE FLASK ---
+_serializador = flask_app.session_interface.get_signing_serializer(flask_app)
+
+
+def leer_sesion(request):
+    cookie = request.cookies.get(flask_app.config['SESSION_COOKIE_NAME'])
+    if not cookie:
+        return {}
+    try:
+        return dict(_serializador.loads(cookie, max_age=int(flask_app.permanent_session_lifetime.total_seconds())))
+    except BadSignature:
+        return {}
+
+
+def guardar_sesion(response, sesion):
+    config = flask_app.config
+    response.set_cookie(
+        config['SESSION_COOKIE_NAME'],
+        _serializador.dumps(sesion),
+        max_age=int(flask_app.permanent_session_lifetime.total_seconds()) if sesion.get('_permanent') else None,
+        path=config['SESSION_COOKIE_PATH'] or config['APPLICATION_ROOT'] or '/',
+        domain=config['SESSION_COOKIE_DOMAIN'] or None,
+        secure=config['SESSION_COOKIE_SECURE'],
+        httponly=config['SESSION_COOKIE_HTTPONLY'],
+        samesite=config['SESSION_COOKIE_SAMESITE'],
+    )
+
+
+def flash(response, sesion, mensaje, categoria):
+    # El mismo formato que flask.flash: la próxima página Flask lo muestra
+    sesion.setdefault('_flashes', []).append((categoria, mensaje))
+    guardar_sesion(response, sesion)
+
+
+async def usuario_actual(request):
+    """El usuario de la sesión de Flask-Login (mismo cache que load_user), o None."""
+    try:
+        user_id = int(leer_sesion(request).get('_user_id'))
+    except (TypeError, ValueError):
+        return None
+
+    async def calcular():
+        filas = await consultar(request, "SELECT id, email, nombre, tipo_usuario FROM usuarios WHERE id = %s",
+                                (user_id,))
+        return User(filas[0]).to_dict() if filas else None
+
+    return await cache_get_or_set(f"usuario:{user_id}", calcular, ttl=USER_CACHE_TTL)
+
+
+# --- RESPUESTAS ---
+def respuesta_json(datos, status=200):
+    # Mismo JSON que jsonify (Decimal, fechas) para que las dos apps respondan igual
+    return Response(flask_app.json.dumps(datos), status_code=status, media_type='application/json')
+
+
+def con_etag(request, datos, etag, privado=False):
+    """Como no_modificado + con_etag de app.py: 304 si el cliente ya tiene `etag`."""
+    cache_control = f"{'private' if privado else 'public'}, no-cache"
+    headers = {'ETag': quote_etag(etag), 'Cache-Control': cache_control}
+    if parse_etags(request.headers.get('if-none-match')).contains(etag):
+        return Response(status_code=304, headers=headers)
+    response = respuesta_json(datos)
+    response.headers.update(headers)
+    return response
+
+
+def no_autenticado():
+    return respuesta_json({"status": "error", "message": "Por favor, inicia sesión para acceder a esta página."}, 401)
+
+
+def medido(nombre):
+    """Registra el request en las mismas métricas que las rutas Flask (endpoint `async.<nombre>`)."""
+    def decorador(endpoint):
+        async def envoltura(request):
+            request.state.medicion = metricas.MedicionRequest()
+            status = 500
+            try:
+                response = await endpoint(request)
+                status = response.status_code
+            finally:
+                medicion = request.state.medicion
+                total_ms = medicion.total_ms
+                metricas.metricas.registrar_request(f"async.{nombre}", status, medicion, total_ms)
+                metricas.log_request(f"async.{nombre}", request.method, request.url.path, status, medicion, total_ms,
+                                     REQUEST_LENTO_MS)
+            if SERVER_TIMING:
+                response.headers['Server-Timing'] = metricas.server_timing(medicion, total_ms)
+            return response
+        return envoltura
+    return decorador
+
+
+# --- RUTAS ---
+@medido('get_reviews')
+async def get_reviews(request):
+    cuidador_id = request.path_params['cuidador_id']
+
+    async def calcular():
+        reseñas = await consultar(request, SQL_RESEÑAS_CUIDADOR, (cuidador_id,))
+        return {"etag": etag_de(reseñas), "data": reseñas}
+
+    try:
+        reseñas = await cache_get_or_set(clave_reseñas(cuidador_id), calcular)
+    except Exception:
+        logger.exception("Error fetching reviews for cuidador %s", cuidador_id)
+        return respuesta_json({"status": "error", "message": "No se pudieron cargar las reseñas."}, 500)
+    return con_etag(request, {"status": "success", "data": reseñas['data']}, reseñas['etag'])
+
+
+def _renderizar_tarjetas(cuidadores, base_url):
+    # Las plantillas usan url_for: hace falta un contexto de request de Flask
+    with flask_app.test_request_context(base_url=base_url):
+        return flask_app.jinja_env.get_template('_cuidador_cards.html').render(cuidadores=cuidadores)
+
+
+@medido('api_cuidadores')
+async def api_cuidadores(request):
+    """Igual que api_cuidadores de app.py; los índices en memoria se consultan en un hilo."""
+    if await usuario_actual(request) is None:
+        return no_autenticado()
+    try:
+        after = request.query_params.get('after')
+        after = int(after) if after not in (None, '') else None
+        limite = max(min(int(request.query_params.get('limit', DASHBOARD_PAGE_SIZE)), DASHBOARD_MAX_PAGE_SIZE), 1)
+    except ValueError:
+        return respuesta_json({"status": "error", "message": "Parámetros de paginación inválidos."}, 400)
+    texto = request.query_params.get('q', '').strip()
+    # Igual que la ruta Flask: normalizar_servicios y después buscar_cuidadores los ordena
+    servicios = sorted(set(normalizar_servicios(request.query_params.getlist('servicios'))))
+
+    async def calcular():
+        pagina = await run_in_threadpool(en_contexto_flask, ids_de_pagina, texto, servicios, after, limite)
+        if pagina is None:
+            return armar_pagina_sql(await consultar(request, *sql_listado_cuidadores(after, limite)), limite)
+        ids, next_cursor = pagina
+        filas = await consultar(request, *sql_cuidadores_por_id(ids)) if ids else []
+        return armar_pagina(ids, {fila['id']: formatear_cuidador(fila) for fila in filas}, next_cursor)
+
+    clave = await _en_hilo_si_redis(clave_listado, texto, servicios, after, limite)
+    cuidadores, next_cursor, etag = await cache_get_or_set(clave, calcular)
+
+    html = bool(request.query_params.get('html'))
+    etag = f"{etag}-html" if html else etag
+    respuesta = {"status": "success", "data": cuidadores, "next_cursor": next_cursor}
+    if html and not parse_etags(request.headers.get('if-none-match')).contains(etag):
+        respuesta['html'] = await run_in_threadpool(_renderizar_tarjetas, cuidadores, str(request.base_url))
+    return con_etag(request, respuesta, etag, privado=True)
+
+
+@medido('api_facetas')
+async def api_facetas(request):
+    if await usuario_actual(request) is None:
+        return no_autenticado()
+    # Todo en memoria salvo la carga inicial de los índices
+    total, facetas = await run_in_threadpool(en_contexto_flask, facetas_servicios,
+                                             texto=request.query_params.get('q', '').strip(),
+                                             servicios=normalizar_servicios(request.query_params.getlist('servicios')))
+    return respuesta_json({"status": "success", "total": total, "data": facetas})
+
+
+@medido('contact')
+async def contact(request):
+    formulario = await request.form()
+    response = RedirectResponse('/contact', status_code=302)
+    sesion = leer_sesion(request)
+    try:
+        # Mismo buffer que la app Flask: el mensaje se anota en disco y se inserta en el próximo lote.
+        # En un hilo porque puede hacer fsync (CONTACTO_FSYNC) y porque la primera vez arranca el buffer
+        await run_in_threadpool(contacto_buffer.agregar, formulario['name'], formulario['email'],
+                                formulario['subject'], formulario['message'])
+        flash(response, sesion, '¡Gracias por tu mensaje!', 'success')
+    except Exception:
+        logger.exception("Error guardando un mensaje de contacto")
+        flash(response, sesion, 'Error al enviar tu mensaje.', 'danger')
+    return response
+
+
+# --- APLICACIÓN ---
+@asynccontextmanager
+async def ciclo_de_vida(app):
+    app.state.pool = await crear_pool()
+    try:
+        yield
+    finally:
+        app.state.pool.close()
+        await app.state.pool.wait_closed()
+
+
+app = Starlette(
+    routes=[
+        Route('/api/reviews/{cuidador_id:int}', get_reviews, methods=['GET']),
+        Route('/api/cuidadores', api_cuidadores, methods=['GET']),
+        Route('/api/cuidadores/facetas', api_facetas, methods=['GET']),
+        Route('/contact', contact, methods=['POST']),
+        # El resto (incluido GET /contact y los estáticos) lo atiende Flask en un pool de hilos
+        Mount('/', app=WSGIMiddleware(flask_app, workers=ASYNC_WSGI_HILOS)),
+    ],
+    lifespan=ciclo_de_vida,
+)
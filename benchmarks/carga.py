@@ -0,0 +1,532 @@
+"""
+Generador de carga para las rutas de la aplicación.
+
+Siembra la base configurada en `.env` (DB_*) con usuarios, cuidadores, reseñas y mensajes
+sintéticos y después recorre /login, /dashboard, /api/reviews/<id>, /api/cuidadores,
+/admin/page/<tipo-n> y /contact desde varios hilos. Reporta latencia p50/p95/p99, requests por segundo, consultas
+por request y tiempo de CPU renderizando plantillas por request (del header Server-Timing, así que requiere
+SERVER_TIMING=1), y guarda el resultado en JSON para comparar corridas.
+
+    python benchmarks/carga.py --sembrar --cuidadores 5000 --clientes 20000 --reseñas 100000
+    python benchmarks/carga.py --hilos 16 --duracion 30 --guardar
+    python benchmarks/carga.py --url http://127.0.0.1:8000 --duracion 30   # contra gunicorn
+    python benchmarks/carga.py --comparar benchmarks/resultados/a.json benchmarks/resultados/b.json
+
+Para comparar el modo ASGI (asgi.py) con el sync, medir cada servidor con un solo worker, muchos
+hilos y solo las rutas que atiende asgi.py:
+
+    gunicorn app:app -w 1 --threads 4                               # y en otra terminal:
+    python benchmarks/carga.py --url http://127.0.0.1:8000 --hilos 64 --escenarios reviews,cuidadores,contact --guardar sync.json
+    gunicorn asgi:app -w 1 -k uvicorn.workers.UvicornWorker
+    python benchmarks/carga.py --url http://127.0.0.1:8000 --hilos 64 --escenarios reviews,cuidadores,contact --guardar asgi.json
+
+Para medir el cache de fragmentos (tarjetas del dashboard y filas del panel), comparar la columna
+"render ms" de una corrida normal con otra con FRAGMENTOS_MAX=0, que renderiza todo en cada request:
+
+    FRAGMENTOS_MAX=0 python benchmarks/carga.py --escenarios dashboard,admin --guardar sin-fragmentos.json
+    python benchmarks/carga.py --escenarios dashboard,admin --guardar con-fragmentos.json
+
+Los datos sembrados usan emails bench-*@example.com: volver a sembrar actualiza los usuarios,
+pero agrega reseñas y mensajes nuevos. Con --url no se cuentan las consultas por request.
+
+Sin MySQL (en CI, por ejemplo) `--sin-base` mide solo el trabajo en memoria con cuidadores
+sintéticos: búsqueda de texto, facetas, cercanos, clusters del mapa y el cache de fragmentos.
+Sirve para detectar regresiones de CPU en los índices, no para medir las rutas:
+
+    python benchmarks/carga.py --sin-base --cuidadores 5000 --hilos 2 --duracion 2 --calentamiento 0
+"""
+import argparse
+import http.cookiejar
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from datetime import datetime
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+RESULTADOS_DIR = os.path.join(RAIZ, 'benchmarks', 'resultados')
+PASSWORD = 'bench-password'
+ADMIN_EMAIL = 'bench-admin@example.com'
+
+# Pesos de cada escenario en la mezcla de requests
+ESCENARIOS = {
+    'dashboard': 30,
+    'reviews': 30,
+    'cuidadores': 10,
+    'admin': 15,
+    'contact': 15,
+    'login': 10,
+}
+
+# Mezcla de --sin-base: operaciones sobre los índices en memoria, sin requests ni base
+ESCENARIOS_SIN_BASE = {
+    'busqueda': 30,
+    'facetas': 20,
+    'cercanos': 20,
+    'clusters': 15,
+    'fragmentos': 15,
+}
+
+NOMBRES = ["Juan", "Ana", "Carlos", "Laura", "Diego", "Federico", "Valeria", "Gonzalo", "Silvia", "Martina", "Lucas", "Sofía"]
+APELLIDOS = ["Pérez", "Gómez", "Méndez", "Fernández", "Torres", "Ruiz", "Mendoza", "Díaz", "Luna", "Romero", "Sosa"]
+LOCALIDADES = [("Lanús", -34.70, -58.39), ("Avellaneda", -34.66, -58.36), ("Lomas de Zamora", -34.76, -58.40),
+               ("Quilmes", -34.72, -58.25), ("Banfield", -34.74, -58.39), ("Palermo", -34.58, -58.42)]
+SERVICIOS = ["Alojamiento", "Paseos", "Cuidado Especializado", "Transporte", "Peluquería", "Baño", "Corte de uñas",
+             "Guardería", "Adiestramiento"]
+TEXTOS = ["Excelente atención, muy recomendable.", "Muy responsable y puntual.", "Mi perro volvió feliz.",
+          "Buena comunicación durante toda la estadía.", "Podría mejorar los horarios."]
+
+
+# --- SIEMBRA ---
+def _nombre(rnd):
+    return f"{rnd.choice(NOMBRES)} {rnd.choice(APELLIDOS)}"
+
+
+def clientes_sinteticos(n, password_hash, rnd):
+    for i in range(n):
+        yield {'nombre': _nombre(rnd), 'email': f'bench-cliente-{i}@example.com', 'password_hash': password_hash}
+
+
+def cuidadores_sinteticos(n, password_hash, rnd):
+    for i in range(n):
+        localidad, lat, lng = rnd.choice(LOCALIDADES)
+        yield {
+            'nombre': _nombre(rnd),
+            'email': f'bench-cuidador-{i}@example.com',
+            'password_hash': password_hash,
+            'descripcion': f"Cuidadora con {rnd.randint(1, 15)} años de experiencia.",
+            'ubicacion': f"{localidad}, Buenos Aires",
+            'lat': lat + rnd.uniform(-0.05, 0.05),
+            'lng': lng + rnd.uniform(-0.05, 0.05),
+            'servicios': rnd.sample(SERVICIOS, rnd.randint(1, 4)),
+        }
+
+
+def reseñas_sinteticas(n, clientes, cuidadores, rnd):
+    for _ in range(n):
+        yield {
+            'cuidador_email': f'bench-cuidador-{rnd.randrange(cuidadores)}@example.com',
+            'cliente_email': f'bench-cliente-{rnd.randrange(clientes)}@example.com',
+            'texto': rnd.choice(TEXTOS),
+            'calificacion': rnd.choices([1, 2, 3, 4, 5], weights=[1, 1, 3, 6, 9])[0],
+        }
+
+
+def sembrar(args):
+    import bulk
+    from app import connect_db
+    from migrate import aplicar_migraciones
+    from passwords import crear_hasher
+
+    rnd = random.Random(args.semilla)
+    hasher = crear_hasher(workers=0)
+    # Un solo hash para todos: sembrar no debería medir el costo del hashing
+    password_hash = hasher.hashear(PASSWORD)
+    conn = connect_db()
+    try:
+        aplicar_migraciones(conn)
+        inicio = time.perf_counter()
+        for entidad, registros in [
+            ('clientes', clientes_sinteticos(args.clientes, password_hash, rnd)),
+            ('cuidadores', cuidadores_sinteticos(args.cuidadores, password_hash, rnd)),
+            ('reseñas', reseñas_sinteticas(args.reseñas, args.clientes, args.cuidadores, rnd)),
+        ]:
+            estadisticas = bulk.IMPORTADORES[entidad](conn, registros, hasher, args.lote)
+            print(f"🌱 {entidad}: {estadisticas['importados']} en {time.perf_counter() - inicio:.1f}s")
+
+        with conn.cursor() as cursor:
+            for lote in bulk.en_lotes(range(args.mensajes), args.lote):
+                cursor.executemany("INSERT INTO mensajes_contacto (nombre, email, asunto, mensaje) VALUES (%s, %s, %s, %s)",
+                                   [(_nombre(rnd), f'bench-contacto-{i}@example.com', 'Consulta', rnd.choice(TEXTOS))
+                                    for i in lote])
+                conn.commit()
+            cursor.execute("""INSERT INTO usuarios (nombre, email, password, tipo_usuario) VALUES (%s, %s, %s, 'admin')
+                              ON DUPLICATE KEY UPDATE password = VALUES(password), tipo_usuario = 'admin'""",
+                           ("Admin Bench", ADMIN_EMAIL, password_hash))
+        conn.commit()
+        print(f"🌱 mensajes_contacto: {args.mensajes}; total {time.perf_counter() - inicio:.1f}s")
+    finally:
+        conn.close()
+
+
+# --- CLIENTES HTTP ---
+_contexto = threading.local()
+
+_RENDER = re.compile(r'(?:^|,)\s*render;dur=([\d.]+)')
+
+
+def render_ms(server_timing):
+    """CPU de plantillas que informa el servidor en Server-Timing; 0 si el request no renderizó nada."""
+    encontrado = _RENDER.search(server_timing or '')
+    return float(encontrado.group(1)) if encontrado else 0.0
+
+
+class ClienteFlask:
+    """Requests en proceso con el test client de Flask; cuenta las consultas SQL de cada uno."""
+
+    def __init__(self, app):
+        self.cliente = app.test_client()
+
+    def get(self, ruta):
+        return self._medir(self.cliente.get, ruta)
+
+    def post(self, ruta, datos):
+        return self._medir(self.cliente.post, ruta, data=datos)
+
+    def _medir(self, metodo, ruta, **kwargs):
+        _contexto.consultas = 0
+        respuesta = metodo(ruta, **kwargs)
+        return respuesta.status_code, _contexto.consultas, render_ms(respuesta.headers.get('Server-Timing'))
+
+
+class ClienteHTTP:
+    """Requests contra un servidor en marcha (gunicorn local); sin conteo de consultas."""
+
+    class _SinRedirecciones(urllib.request.HTTPRedirectHandler):
+        def redirect_request(self, *args, **kwargs):
+            return None
+
+    def __init__(self, url):
+        self.url = url.rstrip('/')
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()),
+                                                  self._SinRedirecciones())
+
+    def get(self, ruta):
+        return self._pedir(urllib.request.Request(self.url + ruta))
+
+    def post(self, ruta, datos):
+        return self._pedir(urllib.request.Request(self.url + ruta, data=urllib.parse.urlencode(datos).encode()))
+
+    def _pedir(self, req):
+        try:
+            with self.opener.open(req) as respuesta:
+                respuesta.read()
+                return respuesta.status, None, render_ms(respuesta.headers.get('Server-Timing'))
+        except urllib.error.HTTPError as e:
+            return e.code, None, render_ms(e.headers.get('Server-Timing'))
+
+
+def instrumentar_app(hilos):
+    """Importa la app con un pool para `hilos` hilos y un cursor que cuenta consultas por hilo."""
+    os.environ.setdefault('DB_POOL_MAX', str(hilos + 2))
+    import app as aplicacion
+    from metricas import CursorInstrumentado
+
+    class CursorContador(CursorInstrumentado):
+        def execute(self, query, args=None):
+            _contexto.consultas = getattr(_contexto, 'consultas', 0) + 1
+            return super().execute(query, args)
+
+    def connect_contando():
+        conn = aplicacion.connect_db()
+        conn.cursorclass = CursorContador
+        return conn
+
+    aplicacion.db_pool.factory = connect_contando
+    return aplicacion
+
+
+# --- ESCENARIOS ---
+class Datos:
+    """Ids existentes para armar las URLs de los escenarios."""
+
+    def __init__(self):
+        from app import connect_db
+        conn = connect_db()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT usuario_id AS id FROM cuidadores ORDER BY RAND() LIMIT 1000")
+                self.cuidadores = [row['id'] for row in cursor.fetchall()]
+                cursor.execute("SELECT email FROM usuarios WHERE tipo_usuario = 'cliente' AND email LIKE 'bench-%' LIMIT 1000")
+                self.clientes = [row['email'] for row in cursor.fetchall()]
+                cursor.execute("SELECT MAX(id) AS maximo FROM usuarios")
+                self.max_usuario = cursor.fetchone()['maximo'] or 1
+                cursor.execute("SELECT MAX(id) AS maximo FROM reseñas")
+                self.max_reseña = cursor.fetchone()['maximo'] or 1
+                cursor.execute("SELECT MAX(id) AS maximo FROM mensajes_contacto")
+                self.max_comentario = cursor.fetchone()['maximo'] or 1
+        finally:
+            conn.close()
+        if not self.cuidadores or not self.clientes:
+            raise SystemExit("La base no tiene datos de benchmark: correr primero con --sembrar.")
+
+
+def escenario(nombre, cliente, admin, datos, rnd):
+    if nombre == 'dashboard':
+        return cliente.get('/dashboard')
+    if nombre == 'reviews':
+        return cliente.get(f'/api/reviews/{rnd.choice(datos.cuidadores)}')
+    if nombre == 'cuidadores':
+        # Búsqueda de texto, filtro por servicio o página siguiente del listado, en partes iguales
+        opcion = rnd.randrange(3)
+        if opcion == 0:
+            return cliente.get(f'/api/cuidadores?q={urllib.parse.quote(rnd.choice(LOCALIDADES)[0])}')
+        if opcion == 1:
+            return cliente.get(f'/api/cuidadores?servicios={urllib.parse.quote(rnd.choice(SERVICIOS))}')
+        return cliente.get(f'/api/cuidadores?after={rnd.choice(datos.cuidadores)}')
+    if nombre == 'admin':
+        tipo = rnd.choice(['cu', 'cl', 're', 'co'])
+        # La mitad de las veces la primera página y la otra mitad una profunda, por cursor
+        if rnd.random() < 0.5:
+            return admin.get(f'/admin/page/{tipo}-1')
+        maximo = {'re': datos.max_reseña, 'co': datos.max_comentario}.get(tipo, datos.max_usuario)
+        return admin.get(f'/admin/page/{tipo}-2?after={rnd.randrange(maximo)}')
+    if nombre == 'contact':
+        return cliente.post('/contact', {'name': 'Bench', 'email': 'bench@example.com',
+                                         'subject': 'Carga', 'message': rnd.choice(TEXTOS)})
+    if nombre == 'login':
+        return cliente.post('/login', {'email': rnd.choice(datos.clientes), 'password': PASSWORD})
+    raise ValueError(nombre)
+
+
+def percentil(valores, p):
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, max(0, int(round(p / 100 * len(ordenados))) - 1))]
+
+
+def _medir(args, mezcla, nueva_sesion, ejecutar):
+    """
+    Corre la mezcla desde `args.hilos` hilos. `nueva_sesion(rnd)` prepara el estado de cada hilo
+    y `ejecutar(nombre, sesion, rnd)` hace una operación y devuelve (status, consultas, render_ms).
+    """
+    muestras = defaultdict(list)
+    errores = defaultdict(int)
+    consultas = defaultdict(list)
+    renders = defaultdict(list)
+    lock = threading.Lock()
+    fin = time.perf_counter() + args.calentamiento + args.duracion
+    inicio_medicion = time.perf_counter() + args.calentamiento
+    nombres, pesos = zip(*mezcla.items())
+
+    def hilo(numero):
+        rnd = random.Random(args.semilla + numero)
+        sesion = nueva_sesion(rnd)
+        while True:
+            ahora = time.perf_counter()
+            if ahora >= fin:
+                return
+            nombre = rnd.choices(nombres, weights=pesos)[0]
+            t0 = time.perf_counter()
+            status, n_consultas, ms_render = ejecutar(nombre, sesion, rnd)
+            duracion = (time.perf_counter() - t0) * 1000
+            if t0 < inicio_medicion:
+                continue
+            with lock:
+                muestras[nombre].append(duracion)
+                if status >= 400:
+                    errores[nombre] += 1
+                if n_consultas is not None:
+                    consultas[nombre].append(n_consultas)
+                if ms_render is not None:
+                    renders[nombre].append(ms_render)
+
+    hilos = [threading.Thread(target=hilo, args=(i,), daemon=True) for i in range(args.hilos)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    return muestras, errores, consultas, renders
+
+
+def _resumir(args, modo, mezcla, muestras, errores, consultas, renders):
+    resultado = {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'modo': modo,
+        'hilos': args.hilos,
+        'duracion_s': args.duracion,
+        'escenarios': list(mezcla),
+        'endpoints': {},
+    }
+    todas = [m for valores in muestras.values() for m in valores]
+    for nombre in list(mezcla) + ['total']:
+        valores = todas if nombre == 'total' else muestras[nombre]
+        n_consultas = ([c for v in consultas.values() for c in v] if nombre == 'total' else consultas[nombre])
+        ms_render = [r for v in renders.values() for r in v] if nombre == 'total' else renders[nombre]
+        resultado['endpoints'][nombre] = {
+            'requests': len(valores),
+            'rps': round(len(valores) / args.duracion, 1),
+            'p50_ms': _redondear(percentil(valores, 50)),
+            'p95_ms': _redondear(percentil(valores, 95)),
+            'p99_ms': _redondear(percentil(valores, 99)),
+            'errores': sum(errores.values()) if nombre == 'total' else errores[nombre],
+            'consultas_por_request': round(sum(n_consultas) / len(n_consultas), 2) if n_consultas else None,
+            'render_cpu_ms': round(sum(ms_render) / len(ms_render), 3) if ms_render else None,
+            'render_cpu_p95_ms': _redondear(percentil(ms_render, 95)),
+        }
+    return resultado
+
+
+def correr(args):
+    aplicacion = None if args.url else instrumentar_app(args.hilos)
+    datos = Datos()
+    nueva_sesion = (lambda: ClienteHTTP(args.url)) if args.url else (lambda: ClienteFlask(aplicacion.app))
+    mezcla = {nombre: peso for nombre, peso in ESCENARIOS.items() if nombre in args.escenarios}
+
+    def sesiones(rnd):
+        cliente, admin = nueva_sesion(), nueva_sesion()
+        cliente.post('/login', {'email': rnd.choice(datos.clientes), 'password': PASSWORD})
+        admin.post('/login', {'email': ADMIN_EMAIL, 'password': PASSWORD})
+        return cliente, admin
+
+    def ejecutar(nombre, sesion, rnd):
+        return escenario(nombre, *sesion, datos, rnd)
+
+    resultado = _resumir(args, 'http' if args.url else 'test_client', mezcla,
+                         *_medir(args, mezcla, sesiones, ejecutar))
+    if aplicacion is not None:
+        resultado['cache'] = aplicacion.cache.stats()
+        resultado['db_pool'] = aplicacion.db_pool.stats()
+        resultado['fragmentos'] = aplicacion.fragmentos.stats()
+    return resultado
+
+
+# --- SIN BASE ---
+class Indices:
+    """Los índices en memoria de la app, cargados con cuidadores sintéticos en lugar de la base."""
+
+    def __init__(self, cuidadores, semilla):
+        from jinja2 import Template
+
+        from fragmentos import FragmentCache
+        from indices import FacetIndex, GeoIndex, TextIndex
+
+        rnd = random.Random(semilla)
+        self.filas = [dict(fila, id=i + 1, rating=round(rnd.uniform(1, 5), 1), reseñas_total=rnd.randint(0, 50))
+                      for i, fila in enumerate(cuidadores_sinteticos(cuidadores, None, rnd))]
+        self.geo = GeoIndex(lambda: self.filas)
+        self.texto = TextIndex(lambda: self.filas)
+        self.facetas = FacetIndex(lambda: self.filas)
+        for indice in (self.geo, self.texto, self.facetas):
+            indice.asegurar()
+        self.fragmentos = FragmentCache(max_items=max(1, cuidadores // 2))
+        self.tarjeta = Template('<div class="cuidador-card" data-id="{{ c.id }}"><h5>{{ c.nombre }}</h5>'
+                                '<p>{{ c.descripcion }}</p><small>{{ c.ubicacion }}</small>'
+                                '{% for s in c.servicios %}<span>{{ s }}</span>{% endfor %}'
+                                '<span>{{ c.rating }} ({{ c.reseñas_total }})</span></div>')
+
+
+def escenario_sin_base(nombre, indices, rnd):
+    if nombre == 'busqueda':
+        consulta = rnd.choice([rnd.choice(LOCALIDADES)[0], rnd.choice(NOMBRES), rnd.choice(SERVICIOS)[:4]])
+        indices.texto.buscar(consulta, 50)
+    elif nombre == 'facetas':
+        indices.facetas.facetas(SERVICIOS, rnd.sample(SERVICIOS, rnd.randint(0, 2)))
+    elif nombre == 'cercanos':
+        _, lat, lng = rnd.choice(LOCALIDADES)
+        indices.geo.cercanos(lat, lng, rnd.choice([1, 5, 20]), 20)
+    elif nombre == 'clusters':
+        servicios = tuple(sorted(rnd.sample(SERVICIOS, rnd.randint(0, 1))))
+        indices.geo.clusters(rnd.randint(8, 14), -34.9, -58.6, -34.5, -58.1, servicios or None,
+                             (lambda: frozenset(indices.facetas.ids(servicios))) if servicios else None)
+    elif nombre == 'fragmentos':
+        for fila in rnd.sample(indices.filas, min(24, len(indices.filas))):
+            indices.fragmentos.obtener('tarjeta', fila, lambda c: indices.tarjeta.render(c=c))
+    else:
+        raise ValueError(nombre)
+    return 200, None, None
+
+
+def correr_sin_base(args):
+    indices = Indices(args.cuidadores, args.semilla)
+    mezcla = dict(ESCENARIOS_SIN_BASE)
+    resultado = _resumir(args, 'sin_base', mezcla,
+                         *_medir(args, mezcla, lambda rnd: indices, escenario_sin_base))
+    resultado['cuidadores'] = len(indices.filas)
+    resultado['fragmentos'] = indices.fragmentos.stats()
+    return resultado
+
+
+def _redondear(valor):
+    return round(valor, 2) if valor is not None else None
+
+
+# --- REPORTES ---
+def imprimir(resultado):
+    print(f"\n{resultado['modo']} · {resultado['hilos']} hilos · {resultado['duracion_s']}s")
+    print(f"{'endpoint':<10} {'reqs':>7} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errores':>8} {'consultas':>10} "
+          f"{'render ms':>10}")
+    for nombre, e in resultado['endpoints'].items():
+        print(f"{nombre:<10} {e['requests']:>7} {e['rps']:>8} {_celda(e['p50_ms'])} {_celda(e['p95_ms'])} "
+              f"{_celda(e['p99_ms'])} {e['errores']:>8} {_celda(e['consultas_por_request'], 10)} "
+              f"{_celda(e.get('render_cpu_ms'), 10)}")
+
+
+def _celda(valor, ancho=8):
+    return f"{'-' if valor is None else valor:>{ancho}}"
+
+
+def comparar(ruta_base, ruta_nueva):
+    with open(ruta_base, encoding='utf-8') as f:
+        base = json.load(f)
+    with open(ruta_nueva, encoding='utf-8') as f:
+        nueva = json.load(f)
+    print(f"{'endpoint':<10} {'métrica':<22} {'base':>10} {'nueva':>10} {'cambio':>9}")
+    for nombre, e in nueva['endpoints'].items():
+        anterior = base['endpoints'].get(nombre, {})
+        for metrica in ('rps', 'p50_ms', 'p95_ms', 'p99_ms', 'consultas_por_request', 'render_cpu_ms'):
+            a, b = anterior.get(metrica), e.get(metrica)
+            cambio = f"{(b - a) / a * 100:+.1f}%" if a and b is not None else '-'
+            print(f"{nombre:<10} {metrica:<22} {_celda(a, 10)} {_celda(b, 10)} {cambio:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sembrar', action='store_true', help='Carga datos sintéticos antes de medir.')
+    parser.add_argument('--solo-sembrar', action='store_true', help='Carga datos sintéticos y termina.')
+    parser.add_argument('--clientes', type=int, default=2000)
+    parser.add_argument('--cuidadores', type=int, default=500)
+    parser.add_argument('--reseñas', type=int, default=10000)
+    parser.add_argument('--mensajes', type=int, default=2000)
+    parser.add_argument('--lote', type=int, default=1000, help='Registros por transacción al sembrar.')
+    parser.add_argument('--hilos', type=int, default=8)
+    parser.add_argument('--duracion', type=float, default=20, help='Segundos de medición.')
+    parser.add_argument('--calentamiento', type=float, default=3, help='Segundos iniciales que no se miden.')
+    parser.add_argument('--url', help='Medir contra un servidor en marcha en lugar del test client.')
+    parser.add_argument('--sin-base', action='store_true',
+                        help='Mide solo los índices en memoria con datos sintéticos, sin MySQL (para CI).')
+    parser.add_argument('--escenarios', type=lambda valor: [v.strip() for v in valor.split(',') if v.strip()],
+                        default=list(ESCENARIOS), help=f"Escenarios a mezclar, separados por coma ({','.join(ESCENARIOS)}).")
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--guardar', nargs='?', const='', metavar='ARCHIVO',
+                        help=f'Guarda el resultado en JSON (por defecto en {os.path.relpath(RESULTADOS_DIR, RAIZ)}/).')
+    parser.add_argument('--comparar', nargs=2, metavar=('BASE', 'NUEVA'), help='Compara dos resultados guardados.')
+    args = parser.parse_args()
+    desconocidos = set(args.escenarios) - set(ESCENARIOS)
+    if desconocidos or not args.escenarios:
+        parser.error(f"escenarios desconocidos: {', '.join(sorted(desconocidos)) or '(ninguno)'}")
+
+    if args.comparar:
+        comparar(*args.comparar)
+        return
+    if args.sin_base:
+        if args.sembrar or args.solo_sembrar or args.url:
+            parser.error("--sin-base no usa la base ni un servidor: no se combina con --sembrar ni --url")
+        resultado = correr_sin_base(args)
+    else:
+        if args.sembrar or args.solo_sembrar:
+            sembrar(args)
+            if args.solo_sembrar:
+                return
+        resultado = correr(args)
+    imprimir(resultado)
+    if args.guardar is not None:
+        ruta = args.guardar or os.path.join(RESULTADOS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}-{resultado['modo']}.json")
+        os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+        with open(ruta, 'w', encoding='utf-8') as f:
+            json.dump(resultado, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 {ruta}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""
+Benchmark de hashing de contraseñas: cuántos logins por segundo y por núcleo soporta
+cada configuración de PASSWORD_METHOD.
+
+    python benchmarks/hashing.py
+    python benchmarks/hashing.py --method pbkdf2:sha256:600000 --method scrypt --workers 4
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from passwords import Hasher
+
+
+def medir(method, workers, logins, hilos):
+    hasher = Hasher(method=method, workers=workers, max_pendientes=max(64, hilos * 2))
+    password_hash = hasher.hashear('contraseña-de-prueba')
+    hasher.verificar(password_hash, 'contraseña-de-prueba')  # arranca el pool fuera de la medición
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        resultados = list(pool.map(lambda _: hasher.verificar(password_hash, 'contraseña-de-prueba'), range(logins)))
+    duracion = time.perf_counter() - inicio
+    hasher.shutdown()
+
+    assert all(resultados)
+    nucleos = workers or 1
+    return {
+        'method': hasher.metodo_actual,
+        'workers': workers,
+        'logins_s': logins / duracion,
+        'logins_s_nucleo': logins / duracion / nucleos,
+        'ms_por_login': duracion / logins * 1000 * nucleos,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--method', action='append', help='Método de werkzeug (repetible). Default: pbkdf2:sha256')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Procesos del pool de hashing.')
+    parser.add_argument('--logins', type=int, default=200, help='Verificaciones por medición.')
+    parser.add_argument('--hilos', type=int, default=16, help='Hilos concurrentes simulando requests.')
+    args = parser.parse_args()
+
+    print(f"{'método':<28} {'workers':>7} {'logins/s':>10} {'logins/s/núcleo':>16} {'ms/login':>9}")
+    for method in args.method or ['pbkdf2:sha256']:
+        # En línea (workers=0) y con el pool de procesos
+        for workers in sorted({0, args.workers}):
+            r = medir(method, workers, args.logins, args.hilos)
+            print(f"{r['method']:<28} {r['workers']:>7} {r['logins_s']:>10.1f} {r['logins_s_nucleo']:>16.1f} {r['ms_por_login']:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,307 @@
+import csv
+import json
+from itertools import islice
+
+from ratings import recalcular_agregados, validar_calificacion
+from servicios import registrar_en_catalogo
+
+# --- IMPORTACIÓN Y EXPORTACIÓN MASIVA ---
+# Los registros se leen y escriben de a uno y se procesan en lotes de `lote` filas,
+# así la memoria no depende del tamaño del archivo. Entre bases distintas los usuarios
+# se identifican por email, no por id.
+
+CONTRASEÑA_POR_DEFECTO = "default_password"
+SEPARADOR_SERVICIOS = '|'
+
+CAMPOS = {
+    'clientes': ['nombre', 'email', 'password', 'password_hash'],
+    'cuidadores': ['nombre', 'email', 'password', 'password_hash', 'descripcion', 'ubicacion',
+                   'lat', 'lng', 'foto', 'servicios', 'rating', 'reseñas_total'],
+    'reseñas': ['cuidador_email', 'cliente_email', 'texto', 'calificacion'],
+}
+
+
+def formato_de(ruta, formato=None):
+    if formato:
+        return formato
+    return 'csv' if ruta.lower().endswith('.csv') else 'jsonl'
+
+
+def en_lotes(registros, tamaño):
+    registros = iter(registros)
+    while True:
+        lote = list(islice(registros, tamaño))
+        if not lote:
+            return
+        yield lote
+
+
+def leer_registros(archivo, formato):
+    """Genera dicts desde un archivo CSV (servicios separados por '|') o JSONL."""
+    if formato == 'csv':
+        for fila in csv.DictReader(archivo):
+            servicios = fila.get('servicios')
+            if servicios is not None:
+                fila['servicios'] = [s for s in servicios.split(SEPARADOR_SERVICIOS) if s.strip()]
+            yield {clave: valor for clave, valor in fila.items() if valor != ''}
+    else:
+        for linea in archivo:
+            if linea.strip():
+                yield json.loads(linea)
+
+
+def escribir_registros(archivo, formato, campos, registros):
+    """Escribe los registros a medida que llegan y devuelve cuántos escribió."""
+    total = 0
+    if formato == 'csv':
+        escritor = csv.DictWriter(archivo, fieldnames=campos, extrasaction='ignore')
+        escritor.writeheader()
+        for registro in registros:
+            if isinstance(registro.get('servicios'), list):
+                registro = dict(registro, servicios=SEPARADOR_SERVICIOS.join(registro['servicios']))
+            escritor.writerow(registro)
+            total += 1
+    else:
+        for registro in registros:
+            archivo.write(json.dumps({c: registro.get(c) for c in campos if c in registro},
+                                     ensure_ascii=False, default=str) + '\n')
+            total += 1
+    return total
+
+
+def _flotante(valor):
+    return float(valor) if valor not in (None, '') else None
+
+
+# --- IMPORTACIÓN ---
+def _buscar_usuarios(cursor, emails):
+    cursor.execute(f"SELECT id, email, tipo_usuario FROM usuarios WHERE email IN ({', '.join(['%s'] * len(emails))})",
+                   emails)
+    return {row['email']: row for row in cursor.fetchall()}
+
+
+def _upsert_usuarios(cursor, filas, tipo, hasher):
+    """
+    Inserta los usuarios nuevos del lote y actualiza el nombre de los existentes de tipo `tipo`
+    (la contraseña solo si el archivo trae una). Los emails de usuarios de otro tipo (un admin,
+    un cliente en un archivo de cuidadores) no se tocan. Devuelve {email: id} de los de tipo `tipo`.
+    """
+    encontrados = _buscar_usuarios(cursor, [f['email'] for f in filas])
+    existentes = {email: row for email, row in encontrados.items() if row['tipo_usuario'] == tipo}
+    nuevos = [f for f in filas if f['email'] not in encontrados]
+    actualizables = [f for f in filas if f['email'] in existentes]
+
+    # Solo se hashea lo que se va a escribir: las contraseñas en claro del archivo y la inicial
+    # de los usuarios nuevos que no traen ninguna. Cada hash sale con su propio salt
+    a_hashear = [f for f in nuevos + actualizables if not f.get('password_hash')
+                 and (f.get('password') or f['email'] not in existentes)]
+    planos = [f.get('password') or CONTRASEÑA_POR_DEFECTO for f in a_hashear]
+    for fila, password_hash in zip(a_hashear, hasher.hashear_lote(planos)):
+        fila['password_hash'] = password_hash
+
+    if nuevos:
+        # Un alta concurrente con el mismo email gana: no se le pisa nada
+        cursor.executemany("""
+            INSERT INTO usuarios (nombre, email, password, tipo_usuario) VALUES (%s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE id = id
+        """, [(f['nombre'], f['email'], f['password_hash'], tipo) for f in nuevos])
+    con_password = [f for f in actualizables if f.get('password_hash')]
+    sin_password = [f for f in actualizables if not f.get('password_hash')]
+    if con_password:
+        cursor.executemany("UPDATE usuarios SET nombre = %s, password = %s WHERE email = %s AND tipo_usuario = %s",
+                           [(f['nombre'], f['password_hash'], f['email'], tipo) for f in con_password])
+    if sin_password:
+        cursor.executemany("UPDATE usuarios SET nombre = %s WHERE email = %s AND tipo_usuario = %s",
+                           [(f['nombre'], f['email'], tipo) for f in sin_password])
+
+    if nuevos:
+        existentes.update(_buscar_usuarios(cursor, [f['email'] for f in nuevos]))
+    return {email: row['id'] for email, row in existentes.items() if row['tipo_usuario'] == tipo}
+
+
+def _validos(lote, estadisticas):
+    filas = []
+    vistos = set()
+    for registro in lote:
+        email = (registro.get('email') or '').strip().lower()
+        nombre = (registro.get('nombre') or '').strip()
+        if not email or not nombre or email in vistos:
+            estadisticas['omitidos'] += 1
+            continue
+        vistos.add(email)
+        filas.append(dict(registro, email=email, nombre=nombre))
+    return filas
+
+
+def importar_clientes(conn, registros, hasher, lote=1000):
+    estadisticas = {'leidos': 0, 'importados': 0, 'omitidos': 0}
+    for registros_lote in en_lotes(registros, lote):
+        estadisticas['leidos'] += len(registros_lote)
+        filas = _validos(registros_lote, estadisticas)
+        if not filas:
+            continue
+        try:
+            with conn.cursor() as cursor:
+                ids = _upsert_usuarios(cursor, filas, 'cliente', hasher)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        estadisticas['importados'] += len(ids)
+        estadisticas['omitidos'] += len(filas) - len(ids)
+    return estadisticas
+
+
+def importar_cuidadores(conn, registros, hasher, lote=1000):
+    """
+    Crea o actualiza cuidadores con su perfil y servicios, un lote por transacción.
+    Los servicios de un cuidador importado se reemplazan por los del archivo.
+    """
+    estadisticas = {'leidos': 0, 'importados': 0, 'omitidos': 0}
+    for registros_lote in en_lotes(registros, lote):
+        estadisticas['leidos'] += len(registros_lote)
+        filas = _validos(registros_lote, estadisticas)
+        if not filas:
+            continue
+        validas = len(filas)
+        try:
+            with conn.cursor() as cursor:
+                # Un email que ya pertenece a un cliente o admin no se convierte en cuidador
+                ids = _upsert_usuarios(cursor, filas, 'cuidador', hasher)
+                filas = [f for f in filas if f['email'] in ids]
+                if filas:
+                    cursor.executemany("""
+                        INSERT INTO cuidadores (usuario_id, descripcion, ubicacion, lat, lng, foto)
+                        VALUES (%s, %s, %s, %s, %s, %s)
+                        ON DUPLICATE KEY UPDATE descripcion = VALUES(descripcion), ubicacion = VALUES(ubicacion),
+                                                lat = VALUES(lat), lng = VALUES(lng), foto = COALESCE(VALUES(foto), foto)
+                    """, [(ids[f['email']], f.get('descripcion', ''), f.get('ubicacion', ''),
+                           _flotante(f.get('lat')), _flotante(f.get('lng')), f.get('foto')) for f in filas])
+
+                    cuidador_ids = [ids[f['email']] for f in filas]
+                    cursor.execute(f"DELETE FROM servicios_cuidadores WHERE cuidador_id IN ({', '.join(['%s'] * len(cuidador_ids))})",
+                                   cuidador_ids)
+                    servicios = [(ids[f['email']], servicio.strip())
+                                 for f in filas
+                                 for servicio in dict.fromkeys(f.get('servicios') or [])
+                                 if servicio and servicio.strip()]
+                    if servicios:
+                        registrar_en_catalogo(cursor, [servicio for _, servicio in servicios])
+                        cursor.executemany("INSERT INTO servicios_cuidadores (cuidador_id, servicio) VALUES (%s, %s)",
+                                           servicios)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        estadisticas['importados'] += len(filas)
+        estadisticas['omitidos'] += validas - len(filas)
+    return estadisticas
+
+
+def importar_reseñas(conn, registros, lote=1000):
+    """
+    Agrega reseñas (no deduplica: importar dos veces el mismo archivo las duplica) y
+    recalcula en la misma transacción los agregados de los cuidadores afectados.
+    """
+    estadisticas = {'leidos': 0, 'importados': 0, 'omitidos': 0}
+    for registros_lote in en_lotes(registros, lote):
+        estadisticas['leidos'] += len(registros_lote)
+        emails = {(r.get(campo) or '').strip().lower()
+                  for r in registros_lote for campo in ('cuidador_email', 'cliente_email')} - {''}
+        try:
+            with conn.cursor() as cursor:
+                ids = {}
+                if emails:
+                    cursor.execute(f"SELECT id, email, tipo_usuario FROM usuarios WHERE email IN ({', '.join(['%s'] * len(emails))})",
+                                   list(emails))
+                    ids = {(row['email'], row['tipo_usuario']): row['id'] for row in cursor.fetchall()}
+
+                filas = []
+                for r in registros_lote:
+                    cuidador_id = ids.get(((r.get('cuidador_email') or '').strip().lower(), 'cuidador'))
+                    cliente_id = ids.get(((r.get('cliente_email') or '').strip().lower(), 'cliente'))
+                    try:
+                        calificacion = validar_calificacion(r.get('calificacion'))
+                    except (TypeError, ValueError):
+                        calificacion = None
+                    if cuidador_id is None or cliente_id is None or calificacion is None:
+                        estadisticas['omitidos'] += 1
+                        continue
+                    filas.append((cuidador_id, cliente_id, r.get('texto', ''), calificacion))
+
+                if filas:
+                    cursor.executemany("INSERT INTO reseñas (cuidador_id, cliente_id, texto, calificacion) VALUES (%s, %s, %s, %s)",
+                                       filas)
+                    recalcular_agregados(cursor, ids={fila[0] for fila in filas})
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        estadisticas['importados'] += len(filas)
+    return estadisticas
+
+
+# --- EXPORTACIÓN ---
+# Paginación por id: cada lote es una consulta corta sobre la PK, sin cursores abiertos en el servidor
+
+def _por_lotes(conn, sql, lote):
+    ultimo_id = 0
+    while True:
+        with conn.cursor() as cursor:
+            cursor.execute(sql, (ultimo_id, lote))
+            filas = cursor.fetchall()
+        if not filas:
+            return
+        yield from filas
+        ultimo_id = filas[-1]['id']
+
+
+def exportar_clientes(conn, lote=1000, con_hashes=False):
+    for fila in _por_lotes(conn, """
+            SELECT id, nombre, email, password AS password_hash FROM usuarios
+            WHERE tipo_usuario = 'cliente' AND id > %s ORDER BY id LIMIT %s""", lote):
+        if not con_hashes:
+            fila.pop('password_hash')
+        yield fila
+
+
+def exportar_cuidadores(conn, lote=1000, con_hashes=False):
+    for fila in _por_lotes(conn, f"""
+            SELECT u.id, u.nombre, u.email, u.password AS password_hash, c.descripcion, c.ubicacion, c.lat, c.lng,
+                   c.foto, c.rating, c.reseñas_total,
+                   GROUP_CONCAT(s.servicio ORDER BY s.id SEPARATOR '{SEPARADOR_SERVICIOS}') AS servicios
+            FROM usuarios u
+            JOIN cuidadores c ON u.id = c.usuario_id
+            LEFT JOIN servicios_cuidadores s ON u.id = s.cuidador_id
+            WHERE u.tipo_usuario = 'cuidador' AND u.id > %s
+            GROUP BY u.id
+            ORDER BY u.id
+            LIMIT %s""", lote):
+        if not con_hashes:
+            fila.pop('password_hash')
+        fila['servicios'] = fila['servicios'].split(SEPARADOR_SERVICIOS) if fila['servicios'] else []
+        yield fila
+
+
+def exportar_reseñas(conn, lote=1000, con_hashes=False):
+    return _por_lotes(conn, """
+        SELECT r.id, cu.email AS cuidador_email, cl.email AS cliente_email, r.texto, r.calificacion
+        FROM reseñas r
+        JOIN usuarios cu ON r.cuidador_id = cu.id
+        JOIN usuarios cl ON r.cliente_id = cl.id
+        WHERE r.id > %s
+        ORDER BY r.id
+        LIMIT %s""", lote)
+
+
+IMPORTADORES = {
+    'clientes': lambda conn, registros, hasher, lote: importar_clientes(conn, registros, hasher, lote),
+    'cuidadores': lambda conn, registros, hasher, lote: importar_cuidadores(conn, registros, hasher, lote),
+    'reseñas': lambda conn, registros, hasher, lote: importar_reseñas(conn, registros, lote),
+}
+
+EXPORTADORES = {
+    'clientes': exportar_clientes,
+    'cuidadores': exportar_cuidadores,
+    'reseñas': exportar_reseñas,
+}
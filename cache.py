@@ -0,0 +1,209 @@
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+_FALTA = object()
+
+
+class _BaseCache:
+    def __init__(self, default_ttl):
+        self.default_ttl = default_ttl
+        self._contadores_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _contar(self, hit):
+        with self._contadores_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get_or_set(self, key, fn, ttl=None):
+        """Lectura a través del cache: si `key` no está, calcula `fn()` y lo guarda."""
+        valor = self.get(key, _FALTA)
+        if valor is not _FALTA:
+            return valor
+        valor = fn()
+        self.set(key, valor, ttl)
+        return valor
+
+    def get_many(self, keys):
+        """{clave: valor} de las claves presentes; las que faltan no aparecen."""
+        encontrados = {}
+        for key in keys:
+            valor = self.get(key, _FALTA)
+            if valor is not _FALTA:
+                encontrados[key] = valor
+        return encontrados
+
+    def set_many(self, valores, ttl=None):
+        for key, value in valores.items():
+            self.set(key, value, ttl)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'backend': self.backend,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 4) if total else None,
+            'default_ttl': self.default_ttl,
+        }
+
+
+class MemoryCache(_BaseCache):
+    """
+    Cache LRU en memoria del proceso, con TTL por entrada y tope de `max_items`.
+
+    Los contadores de `incr` se guardan aparte y no se desalojan, porque se usan
+    como generaciones para invalidar grupos de claves: son pocas claves fijas, no
+    hay que usarlos con claves que dependan de los datos.
+    """
+    backend = 'memory'
+
+    def __init__(self, max_items=2048, default_ttl=60):
+        super().__init__(default_ttl)
+        self.max_items = max_items
+        self._datos = OrderedDict()
+        self._contadores = {}
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entrada = self._datos.get(key)
+            if entrada is not None:
+                vence, valor = entrada
+                if vence is None or vence > time.monotonic():
+                    self._datos.move_to_end(key)
+                    self._contar(True)
+                    return valor
+                del self._datos[key]
+        self._contar(False)
+        return default
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        vence = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._datos[key] = (vence, value)
+            self._datos.move_to_end(key)
+            while len(self._datos) > self.max_items:
+                self._datos.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._datos.pop(key, None)
+
+    def incr(self, key, amount=1):
+        with self._lock:
+            self._contadores[key] = self._contadores.get(key, 0) + amount
+            return self._contadores[key]
+
+    def get_counter(self, key):
+        with self._lock:
+            return self._contadores.get(key, 0)
+
+    def clear(self):
+        with self._lock:
+            self._datos.clear()
+
+    def stats(self):
+        datos = super().stats()
+        with self._lock:
+            datos.update({'items': len(self._datos), 'max_items': self.max_items, 'evictions': self.evictions})
+        return datos
+
+
+def _milisegundos(ttl):
+    # En milisegundos: con `ex` en segundos enteros un TTL menor a 1 quedaría en 0, sin vencimiento
+    return max(1, int(ttl * 1000)) if ttl else None
+
+
+def _serializar(valor):
+    # pickle y no JSON: un hit tiene que devolver los mismos tipos que el miss (Decimal de rating,
+    # lat y lng, datetime de las reseñas, tuplas, Markup). El servidor Redis tiene que ser privado
+    return pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _deserializar(crudo):
+    try:
+        return pickle.loads(crudo)
+    except Exception:
+        # Valor en otro formato (p. ej. el JSON de una versión anterior): cuenta como miss
+        return _FALTA
+
+
+class RedisCache(_BaseCache):
+    """Cache compartido entre workers sobre un servidor compatible con Redis. Los valores se guardan con pickle."""
+    backend = 'redis'
+
+    def __init__(self, url, default_ttl=60, prefix='petcare:'):
+        import redis
+        super().__init__(default_ttl)
+        self.prefix = prefix
+        self._redis = redis.Redis.from_url(url)
+
+    def get(self, key, default=None):
+        crudo = self._redis.get(self.prefix + key)
+        valor = _FALTA if crudo is None else _deserializar(crudo)
+        self._contar(valor is not _FALTA)
+        return default if valor is _FALTA else valor
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        self._redis.set(self.prefix + key, _serializar(value), px=_milisegundos(ttl))
+
+    def get_many(self, keys):
+        # Una sola ida y vuelta al servidor para todo el lote
+        keys = list(keys)
+        if not keys:
+            return {}
+        encontrados = {}
+        for key, crudo in zip(keys, self._redis.mget([self.prefix + key for key in keys])):
+            valor = _FALTA if crudo is None else _deserializar(crudo)
+            self._contar(valor is not _FALTA)
+            if valor is not _FALTA:
+                encontrados[key] = valor
+        return encontrados
+
+    def set_many(self, valores, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        with self._redis.pipeline(transaction=False) as pipe:
+            for key, value in valores.items():
+                pipe.set(self.prefix + key, _serializar(value), px=_milisegundos(ttl))
+            pipe.execute()
+
+    def delete(self, *keys):
+        if keys:
+            self._redis.delete(*(self.prefix + key for key in keys))
+
+    def incr(self, key, amount=1):
+        return int(self._redis.incrby(self.prefix + 'counter:' + key, amount))
+
+    def get_counter(self, key):
+        return int(self._redis.get(self.prefix + 'counter:' + key) or 0)
+
+    def clear(self):
+        for key in self._redis.scan_iter(self.prefix + '*'):
+            if not key.startswith((self.prefix + 'counter:').encode()):
+                self._redis.delete(key)
+
+
+def crear_cache():
+    """
+    Crea el cache según CACHE_BACKEND ('memory' por defecto o 'redis' con CACHE_URL).
+
+    'memory' es por worker: las invalidaciones solo llegan al worker que escribió y los CLI
+    (importar) no llegan a ninguno. Con varios workers conviene 'redis'.
+    """
+    ttl = float(os.getenv("CACHE_TTL", 60))
+    if os.getenv("CACHE_BACKEND", "memory").lower() == "redis":
+        return RedisCache(os.getenv("CACHE_URL", "redis://localhost:6379/0"), default_ttl=ttl,
+                          prefix=os.getenv("CACHE_PREFIX", "petcare:"))
+    return MemoryCache(max_items=int(os.getenv("CACHE_MAX_ITEMS", 2048)), default_ttl=ttl)
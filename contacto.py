@@ -0,0 +1,217 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+import pymysql
+
+logger = logging.getLogger(__name__)
+
+SQL_INSERTAR_MENSAJES = "INSERT INTO mensajes_contacto (nombre, email, asunto, mensaje) VALUES (%s, %s, %s, %s)"
+
+# contacto-<pid>.jsonl es el archivo abierto de un worker; contacto-<pid>-<n>.enviando, un lote
+# apartado para insertar. El pid dice de qué proceso es, para recuperar los de workers muertos
+_ARCHIVO = re.compile(r'^contacto-(\d+)(?:\.jsonl|-\d+\.enviando)$')
+
+
+def _proceso_vivo(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class ContactoBuffer:
+    """
+    Escritura diferida de los mensajes del formulario de contacto.
+
+    `agregar` anota el mensaje al final del archivo del worker en `carpeta` y devuelve
+    enseguida; un hilo de fondo los inserta en mensajes_contacto con INSERT multi-fila
+    cuando se juntan `lote` mensajes o pasan `intervalo` segundos. El archivo se borra recién
+    después del commit, así que un worker que se reinicia no pierde mensajes: al arrancar, el
+    hilo inserta los archivos que dejaron procesos que ya no existen. La garantía es "al menos
+    una vez": si el proceso muere entre el commit y el borrado, ese lote se inserta dos veces.
+    """
+
+    def __init__(self, db_pool, carpeta, lote=100, intervalo=1.0, fsync=False, al_guardar=None):
+        self.db_pool = db_pool
+        self.carpeta = carpeta
+        self.lote = lote
+        self.intervalo = intervalo
+        self.fsync = fsync
+        self.al_guardar = al_guardar
+
+        self._pendientes = 0
+        self._archivo = None
+        self._secuencia = 0
+        self._cond = threading.Condition()
+        self._hilo = None
+        self._pid = None
+        self._cerrando = False
+        self._stats = {'recibidos': 0, 'guardados': 0, 'lotes': 0, 'errores': 0, 'rechazados': 0, 'recuperados': 0}
+
+    # --- ARCHIVOS ---
+    def _ruta_abierta(self):
+        return os.path.join(self.carpeta, f"contacto-{self._pid}.jsonl")
+
+    def _apartar(self, ruta):
+        # Renombrar es atómico: si dos procesos quieren el mismo archivo, solo uno lo consigue
+        self._secuencia += 1
+        destino = os.path.join(self.carpeta, f"contacto-{self._pid}-{self._secuencia}.enviando")
+        try:
+            os.rename(ruta, destino)
+        except FileNotFoundError:
+            return None
+        return destino
+
+    def _leer(self, ruta):
+        mensajes = []
+        with open(ruta, encoding='utf-8') as f:
+            for linea in f:
+                try:
+                    mensajes.append(tuple(json.loads(linea)))
+                except ValueError:
+                    # Última línea a medio escribir de un proceso que murió
+                    logger.warning("Línea inválida descartada en %s", ruta)
+        return mensajes
+
+    def _huerfanos(self):
+        """Archivos de procesos que ya no existen (o de un proceso anterior con nuestro mismo pid)."""
+        for nombre in sorted(os.listdir(self.carpeta)):
+            encontrado = _ARCHIVO.match(nombre)
+            if not encontrado:
+                continue
+            pid = int(encontrado.group(1))
+            if pid == self._pid or not _proceso_vivo(pid):
+                yield os.path.join(self.carpeta, nombre)
+
+    # --- HILO DE FONDO ---
+    def _arrancar(self):
+        # Tras un fork (gunicorn --preload) el hilo y el archivo del proceso padre no existen acá
+        pid = os.getpid()
+        if self._pid == pid and self._hilo is not None:
+            return
+        self._pid = pid
+        self._archivo = None
+        self._pendientes = 0
+        os.makedirs(self.carpeta, exist_ok=True)
+        self._recuperar()
+        self._hilo = threading.Thread(target=self._correr, name='contacto-buffer', daemon=True)
+        self._hilo.start()
+
+    def _recuperar(self):
+        for ruta in list(self._huerfanos()):
+            apartado = self._apartar(ruta)
+            if apartado is not None:
+                self._stats['recuperados'] += len(self._leer(apartado))
+
+    def _correr(self):
+        while True:
+            with self._cond:
+                limite = time.monotonic() + self.intervalo
+                while self._pendientes < self.lote and not self._cerrando:
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        break
+                    self._cond.wait(restante)
+                cerrando = self._cerrando
+                self._cortar()
+            self._enviar_apartados()
+            if cerrando:
+                return
+
+    def _cortar(self):
+        # Con el lock tomado: aparta el archivo abierto para que los mensajes nuevos vayan a otro
+        if self._archivo is None:
+            return
+        self._archivo.close()
+        self._archivo = None
+        self._pendientes = 0
+        self._apartar(self._ruta_abierta())
+
+    def _enviar_apartados(self):
+        prefijo = f"contacto-{self._pid}-"
+        for nombre in sorted(os.listdir(self.carpeta), key=lambda n: (len(n), n)):
+            if not (nombre.startswith(prefijo) and nombre.endswith('.enviando')):
+                continue
+            ruta = os.path.join(self.carpeta, nombre)
+            try:
+                guardados = self._insertar(self._leer(ruta))
+            except (pymysql.err.DataError, pymysql.err.IntegrityError) as e:
+                # Reintentar no lo va a arreglar: se deja aparte para revisarlo a mano
+                self._stats['rechazados'] += 1
+                logger.error("Lote de contacto rechazado por la base (%s); queda en %s.rechazado", e, ruta)
+                os.rename(ruta, ruta + '.rechazado')
+                continue
+            except Exception:
+                # Queda el archivo: se reintenta en la próxima vuelta
+                self._stats['errores'] += 1
+                logger.exception("Error guardando mensajes de contacto; se reintenta en %ss", self.intervalo)
+                return
+            os.unlink(ruta)
+            if guardados and self.al_guardar:
+                self.al_guardar(guardados)
+
+    def _insertar(self, mensajes):
+        if not mensajes:
+            return 0
+        conn = self.db_pool.acquire()
+        try:
+            with conn.cursor() as cursor:
+                # executemany junta las filas en INSERTs multi-fila
+                for inicio in range(0, len(mensajes), self.lote):
+                    cursor.executemany(SQL_INSERTAR_MENSAJES, mensajes[inicio:inicio + self.lote])
+                    self._stats['lotes'] += 1
+            conn.commit()
+        except Exception:
+            self.db_pool.release(conn, discard=True)
+            raise
+        self.db_pool.release(conn)
+        self._stats['guardados'] += len(mensajes)
+        return len(mensajes)
+
+    # --- API PÚBLICA ---
+    def agregar(self, nombre, email, asunto, mensaje):
+        """Anota el mensaje en disco y vuelve; se inserta en la base en el próximo lote."""
+        linea = json.dumps([nombre, email, asunto, mensaje], ensure_ascii=False) + '\n'
+        with self._cond:
+            self._arrancar()
+            if self._archivo is None:
+                self._archivo = open(self._ruta_abierta(), 'a', encoding='utf-8')
+            self._archivo.write(linea)
+            # Al sistema operativo en cada mensaje: sobrevive a que muera el proceso.
+            # Con fsync también a que se caiga la máquina, a costa de un acceso a disco por mensaje
+            self._archivo.flush()
+            if self.fsync:
+                os.fsync(self._archivo.fileno())
+            self._pendientes += 1
+            self._stats['recibidos'] += 1
+            if self._pendientes >= self.lote:
+                self._cond.notify()
+
+    def iniciar(self):
+        """Arranca el hilo en este proceso (y recupera lo que dejaron workers anteriores) si no está corriendo."""
+        if self._pid == os.getpid():
+            return
+        with self._cond:
+            self._arrancar()
+
+    def cerrar(self, timeout=10):
+        """Inserta lo pendiente y detiene el hilo. Lo que no se pueda insertar queda en disco."""
+        with self._cond:
+            if self._hilo is None or self._pid != os.getpid():
+                return
+            self._cerrando = True
+            self._cond.notify()
+        self._hilo.join(timeout)
+
+    def stats(self):
+        with self._cond:
+            datos = dict(self._stats)
+            datos.update({'pendientes': self._pendientes, 'lote': self.lote, 'intervalo': self.intervalo})
+        return datos
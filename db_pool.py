@@ -0,0 +1,301 @@
+import os
+import threading
+import time
+from collections import deque
+
+
+class PoolAgotado(Exception):
+    """No se pudo obtener una conexión libre dentro del tiempo de espera."""
+
+
+class _Entrada:
+    __slots__ = ('conn', 'creada', 'devuelta')
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.creada = time.monotonic()
+        self.devuelta = self.creada
+
+
+class ConnectionPool:
+    """
+    Pool acotado de conexiones PyMySQL para un proceso (un worker de gunicorn).
+
+    Las conexiones se crean con `factory` de forma perezosa, se reutilizan en
+    orden LIFO y se descartan cuando superan el tiempo ocioso o la vida máxima.
+    """
+
+    def __init__(self, factory, min_size=0, max_size=10, idle_timeout=300,
+                 max_lifetime=3600, ping_on_borrow=True, timeout=10):
+        if max_size < 1:
+            raise ValueError("max_size debe ser al menos 1")
+        self.factory = factory
+        self.min_size = min(min_size, max_size)
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.max_lifetime = max_lifetime
+        self.ping_on_borrow = ping_on_borrow
+        self.timeout = timeout
+
+        self._libres = deque()
+        self._en_uso = {}
+        self._cond = threading.Condition()
+        self._pid = None
+        self._stats = {
+            'creadas': 0,
+            'reutilizadas': 0,
+            'descartadas': 0,
+            'ping_fallidos': 0,
+            'esperas': 0,
+            'timeouts': 0,
+            'espera_total_ms': 0.0,
+        }
+
+    # --- CICLO DE VIDA DE LAS CONEXIONES ---
+    def _crear(self):
+        entrada = _Entrada(self.factory())
+        self._stats['creadas'] += 1
+        return entrada
+
+    def _cerrar(self, entrada):
+        self._stats['descartadas'] += 1
+        try:
+            entrada.conn.close()
+        except Exception:
+            pass
+
+    def _vencida(self, entrada, ahora):
+        if self.max_lifetime and ahora - entrada.creada > self.max_lifetime:
+            return True
+        if self.idle_timeout and ahora - entrada.devuelta > self.idle_timeout:
+            return True
+        return False
+
+    def _revisar_fork(self):
+        # Tras un fork (gunicorn --preload) las conexiones heredadas no se pueden compartir.
+        pid = os.getpid()
+        if self._pid != pid:
+            self._libres.clear()
+            self._en_uso.clear()
+            self._pid = pid
+
+    def _precalentar(self):
+        while len(self._libres) + len(self._en_uso) < self.min_size:
+            self._libres.append(self._crear())
+
+    # --- API PÚBLICA ---
+    def acquire(self):
+        inicio = time.monotonic()
+        limite = inicio + self.timeout if self.timeout else None
+        with self._cond:
+            self._revisar_fork()
+            self._precalentar()
+            while True:
+                ahora = time.monotonic()
+                while self._libres:
+                    entrada = self._libres.pop()
+                    if self._vencida(entrada, ahora):
+                        self._cerrar(entrada)
+                        continue
+                    self._en_uso[id(entrada.conn)] = entrada
+                    self._stats['reutilizadas'] += 1
+                    break
+                else:
+                    entrada = None
+
+                if entrada is None and len(self._en_uso) < self.max_size:
+                    # Reservamos el lugar antes de conectar para no superar max_size
+                    marcador = object()
+                    self._en_uso[id(marcador)] = marcador
+                    self._cond.release()
+                    try:
+                        entrada = self._crear()
+                    finally:
+                        self._cond.acquire()
+                        del self._en_uso[id(marcador)]
+                    self._en_uso[id(entrada.conn)] = entrada
+
+                if entrada is not None:
+                    break
+
+                self._stats['esperas'] += 1
+                restante = None if limite is None else limite - time.monotonic()
+                if restante is not None and restante <= 0:
+                    self._stats['timeouts'] += 1
+                    raise PoolAgotado(f"Sin conexiones libres tras {self.timeout}s (max_size={self.max_size})")
+                self._cond.wait(restante)
+
+            self._stats['espera_total_ms'] += (time.monotonic() - inicio) * 1000
+
+        if self.ping_on_borrow:
+            try:
+                entrada.conn.ping(reconnect=False)
+            except Exception:
+                with self._cond:
+                    self._stats['ping_fallidos'] += 1
+                    self._en_uso.pop(id(entrada.conn), None)
+                    self._cerrar(entrada)
+                    self._cond.notify()
+                return self.acquire()
+        return entrada.conn
+
+    def release(self, conn, discard=False):
+        # Descartamos cualquier transacción abierta para no filtrar estado entre requests
+        if not discard:
+            try:
+                conn.rollback()
+            except Exception:
+                discard = True
+
+        with self._cond:
+            entrada = self._en_uso.pop(id(conn), None)
+            if entrada is None:
+                # Conexión de otro proceso o ya devuelta
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+                return
+            entrada.devuelta = time.monotonic()
+            if discard or self._vencida(entrada, entrada.devuelta):
+                self._cerrar(entrada)
+            else:
+                self._libres.append(entrada)
+            self._cond.notify()
+
+    def close(self):
+        with self._cond:
+            while self._libres:
+                self._cerrar(self._libres.pop())
+
+    def stats(self):
+        with self._cond:
+            datos = dict(self._stats)
+            datos.update({
+                'libres': len(self._libres),
+                'en_uso': len(self._en_uso),
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'idle_timeout': self.idle_timeout,
+                'max_lifetime': self.max_lifetime,
+                'ping_on_borrow': self.ping_on_borrow,
+            })
+        datos['espera_total_ms'] = round(datos['espera_total_ms'], 2)
+        return datos
+
+
+class _Replica:
+    __slots__ = ('nombre', 'pool', 'sana', 'proximo_chequeo', 'retraso', 'fallos', 'ultimo_error')
+
+    def __init__(self, nombre, pool):
+        self.nombre = nombre
+        self.pool = pool
+        self.sana = True
+        self.proximo_chequeo = 0.0
+        self.retraso = None
+        self.fallos = 0
+        self.ultimo_error = None
+
+
+class ReplicaSet:
+    """
+    Pools de lectura sobre réplicas de MySQL, repartidos en round-robin.
+
+    Cada `intervalo_chequeo` segundos una réplica se verifica al tomarle una conexión (el ping
+    lo hace su pool; con `max_retraso` además se mira el atraso de la replicación). Una réplica
+    que no conecta o está atrasada queda fuera `reintento` segundos. Si no queda ninguna sana,
+    `acquire` devuelve None y el llamador lee del primario.
+    """
+
+    def __init__(self, factories, intervalo_chequeo=5, reintento=30, max_retraso=None, **pool_kwargs):
+        self.replicas = [_Replica(nombre, ConnectionPool(factory, **pool_kwargs)) for nombre, factory in factories]
+        self.intervalo_chequeo = intervalo_chequeo
+        self.reintento = reintento
+        self.max_retraso = max_retraso
+        self._siguiente = 0
+        self._lock = threading.Lock()
+        self._stats = {'lecturas': 0, 'sin_replicas': 0}
+
+    def __len__(self):
+        return len(self.replicas)
+
+    def _turno(self):
+        # Orden de prueba de esta lectura: empieza en la siguiente del round-robin
+        with self._lock:
+            inicio = self._siguiente
+            self._siguiente = (self._siguiente + 1) % len(self.replicas)
+        return self.replicas[inicio:] + self.replicas[:inicio]
+
+    def _marcar_caida(self, replica, error):
+        replica.sana = False
+        replica.fallos += 1
+        replica.ultimo_error = str(error)[:200]
+        replica.proximo_chequeo = time.monotonic() + self.reintento
+
+    def _retraso(self, conn):
+        # SHOW REPLICA STATUS existe desde MySQL 8.0.22; antes, y en MariaDB, es SHOW SLAVE STATUS
+        with conn.cursor() as cursor:
+            for sql, columna in (("SHOW REPLICA STATUS", 'Seconds_Behind_Source'),
+                                 ("SHOW SLAVE STATUS", 'Seconds_Behind_Master')):
+                try:
+                    cursor.execute(sql)
+                except Exception:
+                    continue
+                fila = cursor.fetchone()
+                # Sin fila no es una réplica; con NULL la replicación está detenida
+                return float('inf') if not fila or fila.get(columna) is None else float(fila[columna])
+        return float('inf')
+
+    def acquire(self):
+        """(pool, conexión) de la próxima réplica sana, o None si no hay ninguna disponible."""
+        ahora = time.monotonic()
+        for replica in self._turno():
+            if not replica.sana and ahora < replica.proximo_chequeo:
+                continue
+            try:
+                conn = replica.pool.acquire()
+            except PoolAgotado:
+                # Está ocupada, no caída: se prueba la siguiente
+                continue
+            except Exception as e:
+                self._marcar_caida(replica, e)
+                continue
+
+            if not replica.sana or ahora >= replica.proximo_chequeo:
+                try:
+                    replica.retraso = self._retraso(conn) if self.max_retraso is not None else None
+                except Exception as e:
+                    replica.pool.release(conn, discard=True)
+                    self._marcar_caida(replica, e)
+                    continue
+                if replica.retraso is not None and replica.retraso > self.max_retraso:
+                    replica.pool.release(conn)
+                    self._marcar_caida(replica, f"Atraso de {replica.retraso}s")
+                    continue
+                replica.sana = True
+                replica.proximo_chequeo = ahora + self.intervalo_chequeo
+
+            with self._lock:
+                self._stats['lecturas'] += 1
+            return replica.pool, conn
+
+        with self._lock:
+            self._stats['sin_replicas'] += 1
+        return None
+
+    def close(self):
+        for replica in self.replicas:
+            replica.pool.close()
+
+    def stats(self):
+        with self._lock:
+            datos = dict(self._stats)
+        datos['replicas'] = [{
+            'nombre': replica.nombre,
+            'sana': replica.sana,
+            'retraso_s': replica.retraso,
+            'fallos': replica.fallos,
+            'ultimo_error': replica.ultimo_error,
+            'pool': replica.pool.stats(),
+        } for replica in self.replicas]
+        return datos
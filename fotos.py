@@ -0,0 +1,160 @@
+import logging
+import os
+import tempfile
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from boto3.s3.transfer import TransferConfig
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Variantes que se generan por foto: (ancho, alto, recortar al tamaño exacto)
+VARIANTES = {
+    'card': (600, 400, True),
+    'popup': (160, 160, True),
+    'full': (1600, 1600, False),
+}
+
+
+class FotoDemasiadoGrande(ValueError):
+    pass
+
+
+def foto_variante(url, variante):
+    """URL de una variante a partir de la URL `full` guardada en cuidadores.foto."""
+    if url and url.endswith('/full.jpg'):
+        return url[:-len('full.jpg')] + f'{variante}.jpg'
+    return url
+
+
+class FotoPipeline:
+    """
+    Procesa las fotos de perfil fuera del hilo del request.
+
+    `guardar_temporal` copia el archivo subido a disco por bloques, cortando en cuanto
+    supera `max_bytes`; `encolar` agenda el procesamiento y devuelve enseguida. Un pool
+    de hilos sube el original por partes (multipart por encima de `multipart_threshold`),
+    genera las variantes, las sube con un único cliente S3 compartido y actualiza
+    cuidadores.foto con la URL de la variante `full`.
+    """
+
+    def __init__(self, client_factory, db_pool, bucket, url_publica, max_workers=2, al_terminar=None,
+                 max_bytes=10 * 1024 * 1024, chunk_size=8 * 1024 * 1024, multipart_threshold=8 * 1024 * 1024):
+        self.client_factory = client_factory
+        self.db_pool = db_pool
+        self.bucket = bucket
+        self.url_publica = url_publica.rstrip('/') if url_publica else url_publica
+        self.max_workers = max_workers
+        self.al_terminar = al_terminar
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        # Memoria por subida acotada a chunk_size * max_concurrency, sin importar el tamaño del archivo
+        self.transfer_config = TransferConfig(multipart_threshold=multipart_threshold,
+                                              multipart_chunksize=chunk_size,
+                                              max_concurrency=2,
+                                              io_chunksize=min(chunk_size, 256 * 1024))
+        self._client = None
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        # Los clientes de boto3 son thread-safe: uno por proceso alcanza
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self.client_factory()
+        return self._client
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='fotos')
+        return self._executor
+
+    def guardar_temporal(self, archivo):
+        """Copia `archivo` (un FileStorage) a un temporal por bloques. Lanza FotoDemasiadoGrande si supera max_bytes."""
+        fd, ruta = tempfile.mkstemp(prefix='foto-', suffix=os.path.splitext(archivo.filename or '')[1][:10])
+        try:
+            total = 0
+            with os.fdopen(fd, 'wb') as destino:
+                while True:
+                    bloque = archivo.stream.read(min(self.chunk_size, 1024 * 1024))
+                    if not bloque:
+                        break
+                    total += len(bloque)
+                    if self.max_bytes and total > self.max_bytes:
+                        raise FotoDemasiadoGrande(f"La foto supera el máximo de {self.max_bytes // (1024 * 1024)} MB.")
+                    destino.write(bloque)
+        except Exception:
+            os.unlink(ruta)
+            raise
+        return ruta
+
+    def descartar(self, ruta):
+        if ruta and os.path.exists(ruta):
+            os.unlink(ruta)
+
+    def encolar(self, usuario_id, ruta):
+        """Agenda el procesamiento del temporal `ruta`, que pasa a ser del pipeline. Devuelve un Future."""
+        return self._get_executor().submit(self._procesar, usuario_id, ruta)
+
+    def _variantes(self, ruta):
+        with Image.open(ruta) as original:
+            # En JPEG decodifica directamente a escala reducida: no carga la imagen completa en memoria
+            ancho_max = max(ancho for ancho, _, _ in VARIANTES.values())
+            original.draft('RGB', (ancho_max, ancho_max))
+            imagen = ImageOps.exif_transpose(original).convert('RGB')
+        for nombre, (ancho, alto, recortar) in VARIANTES.items():
+            if recortar:
+                variante = ImageOps.fit(imagen, (ancho, alto), Image.LANCZOS)
+            else:
+                variante = imagen.copy()
+                variante.thumbnail((ancho, alto), Image.LANCZOS)
+            buffer = BytesIO()
+            variante.save(buffer, 'JPEG', quality=85, optimize=True, progressive=True)
+            buffer.seek(0)
+            yield nombre, buffer
+
+    def _procesar(self, usuario_id, ruta):
+        try:
+            # Prefijo nuevo en cada subida: las URLs nunca cambian de contenido y se pueden cachear sin límite
+            prefijo = f"cuidadores/{usuario_id}/{uuid.uuid4().hex[:12]}"
+
+            # El original se sube desde disco por partes; se conserva para poder regenerar variantes
+            extension = os.path.splitext(ruta)[1].lower() or '.bin'
+            with open(ruta, 'rb') as original:
+                self.client.upload_fileobj(original, self.bucket, f"{prefijo}/original{extension}",
+                                           Config=self.transfer_config)
+
+            for nombre, buffer in self._variantes(ruta):
+                self.client.upload_fileobj(buffer, self.bucket, f"{prefijo}/{nombre}.jpg", ExtraArgs={
+                    'ACL': 'public-read',
+                    'ContentType': 'image/jpeg',
+                    'CacheControl': 'public, max-age=31536000, immutable',
+                }, Config=self.transfer_config)
+            url = f"{self.url_publica}/{prefijo}/full.jpg"
+
+            conn = self.db_pool.acquire()
+            try:
+                conn.cursor().execute("UPDATE cuidadores SET foto = %s WHERE usuario_id = %s", (url, usuario_id))
+                conn.commit()
+            finally:
+                self.db_pool.release(conn)
+
+            if self.al_terminar:
+                self.al_terminar(usuario_id, url)
+            return url
+        except Exception:
+            logger.exception("Error procesando la foto del cuidador %s", usuario_id)
+            raise
+        finally:
+            os.unlink(ruta)
+
+    def shutdown(self, wait=True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
@@ -0,0 +1,57 @@
+import hashlib
+import json
+
+from cache import MemoryCache
+
+
+def version_de(fila):
+    """Sello de versión de una fila: cambia exactamente cuando cambia alguno de sus valores."""
+    return hashlib.sha1(json.dumps(fila, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+class FragmentCache:
+    """
+    HTML ya renderizado de una entidad (tarjeta de cuidador, fila del panel), guardado en la
+    memoria del proceso bajo '<tipo>:<id>' junto con la versión de la fila con que se armó.
+
+    La versión se calcula a partir de la fila que el request ya tiene en mano (del cache del
+    listado o de la consulta de la página), así que validar un fragmento no cuesta una consulta
+    extra; si la fila cambió por cualquier camino (CRUD del panel, reseñas, fotos, importación)
+    el fragmento se vuelve a renderizar y reemplaza al anterior.
+
+    La contracara: el fragmento es tan fresco como la fila que lo pide. Si la fila sale de una
+    página del listado cacheada que todavía no se invalidó, el HTML es el de esa fila vieja;
+    no se agrega staleness propia, pero tampoco se corrige la del cache del listado.
+    """
+
+    def __init__(self, max_items=5000):
+        self._cache = MemoryCache(max_items=max_items, default_ttl=0)
+        self.renderizados = 0
+        self.reutilizados = 0
+
+    def obtener(self, tipo, fila, renderizar):
+        clave = f"{tipo}:{fila['id']}"
+        version = version_de(fila)
+        guardado = self._cache.get(clave)
+        if guardado is not None and guardado[0] == version:
+            self.reutilizados += 1
+            return guardado[1]
+        html = renderizar(fila)
+        self._cache.set(clave, (version, html))
+        self.renderizados += 1
+        return html
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self):
+        total = self.renderizados + self.reutilizados
+        datos = self._cache.stats()
+        return {
+            'items': datos['items'],
+            'max_items': datos['max_items'],
+            'evictions': datos['evictions'],
+            'renderizados': self.renderizados,
+            'reutilizados': self.reutilizados,
+            'hit_rate': round(self.reutilizados / total, 4) if total else None,
+        }
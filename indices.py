@@ -0,0 +1,650 @@
+import abc
+import bisect
+import heapq
+import math
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+KM_POR_GRADO = 111.32
+RADIO_TIERRA_KM = 6371.0
+MAX_LAT_MERCATOR = 85.05112878
+
+
+class IndiceRefrescable(abc.ABC):
+    """
+    Índice en memoria de un worker, cargado perezosamente desde la base.
+
+    Las escrituras del propio worker lo actualizan en forma incremental; las
+    hechas por otros workers se incorporan al reconstruirlo cuando vence `ttl`.
+    """
+
+    def __init__(self, loader, ttl=300):
+        self._loader = loader
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        self._cargado_en = None
+
+    @property
+    def cargado(self):
+        return self._cargado_en is not None
+
+    def _vencido(self):
+        if self._cargado_en is None:
+            return True
+        return bool(self.ttl) and time.monotonic() - self._cargado_en > self.ttl
+
+    def asegurar(self):
+        if not self._vencido():
+            return
+        # Si ya hay datos, un solo hilo reconstruye y los demás siguen con los anteriores
+        if not self._lock.acquire(blocking=not self.cargado):
+            return
+        try:
+            if self._vencido():
+                self.reconstruir(self._loader())
+                self._cargado_en = time.monotonic()
+        finally:
+            self._lock.release()
+
+    def invalidar(self):
+        with self._lock:
+            self._cargado_en = None
+
+    @abc.abstractmethod
+    def reconstruir(self, filas):
+        """Reemplaza el contenido del índice con `filas`, lo que devolvió el loader."""
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp = p2 - p1
+    dl = math.radians(lng2 - lng1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * RADIO_TIERRA_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def mercator(lat, lng):
+    """Posición (x, y) en [0, 1) de la proyección Web Mercator de los mapas (y crece hacia el sur)."""
+    lat = max(-MAX_LAT_MERCATOR, min(MAX_LAT_MERCATOR, lat))
+    seno = math.sin(math.radians(lat))
+    x = (lng + 180.0) / 360.0
+    y = 0.5 - math.log((1 + seno) / (1 - seno)) / (4 * math.pi)
+    return min(max(x, 0.0), 1 - 1e-12), min(max(y, 0.0), 1 - 1e-12)
+
+
+class GeoIndex(IndiceRefrescable):
+    """
+    Grilla regular de `celda` grados sobre lat/lng de los cuidadores.
+
+    `cercanos` recorre la grilla en anillos desde la celda del punto consultado
+    y corta en cuanto ningún anillo pendiente puede mejorar el resultado.
+
+    `clusters` agrupa los puntos por zoom del mapa en celdas de `celda_px` píxeles.
+    Cada zoom se arma la primera vez que se pide y después se mantiene con las
+    escrituras (cantidad y suma de coordenadas por celda); los agrupados con filtro
+    de servicios se cachean aparte y se descartan en cada escritura.
+    """
+
+    ZOOM_MAX = 18
+    MAX_REPRESENTANTES = 3
+    MAX_NIVELES_FILTRADOS = 32
+
+    def __init__(self, loader, ttl=300, celda=0.05, celda_px=64):
+        super().__init__(loader, ttl)
+        self.celda = celda
+        self.celda_px = celda_px
+        self._puntos = {}
+        self._celdas = {}
+        self._xy = {}
+        self._niveles = {}
+        self._filtrados = OrderedDict()
+
+    def _clave(self, lat, lng):
+        return (math.floor(lat / self.celda), math.floor(lng / self.celda))
+
+    def reconstruir(self, filas):
+        puntos, celdas = {}, {}
+        for fila in filas:
+            if fila['lat'] is None or fila['lng'] is None:
+                continue
+            lat, lng = float(fila['lat']), float(fila['lng'])
+            puntos[fila['id']] = (lat, lng)
+            celdas.setdefault(self._clave(lat, lng), set()).add(fila['id'])
+        self._puntos, self._celdas = puntos, celdas
+        # La proyección es lo caro de agrupar: se calcula una vez por punto y sirve para todos los zooms
+        self._xy = {id: mercator(lat, lng) for id, (lat, lng) in puntos.items()}
+        self._niveles, self._filtrados = {}, OrderedDict()
+
+    def _quitar(self, id):
+        punto = self._puntos.pop(id, None)
+        if punto is None:
+            return
+        self._ajustar_niveles(id, punto, -1)
+        self._xy.pop(id, None)
+        clave = self._clave(*punto)
+        ids = self._celdas.get(clave)
+        if ids is not None:
+            ids.discard(id)
+            if not ids:
+                del self._celdas[clave]
+
+    def upsert(self, id, lat, lng):
+        if not self.cargado:
+            return
+        with self._lock:
+            self._quitar(id)
+            if lat is None or lng is None:
+                return
+            lat, lng = float(lat), float(lng)
+            self._puntos[id] = (lat, lng)
+            self._celdas.setdefault(self._clave(lat, lng), set()).add(id)
+            self._xy[id] = mercator(lat, lng)
+            self._ajustar_niveles(id, (lat, lng), 1)
+
+    def remove(self, id):
+        if not self.cargado:
+            return
+        with self._lock:
+            self._quitar(id)
+
+    def __len__(self):
+        return len(self._puntos)
+
+    def _anillo(self, ci, cj, r):
+        if r == 0:
+            yield (ci, cj)
+            return
+        for dj in range(-r, r + 1):
+            yield (ci - r, cj + dj)
+            yield (ci + r, cj + dj)
+        for di in range(-r + 1, r):
+            yield (ci + di, cj - r)
+            yield (ci + di, cj + r)
+
+    def cercanos(self, lat, lng, radio_km, limite):
+        """Devuelve hasta `limite` pares (id, distancia_km) ordenados por distancia."""
+        if limite <= 0 or radio_km <= 0:
+            return []
+        celdas = self._celdas
+        puntos = self._puntos
+        ci, cj = self._clave(lat, lng)
+
+        cos_lat = max(math.cos(math.radians(min(89.0, abs(lat) + radio_km / KM_POR_GRADO))), 0.01)
+        km_por_celda = self.celda * KM_POR_GRADO * cos_lat
+        max_anillo = int(math.ceil(radio_km / km_por_celda)) + 1
+
+        # Heap de máximos (distancia negada) con los `limite` mejores candidatos
+        mejores = []
+        for r in range(max_anillo + 1):
+            for clave in self._anillo(ci, cj, r):
+                ids = celdas.get(clave)
+                if not ids:
+                    continue
+                for id in tuple(ids):
+                    punto = puntos.get(id)
+                    if punto is None:
+                        continue
+                    d = haversine_km(lat, lng, punto[0], punto[1])
+                    if d > radio_km:
+                        continue
+                    if len(mejores) < limite:
+                        heapq.heappush(mejores, (-d, id))
+                    elif d < -mejores[0][0]:
+                        heapq.heapreplace(mejores, (-d, id))
+            # Cualquier punto en el anillo r+1 está al menos a r celdas de distancia
+            if len(mejores) >= limite and -mejores[0][0] <= r * km_por_celda:
+                break
+
+        return sorted(((id, -d) for d, id in mejores), key=lambda par: par[1])
+
+    # --- CLUSTERS POR ZOOM ---
+    def _celdas_por_lado(self, zoom):
+        return (256 << zoom) // self.celda_px
+
+    def _celda_zoom(self, zoom, lat, lng, xy=None):
+        n = self._celdas_por_lado(zoom)
+        x, y = xy or mercator(lat, lng)
+        return int(x * n), int(y * n)
+
+    def _armar_nivel(self, zoom, permitidos=None):
+        # celda -> [cantidad, suma_lat, suma_lng, representantes, incompleto]
+        nivel = {}
+        n = self._celdas_por_lado(zoom)
+        xy = self._xy
+        for id, (lat, lng) in tuple(self._puntos.items()):
+            if permitidos is not None and id not in permitidos:
+                continue
+            x, y = xy.get(id) or mercator(lat, lng)
+            celda = (int(x * n), int(y * n))
+            grupo = nivel.get(celda)
+            if grupo is None:
+                nivel[celda] = [1, lat, lng, [id], False]
+                continue
+            grupo[0] += 1
+            grupo[1] += lat
+            grupo[2] += lng
+            if len(grupo[3]) < self.MAX_REPRESENTANTES:
+                grupo[3].append(id)
+        return nivel
+
+    def _ajustar_niveles(self, id, punto, signo):
+        """Suma (signo 1) o resta (-1) un punto de los zooms ya armados. Se llama con el lock tomado."""
+        self._filtrados = OrderedDict()
+        lat, lng = punto
+        for zoom, nivel in self._niveles.items():
+            celda = self._celda_zoom(zoom, lat, lng)
+            grupo = nivel.get(celda)
+            if signo > 0:
+                if grupo is None:
+                    nivel[celda] = [1, lat, lng, [id], False]
+                    continue
+                grupo[0] += 1
+                grupo[1] += lat
+                grupo[2] += lng
+                if len(grupo[3]) < self.MAX_REPRESENTANTES:
+                    grupo[3].append(id)
+            elif grupo is not None:
+                if grupo[0] <= 1:
+                    del nivel[celda]
+                    continue
+                grupo[0] -= 1
+                grupo[1] -= lat
+                grupo[2] -= lng
+                if id in grupo[3]:
+                    # Se completa con otro punto de la celda recién cuando alguien la pide
+                    grupo[3] = [r for r in grupo[3] if r != id]
+                    grupo[4] = True
+
+    def _nivel(self, zoom, filtro=None, permitidos=None):
+        if filtro is None:
+            nivel = self._niveles.get(zoom)
+            if nivel is None:
+                with self._lock:
+                    nivel = self._niveles.get(zoom)
+                    if nivel is None:
+                        nivel = self._niveles[zoom] = self._armar_nivel(zoom)
+            return nivel
+        clave = (zoom, filtro)
+        nivel = self._filtrados.get(clave)
+        if nivel is None:
+            # El subconjunto se arma antes de tomar el lock: puede tocar otro índice y no tiene
+            # por qué frenar a las escrituras ni a los demás zooms
+            if callable(permitidos):
+                permitidos = permitidos()
+            with self._lock:
+                nivel = self._armar_nivel(zoom, permitidos)
+                self._filtrados[clave] = nivel
+                while len(self._filtrados) > self.MAX_NIVELES_FILTRADOS:
+                    self._filtrados.popitem(last=False)
+        return nivel
+
+    def clusters(self, zoom, sur, oeste, norte, este, filtro=None, permitidos=None):
+        """
+        Grupos de puntos del rectángulo visible a un zoom del mapa: lista de
+        (lat, lng del centroide, cantidad, ids representantes).
+
+        `filtro` es una clave hasheable del subconjunto (p. ej. los servicios elegidos) y
+        `permitidos` el conjunto de ids que lo forman, o una función que lo devuelve;
+        solo se calcula si ese zoom con ese filtro no está en cache.
+        """
+        zoom = max(0, min(int(zoom), self.ZOOM_MAX))
+        nivel = self._nivel(zoom, filtro, permitidos)
+        x0, y0 = self._celda_zoom(zoom, norte, oeste)
+        x1, y1 = self._celda_zoom(zoom, sur, este)
+        if x0 > x1:
+            # El rectángulo cruza el antimeridiano: se toma todo el ancho
+            x0, x1 = 0, self._celdas_por_lado(zoom) - 1
+
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > len(nivel):
+            visibles = [(celda, grupo) for celda, grupo in tuple(nivel.items())
+                        if x0 <= celda[0] <= x1 and y0 <= celda[1] <= y1]
+        else:
+            visibles = [((x, y), nivel[(x, y)]) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)
+                        if (x, y) in nivel]
+
+        incompletos = {celda: grupo for celda, grupo in visibles if grupo[4]}
+        if incompletos:
+            with self._lock:
+                ids_por_celda = {celda: [] for celda in incompletos}
+                for id, (lat, lng) in tuple(self._puntos.items()):
+                    ids = ids_por_celda.get(self._celda_zoom(zoom, lat, lng, self._xy.get(id)))
+                    if ids is not None and len(ids) < self.MAX_REPRESENTANTES:
+                        ids.append(id)
+                for celda, grupo in incompletos.items():
+                    grupo[3], grupo[4] = ids_por_celda[celda], False
+
+        return [(grupo[1] / grupo[0], grupo[2] / grupo[0], grupo[0], list(grupo[3])) for _, grupo in visibles]
+
+
+# --- BÚSQUEDA DE TEXTO ---
+STOPWORDS = frozenset("""
+    a al con de del el en es la las lo los mi me mas o para por que se sin su sus te tu un una uno y ya
+""".split())
+
+_TOKEN = re.compile(r'[a-z0-9]+')
+
+
+def normalizar_texto(texto):
+    """Minúsculas y sin tildes ni diéresis: 'Lanús' y 'lanus' son la misma palabra."""
+    if not texto or texto.isascii():
+        return (texto or '').lower()
+    descompuesto = unicodedata.normalize('NFKD', texto)
+    return ''.join(c for c in descompuesto if not unicodedata.combining(c)).lower()
+
+
+def _raiz(token):
+    # Plural simple del español: 'paseos' -> 'paseo', 'gatos' -> 'gato'
+    if len(token) > 3 and token.endswith('s'):
+        return token[:-1]
+    return token
+
+
+def tokenizar(texto):
+    return [_raiz(t) for t in _TOKEN.findall(normalizar_texto(texto)) if t not in STOPWORDS]
+
+
+class TextIndex(IndiceRefrescable):
+    """
+    Índice invertido de los cuidadores: término -> {id: peso}.
+
+    El peso de un término en un cuidador suma el peso del campo por cada aparición
+    (el nombre pesa más que la descripción). `buscar` exige todos los términos de la
+    consulta, toma el último como prefijo (la búsqueda se hace mientras se escribe)
+    y ordena por relevancia tipo BM25 sin normalizar por largo.
+
+    Cada término guarda además sus (-peso, id) ordenados: la búsqueda recorre los del
+    término más raro de mayor a menor puntaje y corta cuando ningún candidato restante
+    puede entrar en el resultado, así una consulta con palabras muy comunes no recorre
+    todo el índice.
+    """
+
+    PESOS = {'nombre': 3.0, 'servicios': 2.0, 'ubicacion': 2.0, 'descripcion': 1.0}
+    K1 = 1.2
+    # Un término que solo extiende al prefijo buscado vale menos que la palabra exacta
+    FACTOR_PREFIJO = 0.7
+
+    def __init__(self, loader, ttl=300, max_prefijos=64):
+        super().__init__(loader, ttl)
+        self.max_prefijos = max_prefijos
+        self._postings = {}
+        self._ordenados = {}
+        self._vocabulario = []
+        self._docs = {}
+
+    def _terminos(self, fila):
+        terminos = {}
+        for campo, peso in self.PESOS.items():
+            valor = fila.get(campo)
+            if isinstance(valor, (list, tuple, set)):
+                valor = ' '.join(valor)
+            for termino in tokenizar(valor):
+                terminos[termino] = terminos.get(termino, 0.0) + peso
+        return terminos
+
+    def _servicios(self, fila):
+        servicios = fila.get('servicios') or ()
+        if isinstance(servicios, str):
+            servicios = servicios.split('|')
+        return frozenset(normalizar_texto(s).strip() for s in servicios if s and s.strip())
+
+    def reconstruir(self, filas):
+        postings, docs = {}, {}
+        for fila in filas:
+            terminos = self._terminos(fila)
+            docs[fila['id']] = (terminos, self._servicios(fila))
+            for termino, peso in terminos.items():
+                postings.setdefault(termino, {})[fila['id']] = peso
+        self._postings, self._docs = postings, docs
+        self._ordenados = {termino: sorted((-peso, id) for id, peso in ids.items()) for termino, ids in postings.items()}
+        self._vocabulario = sorted(postings)
+
+    def _quitar(self, id):
+        doc = self._docs.pop(id, None)
+        if doc is None:
+            return
+        for termino in doc[0]:
+            ids = self._postings.get(termino)
+            if ids is None:
+                continue
+            peso = ids.pop(id, None)
+            ordenado = self._ordenados.get(termino)
+            if peso is not None and ordenado is not None:
+                posicion = bisect.bisect_left(ordenado, (-peso, id))
+                if posicion < len(ordenado) and ordenado[posicion] == (-peso, id):
+                    del ordenado[posicion]
+            if not ids:
+                del self._postings[termino]
+                self._ordenados.pop(termino, None)
+                posicion = bisect.bisect_left(self._vocabulario, termino)
+                if posicion < len(self._vocabulario) and self._vocabulario[posicion] == termino:
+                    del self._vocabulario[posicion]
+
+    def upsert(self, id, **campos):
+        """Reindexa un cuidador con sus campos nombre, descripcion, ubicacion y servicios."""
+        if not self.cargado:
+            return
+        with self._lock:
+            self._quitar(id)
+            terminos = self._terminos(campos)
+            self._docs[id] = (terminos, self._servicios(campos))
+            for termino, peso in terminos.items():
+                ids = self._postings.get(termino)
+                if ids is None:
+                    ids = self._postings[termino] = {}
+                    self._ordenados[termino] = []
+                    bisect.insort(self._vocabulario, termino)
+                ids[id] = peso
+                bisect.insort(self._ordenados[termino], (-peso, id))
+
+    def remove(self, id):
+        if not self.cargado:
+            return
+        with self._lock:
+            self._quitar(id)
+
+    def __len__(self):
+        return len(self._docs)
+
+    def _expandir(self, termino, prefijo):
+        """[(término, ids, factor)] de un término de la consulta; como prefijo, también los que lo extienden."""
+        if not prefijo:
+            ids = self._postings.get(termino)
+            return [(termino, ids, 1.0)] if ids else []
+        vocabulario = self._vocabulario
+        inicio = bisect.bisect_left(vocabulario, termino)
+        expansion = []
+        for t in vocabulario[inicio:inicio + self.max_prefijos]:
+            if not t.startswith(termino):
+                break
+            ids = self._postings.get(t)
+            if ids:
+                expansion.append((t, ids, 1.0 if t == termino else self.FACTOR_PREFIJO))
+        return expansion
+
+    def _puntaje(self, peso, df, factor):
+        n = len(self._docs) or 1
+        idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+        return factor * idf * peso * (self.K1 + 1) / (peso + self.K1)
+
+    def _peso_maximo(self, termino):
+        ordenado = self._ordenados.get(termino)
+        return -ordenado[0][0] if ordenado else 0.0
+
+    def _recorrer(self, termino, df, factor):
+        for peso, id in tuple(self._ordenados.get(termino, ())):
+            yield -self._puntaje(-peso, df, factor), id
+
+    def _candidatos(self, expansion):
+        """(puntaje, id) de mayor a menor puntaje, sin repetir ids entre expansiones."""
+        listas = [self._recorrer(t, len(ids), factor) for t, ids, factor in expansion]
+        vistos = set()
+        for puntaje, id in heapq.merge(*listas):
+            if id not in vistos:
+                vistos.add(id)
+                yield -puntaje, id
+
+    def _puntaje_de(self, expansion, id):
+        mejor = None
+        for _, ids, factor in expansion:
+            peso = ids.get(id)
+            if peso is not None:
+                puntaje = self._puntaje(peso, len(ids), factor)
+                if mejor is None or puntaje > mejor:
+                    mejor = puntaje
+        return mejor
+
+    def buscar(self, consulta, limite, servicios=()):
+        """Hasta `limite` ids ordenados por relevancia."""
+        terminos = list(dict.fromkeys(tokenizar(consulta)))
+        if not terminos or limite <= 0:
+            return []
+        # Un prefijo de una letra expandiría a medio vocabulario: se busca como término exacto
+        ultimo_prefijo = len(terminos[-1]) >= 2 and consulta == consulta.rstrip()
+        expansiones = [self._expandir(t, ultimo_prefijo and i == len(terminos) - 1) for i, t in enumerate(terminos)]
+        if not all(expansiones):
+            return []
+
+        # El término más raro genera los candidatos; los demás solo se consultan por id
+        expansiones.sort(key=lambda expansion: sum(len(ids) for _, ids, _ in expansion))
+        guia, resto = expansiones[0], expansiones[1:]
+        maximo_resto = sum(max(self._puntaje(self._peso_maximo(t), len(ids), factor) for t, ids, factor in expansion)
+                           for expansion in resto)
+        requeridos = frozenset(normalizar_texto(s).strip() for s in servicios if s and s.strip())
+        docs = self._docs
+
+        mejores = []  # heap de mínimos con los `limite` mejores (puntaje, -id)
+        for puntaje, id in self._candidatos(guia):
+            # Ningún candidato que falta puede superar al peor de los elegidos
+            if len(mejores) >= limite and mejores[0][0] >= puntaje + maximo_resto:
+                break
+            total = puntaje
+            for expansion in resto:
+                parcial = self._puntaje_de(expansion, id)
+                if parcial is None:
+                    break
+                total += parcial
+            else:
+                if requeridos and not (id in docs and requeridos <= docs[id][1]):
+                    continue
+                if len(mejores) < limite:
+                    heapq.heappush(mejores, (total, -id))
+                elif (total, -id) > mejores[0]:
+                    heapq.heapreplace(mejores, (total, -id))
+
+        return [-id for _, id in sorted(mejores, reverse=True)]
+
+
+# --- FACETAS DE SERVICIOS ---
+def _contar_bits(bits):
+    # int.bit_count existe desde Python 3.10
+    return bits.bit_count() if hasattr(bits, 'bit_count') else bin(bits).count('1')
+
+
+# Posiciones de los bits prendidos de cada valor de byte
+_BITS_DE_BYTE = tuple(tuple(i for i in range(8) if valor >> i & 1) for valor in range(256))
+
+
+class FacetIndex(IndiceRefrescable):
+    """
+    Servicio -> conjunto de ids de cuidadores, como bitsets (enteros de Python con el bit
+    `id` prendido). "Cuidadores con todos los servicios X e Y" es un AND de bitsets y el
+    conteo de cada faceta un AND más un popcount, sin tocar la base.
+
+    Los enteros son inmutables: cada escritura reemplaza el bitset entero, así que una
+    lectura concurrente ve el estado anterior o el nuevo, nunca uno a medias.
+    """
+
+    def __init__(self, loader, ttl=300):
+        super().__init__(loader, ttl)
+        self._todos = 0
+        self._por_servicio = {}
+        self._servicios = {}
+
+    def reconstruir(self, filas):
+        todos, por_servicio, servicios = 0, {}, {}
+        for fila in filas:
+            bit = 1 << fila['id']
+            todos |= bit
+            nombres = fila.get('servicios') or ()
+            if isinstance(nombres, str):
+                nombres = nombres.split('|')
+            servicios[fila['id']] = frozenset(n for n in nombres if n)
+            for nombre in servicios[fila['id']]:
+                por_servicio[nombre] = por_servicio.get(nombre, 0) | bit
+        self._todos, self._por_servicio, self._servicios = todos, por_servicio, servicios
+
+    def _quitar(self, id):
+        bit = 1 << id
+        for nombre in self._servicios.pop(id, ()):
+            restantes = self._por_servicio.get(nombre, 0) & ~bit
+            if restantes:
+                self._por_servicio[nombre] = restantes
+            else:
+                self._por_servicio.pop(nombre, None)
+        self._todos &= ~bit
+
+    def upsert(self, id, servicios):
+        if not self.cargado:
+            return
+        with self._lock:
+            self._quitar(id)
+            bit = 1 << id
+            self._servicios[id] = frozenset(n for n in servicios if n)
+            for nombre in self._servicios[id]:
+                self._por_servicio[nombre] = self._por_servicio.get(nombre, 0) | bit
+            self._todos |= bit
+
+    def remove(self, id):
+        if not self.cargado:
+            return
+        with self._lock:
+            self._quitar(id)
+
+    def __len__(self):
+        return len(self._servicios)
+
+    def filtrar(self, servicios=()):
+        """Bitset de los cuidadores que ofrecen todos los `servicios`."""
+        bits = self._todos
+        for nombre in servicios:
+            bits &= self._por_servicio.get(nombre, 0)
+            if not bits:
+                break
+        return bits
+
+    def ids(self, servicios=(), after=None, limite=None):
+        """Ids ascendentes que ofrecen todos los `servicios`, mayores que `after`, hasta `limite`."""
+        bits = self.filtrar(servicios)
+        desde = 0 if after is None else max(after + 1, 0)
+        bits >>= desde
+        # Un solo pasaje a bytes y se recorren de a uno con la tabla: desplazar el entero por
+        # cada resultado copiaría el bitset completo cada vez
+        resultado = []
+        for indice, byte in enumerate(bits.to_bytes((bits.bit_length() + 7) // 8, 'little')):
+            if not byte:
+                continue
+            base = desde + indice * 8
+            resultado.extend(base + posicion for posicion in _BITS_DE_BYTE[byte])
+            if limite is not None and len(resultado) >= limite:
+                return resultado[:limite]
+        return resultado
+
+    def facetas(self, nombres, servicios=(), base=None):
+        """
+        (total, {servicio: cantidad}) de los cuidadores que cumplen el filtro actual
+        (`servicios` y, si se pasa, el bitset `base`), y cuántos de ellos ofrecen cada uno de `nombres`.
+        """
+        bits = self.filtrar(servicios)
+        if base is not None:
+            bits &= base
+        return _contar_bits(bits), {nombre: _contar_bits(bits & self._por_servicio.get(nombre, 0)) for nombre in nombres}
+
+    @staticmethod
+    def bitset(ids):
+        bits = 0
+        for id in ids:
+            bits |= 1 << id
+        return bits
@@ -0,0 +1,246 @@
+import bisect
+import heapq
+import json
+import logging
+import re
+import threading
+import time
+
+import pymysql
+
+logger = logging.getLogger('petcare.requests')
+
+# Límites superiores (ms) de los buckets de los histogramas de latencia
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float('inf'))
+
+_actual = threading.local()
+
+
+def normalizar_sql(sql, largo=300):
+    # Sin parámetros: las consultas se agrupan por forma y no se registran datos personales
+    return re.sub(r'\s+', ' ', sql).strip()[:largo]
+
+
+class MedicionRequest:
+    """
+    Lo que hizo un request: consultas, tiempo en la base, tiempo en S3, tiempo de CPU renderizando
+    plantillas y sus consultas más lentas.
+    """
+    __slots__ = ('inicio', 'consultas', 'db_ms', 's3_llamadas', 's3_ms', 'render_ms', 'render_inicio', 'lentas',
+                 'max_lentas')
+
+    def __init__(self, max_lentas=3):
+        self.inicio = time.perf_counter()
+        self.consultas = 0
+        self.db_ms = 0.0
+        self.s3_llamadas = 0
+        self.s3_ms = 0.0
+        self.render_ms = 0.0
+        self.render_inicio = None
+        self.lentas = []
+        self.max_lentas = max_lentas
+
+    def registrar_consulta(self, sql, ms):
+        self.consultas += 1
+        self.db_ms += ms
+        if len(self.lentas) < self.max_lentas:
+            heapq.heappush(self.lentas, (ms, sql))
+        elif ms > self.lentas[0][0]:
+            heapq.heapreplace(self.lentas, (ms, sql))
+
+    # CPU del hilo y no tiempo de reloj: lo que cuesta renderizar, sin contar esperas de otros hilos
+    def empezar_render(self):
+        self.render_inicio = time.thread_time()
+
+    def terminar_render(self):
+        if self.render_inicio is not None:
+            self.render_ms += (time.thread_time() - self.render_inicio) * 1000
+            self.render_inicio = None
+
+    @property
+    def total_ms(self):
+        return (time.perf_counter() - self.inicio) * 1000
+
+    def consultas_lentas(self):
+        return [{'ms': round(ms, 2), 'sql': normalizar_sql(sql)} for ms, sql in sorted(self.lentas, reverse=True)]
+
+
+def iniciar_medicion(max_lentas=3):
+    _actual.medicion = MedicionRequest(max_lentas)
+    return _actual.medicion
+
+
+def terminar_medicion():
+    medicion = getattr(_actual, 'medicion', None)
+    _actual.medicion = None
+    return medicion
+
+
+def medicion_actual():
+    return getattr(_actual, 'medicion', None)
+
+
+class CursorInstrumentado(pymysql.cursors.DictCursor):
+    """
+    DictCursor que mide cada ida y vuelta a la base. executemany pasa por execute,
+    así que un INSERT multi-fila cuenta como una sola consulta.
+    """
+
+    def execute(self, query, args=None):
+        inicio = time.perf_counter()
+        try:
+            return super().execute(query, args)
+        finally:
+            ms = (time.perf_counter() - inicio) * 1000
+            medicion = medicion_actual()
+            if medicion is not None:
+                medicion.registrar_consulta(query, ms)
+            metricas.registrar_consulta(query, ms)
+
+
+def instrumentar_boto3(client):
+    """Mide las llamadas del cliente S3. Las hechas fuera de un request (pipeline de fotos) se agregan aparte."""
+    inicio_por_hilo = threading.local()
+
+    def antes(**kwargs):
+        inicio_por_hilo.valor = time.perf_counter()
+
+    def despues(**kwargs):
+        inicio = getattr(inicio_por_hilo, 'valor', None)
+        if inicio is None:
+            return
+        ms = (time.perf_counter() - inicio) * 1000
+        medicion = medicion_actual()
+        if medicion is not None:
+            medicion.s3_llamadas += 1
+            medicion.s3_ms += ms
+        else:
+            metricas.registrar_s3_fondo(kwargs.get('event_name', 's3'), ms)
+
+    client.meta.events.register('before-call', antes)
+    client.meta.events.register('after-call', despues)
+    return client
+
+
+class _Histograma:
+    __slots__ = ('cantidad', 'suma_ms', 'max_ms', 'buckets', 'consultas', 'max_consultas', 'db_ms', 's3_ms', 'render_ms',
+                 'errores')
+
+    def __init__(self):
+        self.cantidad = 0
+        self.suma_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * len(BUCKETS_MS)
+        self.consultas = 0
+        self.max_consultas = 0
+        self.db_ms = 0.0
+        self.s3_ms = 0.0
+        self.render_ms = 0.0
+        self.errores = 0
+
+    def como_dict(self):
+        return {
+            'requests': self.cantidad,
+            'promedio_ms': round(self.suma_ms / self.cantidad, 2) if self.cantidad else None,
+            'max_ms': round(self.max_ms, 2),
+            'buckets_ms': {('+Inf' if limite == float('inf') else str(limite)): n
+                           for limite, n in zip(BUCKETS_MS, self.buckets)},
+            'consultas_por_request': round(self.consultas / self.cantidad, 2) if self.cantidad else None,
+            'max_consultas': self.max_consultas,
+            'db_ms_promedio': round(self.db_ms / self.cantidad, 2) if self.cantidad else None,
+            's3_ms_promedio': round(self.s3_ms / self.cantidad, 2) if self.cantidad else None,
+            'render_ms_promedio': round(self.render_ms / self.cantidad, 2) if self.cantidad else None,
+            'errores': self.errores,
+        }
+
+
+class Metricas:
+    """Agregados del proceso: histograma de latencia por endpoint y las consultas más lentas vistas."""
+
+    def __init__(self, max_lentas=20):
+        self.max_lentas = max_lentas
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self._lentas = {}
+        self._umbral_lentas = 0.0
+        self._s3_fondo = {}
+
+    def registrar_request(self, endpoint, status, medicion, total_ms):
+        with self._lock:
+            h = self._endpoints.get(endpoint)
+            if h is None:
+                h = self._endpoints[endpoint] = _Histograma()
+            h.cantidad += 1
+            h.suma_ms += total_ms
+            h.max_ms = max(h.max_ms, total_ms)
+            h.buckets[bisect.bisect_left(BUCKETS_MS, total_ms)] += 1
+            h.consultas += medicion.consultas
+            h.max_consultas = max(h.max_consultas, medicion.consultas)
+            h.db_ms += medicion.db_ms
+            h.s3_ms += medicion.s3_ms
+            h.render_ms += medicion.render_ms
+            if status >= 500:
+                h.errores += 1
+
+    def registrar_consulta(self, sql, ms):
+        # Se conserva el peor tiempo de cada forma de consulta, acotado a `max_lentas` formas.
+        # El umbral se lee sin lock: en el peor caso se pierde una muestra
+        if ms <= self._umbral_lentas:
+            return
+        clave = normalizar_sql(sql)
+        with self._lock:
+            if ms > self._lentas.get(clave, 0.0):
+                self._lentas[clave] = ms
+            if len(self._lentas) > self.max_lentas:
+                del self._lentas[min(self._lentas, key=self._lentas.get)]
+            if len(self._lentas) >= self.max_lentas:
+                self._umbral_lentas = min(self._lentas.values())
+
+    def registrar_s3_fondo(self, operacion, ms):
+        with self._lock:
+            cantidad, suma = self._s3_fondo.get(operacion, (0, 0.0))
+            self._s3_fondo[operacion] = (cantidad + 1, suma + ms)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'endpoints': {endpoint: h.como_dict() for endpoint, h in sorted(self._endpoints.items())},
+                'consultas_lentas': [{'sql': sql, 'max_ms': round(ms, 2)}
+                                     for sql, ms in sorted(self._lentas.items(), key=lambda kv: -kv[1])],
+                's3_segundo_plano': {op: {'llamadas': n, 'promedio_ms': round(suma / n, 2)}
+                                     for op, (n, suma) in self._s3_fondo.items()},
+            }
+
+
+metricas = Metricas()
+
+
+def server_timing(medicion, total_ms):
+    """Valor del header Server-Timing (se ve en la pestaña Network del navegador)."""
+    partes = [f'db;dur={medicion.db_ms:.1f};desc="{medicion.consultas} consultas"']
+    if medicion.s3_llamadas:
+        partes.append(f's3;dur={medicion.s3_ms:.1f};desc="{medicion.s3_llamadas} llamadas"')
+    if medicion.render_ms:
+        partes.append(f'render;dur={medicion.render_ms:.2f};desc="CPU de plantillas"')
+    partes.append(f'total;dur={total_ms:.1f}')
+    return ', '.join(partes)
+
+
+def log_request(endpoint, metodo, ruta, status, medicion, total_ms, lento_ms):
+    """Una línea JSON por request; las que superan `lento_ms` van como warning con sus consultas más lentas."""
+    registro = {
+        'endpoint': endpoint,
+        'metodo': metodo,
+        'ruta': ruta,
+        'status': status,
+        'ms': round(total_ms, 2),
+        'consultas': medicion.consultas,
+        'db_ms': round(medicion.db_ms, 2),
+        's3_ms': round(medicion.s3_ms, 2),
+        'render_ms': round(medicion.render_ms, 2),
+    }
+    if total_ms >= lento_ms:
+        registro['consultas_lentas'] = medicion.consultas_lentas()
+        logger.warning(json.dumps(registro, ensure_ascii=False))
+    else:
+        logger.info(json.dumps(registro, ensure_ascii=False))
@@ -0,0 +1,106 @@
+import os
+import re
+
+import pymysql
+
+# --- MIGRACIONES DE ESQUEMA ---
+# Cada archivo `migrations/NNNN_nombre.sql` se aplica una sola vez, en orden, y queda
+# registrado en `schema_migrations`. Nunca se borran tablas ni datos existentes.
+
+MIGRACIONES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
+# Errores de MySQL que indican que el cambio ya estaba hecho (bases creadas antes del runner):
+# tabla existente, columna duplicada, índice duplicado y nombre de foreign key duplicado.
+# 1022 ("duplicate key" al escribir) no entra: también sale de fallas que no son un cambio ya hecho
+YA_APLICADO = {1050, 1060, 1061, 1826}
+
+_ARCHIVO = re.compile(r'^(\d+)_.+\.sql$')
+
+
+def listar_migraciones(directorio=MIGRACIONES_DIR):
+    """Devuelve [(version, nombre, ruta)] ordenadas por versión."""
+    migraciones = []
+    for nombre in os.listdir(directorio):
+        coincide = _ARCHIVO.match(nombre)
+        if coincide:
+            migraciones.append((int(coincide.group(1)), nombre, os.path.join(directorio, nombre)))
+    return sorted(migraciones)
+
+
+def sentencias(sql):
+    sin_comentarios = "\n".join(linea for linea in sql.splitlines() if not linea.strip().startswith('--'))
+    return [sentencia.strip() for sentencia in sin_comentarios.split(';') if sentencia.strip()]
+
+
+def _asegurar_tabla(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            nombre VARCHAR(255) NOT NULL,
+            aplicada_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )""")
+
+
+def versiones_aplicadas(cursor):
+    _asegurar_tabla(cursor)
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row['version'] for row in cursor.fetchall()}
+
+
+def pendientes(conn, directorio=MIGRACIONES_DIR):
+    with conn.cursor() as cursor:
+        aplicadas = versiones_aplicadas(cursor)
+    return [m for m in listar_migraciones(directorio) if m[0] not in aplicadas]
+
+
+def aplicar_migraciones(conn, directorio=MIGRACIONES_DIR, log=print):
+    """
+    Aplica las migraciones pendientes y devuelve los nombres aplicados.
+
+    En MySQL el DDL hace commit implícito, así que cada migración se registra al terminar;
+    si una falla a mitad de camino, volver a correrla saltea lo que ya quedó hecho.
+    """
+    aplicadas = []
+    for version, nombre, ruta in pendientes(conn, directorio):
+        with open(ruta, encoding='utf-8') as f:
+            sql = f.read()
+        with conn.cursor() as cursor:
+            for sentencia in sentencias(sql):
+                try:
+                    cursor.execute(sentencia)
+                except pymysql.err.MySQLError as e:
+                    if e.args and e.args[0] in YA_APLICADO:
+                        log(f"   ya aplicado: {sentencia.splitlines()[0][:60]}")
+                        continue
+                    conn.rollback()
+                    raise
+            cursor.execute("INSERT INTO schema_migrations (version, nombre) VALUES (%s, %s)", (version, nombre))
+        conn.commit()
+        log(f"✅ {nombre}")
+        aplicadas.append(nombre)
+    return aplicadas
+
+
+# --- VERIFICACIÓN DE PLANES DE EJECUCIÓN ---
+def verificar_planes(conn, consultas, min_filas=1000):
+    """
+    Corre EXPLAIN sobre cada consulta de `consultas` ({nombre: (sql, params)}) y devuelve
+    {nombre: [problemas]} con las que recorren una tabla completa (type = ALL).
+
+    Un scan completo se tolera si la tabla tiene índices candidatos y el optimizador estima
+    menos de `min_filas` filas: en tablas chicas MySQL prefiere el scan aunque el índice exista.
+    """
+    problemas = {}
+    with conn.cursor() as cursor:
+        for nombre, (sql, params) in consultas.items():
+            cursor.execute("EXPLAIN " + sql, params)
+            for fila in cursor.fetchall():
+                tabla = fila.get('table') or ''
+                # Las tablas derivadas (<derived2>, <subquery3>) ya se revisan en su propia fila
+                if fila.get('type') != 'ALL' or tabla.startswith('<'):
+                    continue
+                if fila.get('possible_keys') and (fila.get('rows') or 0) < min_filas:
+                    continue
+                problemas.setdefault(nombre, []).append(
+                    f"scan completo de `{tabla}` (~{fila.get('rows')} filas, índices posibles: {fila.get('possible_keys') or 'ninguno'})")
+    return problemas
@@ -0,0 +1,48 @@
+-- Esquema original de la aplicación. Idempotente para poder adoptar bases ya existentes.
+
+CREATE TABLE IF NOT EXISTS usuarios (
+    id INTEGER PRIMARY KEY AUTO_INCREMENT,
+    nombre VARCHAR(255) NOT NULL,
+    email VARCHAR(255) UNIQUE NOT NULL,
+    password TEXT NOT NULL,
+    tipo_usuario VARCHAR(20) CHECK(tipo_usuario IN ('cliente', 'cuidador', 'admin')) DEFAULT 'cliente'
+);
+
+CREATE TABLE IF NOT EXISTS cuidadores (
+    id INTEGER PRIMARY KEY AUTO_INCREMENT,
+    usuario_id INTEGER UNIQUE,
+    descripcion TEXT,
+    ubicacion VARCHAR(255),
+    lat REAL,
+    lng REAL,
+    foto TEXT,
+    rating REAL DEFAULT 0,
+    FOREIGN KEY(usuario_id) REFERENCES usuarios(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS servicios_cuidadores (
+    id INTEGER PRIMARY KEY AUTO_INCREMENT,
+    cuidador_id INTEGER,
+    servicio VARCHAR(100),
+    FOREIGN KEY(cuidador_id) REFERENCES usuarios(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS reseñas (
+    id INTEGER PRIMARY KEY AUTO_INCREMENT,
+    cuidador_id INTEGER,
+    cliente_id INTEGER,
+    texto TEXT,
+    calificacion INTEGER CHECK(calificacion >= 1 AND calificacion <= 5),
+    FOREIGN KEY(cuidador_id) REFERENCES usuarios(id) ON DELETE CASCADE,
+    FOREIGN KEY(cliente_id) REFERENCES usuarios(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS mensajes_contacto (
+    id INTEGER PRIMARY KEY AUTO_INCREMENT,
+    nombre TEXT NOT NULL,
+    email TEXT NOT NULL,
+    asunto TEXT NOT NULL,
+    mensaje TEXT NOT NULL,
+    fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    leido BOOLEAN DEFAULT 0
+);
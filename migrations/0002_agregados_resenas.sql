@@ -0,0 +1,26 @@
+-- Agregados de reseñas por cuidador (ver ratings.py). `rating` pasa a ser el promedio derivado.
+
+ALTER TABLE cuidadores ADD COLUMN reseñas_total INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE cuidadores ADD COLUMN reseñas_suma INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE cuidadores ADD COLUMN estrellas_1 INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE cuidadores ADD COLUMN estrellas_2 INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE cuidadores ADD COLUMN estrellas_3 INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE cuidadores ADD COLUMN estrellas_4 INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE cuidadores ADD COLUMN estrellas_5 INTEGER NOT NULL DEFAULT 0;
+
+UPDATE cuidadores c
+LEFT JOIN (
+    SELECT cuidador_id, COUNT(*) AS total, SUM(calificacion) AS suma,
+           SUM(calificacion = 1) AS e1, SUM(calificacion = 2) AS e2, SUM(calificacion = 3) AS e3,
+           SUM(calificacion = 4) AS e4, SUM(calificacion = 5) AS e5
+    FROM reseñas
+    GROUP BY cuidador_id
+) r ON r.cuidador_id = c.usuario_id
+SET c.reseñas_total = COALESCE(r.total, 0),
+    c.reseñas_suma = COALESCE(r.suma, 0),
+    c.estrellas_1 = COALESCE(r.e1, 0),
+    c.estrellas_2 = COALESCE(r.e2, 0),
+    c.estrellas_3 = COALESCE(r.e3, 0),
+    c.estrellas_4 = COALESCE(r.e4, 0),
+    c.estrellas_5 = COALESCE(r.e5, 0),
+    c.rating = IF(COALESCE(r.total, 0) > 0, ROUND(r.suma / r.total, 2), 0);
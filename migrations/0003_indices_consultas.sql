@@ -0,0 +1,11 @@
+-- Índices para los filtros y joins de admin_main, dashboard y get_reviews.
+-- En InnoDB cada índice secundario incluye la PK, así que (tipo_usuario) también sirve para ORDER BY id.
+
+CREATE INDEX idx_usuarios_tipo ON usuarios (tipo_usuario);
+CREATE INDEX idx_usuarios_tipo_nombre ON usuarios (tipo_usuario, nombre);
+
+CREATE INDEX idx_servicios_cuidador ON servicios_cuidadores (cuidador_id, servicio);
+CREATE INDEX idx_servicios_servicio ON servicios_cuidadores (servicio, cuidador_id);
+
+CREATE INDEX idx_resenas_cuidador ON reseñas (cuidador_id, calificacion);
+CREATE INDEX idx_resenas_cliente ON reseñas (cliente_id, cuidador_id, calificacion);
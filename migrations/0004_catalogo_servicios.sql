@@ -0,0 +1,26 @@
+-- Catálogo de servicios (ver servicios.py). servicios_cuidadores.servicio pasa a referenciar
+-- servicios.nombre: un nombre nuevo se agrega al catálogo antes de asignarlo.
+-- `orden` marca los servicios que se ofrecen en los formularios y filtros (NULL = solo catálogo).
+
+CREATE TABLE IF NOT EXISTS servicios (
+    id INTEGER PRIMARY KEY AUTO_INCREMENT,
+    nombre VARCHAR(100) NOT NULL UNIQUE,
+    orden INTEGER NULL
+);
+
+INSERT IGNORE INTO servicios (nombre, orden) VALUES
+    ('Alojamiento', 1),
+    ('Paseos', 2),
+    ('Transporte', 3),
+    ('Peluquería', 4),
+    ('Cuidado Especializado', 5);
+
+DELETE FROM servicios_cuidadores WHERE servicio IS NULL OR TRIM(servicio) = '';
+UPDATE servicios_cuidadores SET servicio = TRIM(servicio);
+
+INSERT IGNORE INTO servicios (nombre)
+SELECT DISTINCT servicio FROM servicios_cuidadores;
+
+ALTER TABLE servicios_cuidadores MODIFY servicio VARCHAR(100) NOT NULL;
+ALTER TABLE servicios_cuidadores
+    ADD CONSTRAINT fk_servicios_cuidadores_servicio FOREIGN KEY (servicio) REFERENCES servicios (nombre) ON UPDATE CASCADE;
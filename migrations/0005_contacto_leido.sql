@@ -0,0 +1,7 @@
+-- Los contadores de mensajes de contacto (total y sin leer) se siembran con una sola consulta
+-- que recorre este índice en vez de la tabla.
+
+UPDATE mensajes_contacto SET leido = 0 WHERE leido IS NULL;
+ALTER TABLE mensajes_contacto MODIFY leido BOOLEAN NOT NULL DEFAULT 0;
+
+CREATE INDEX idx_mensajes_contacto_leido ON mensajes_contacto (leido);
@@ -0,0 +1,133 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FuturoVencido
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+def _parametros(password_hash):
+    # Formato de werkzeug: "metodo:parametros$salt$hash"
+    partes = (password_hash or '').split('$')
+    if len(partes) != 3:
+        return None, 0
+    return partes[0], len(partes[1])
+
+
+class Hasher:
+    """
+    Hashea y verifica contraseñas con los parámetros configurados.
+
+    El trabajo de CPU corre en un pool de `workers` procesos, así los hilos del worker web
+    no compiten por el GIL durante un pico de logins; `max_pendientes` acota cuántas
+    operaciones pueden esperar en cola. Con workers=0 todo corre en el hilo que llama.
+    """
+
+    def __init__(self, method='pbkdf2:sha256', salt_length=16, workers=0, max_pendientes=64, timeout=30):
+        self.method = method
+        self.salt_length = salt_length
+        self.workers = workers
+        self.timeout = timeout
+        self._cupos = threading.BoundedSemaphore(max_pendientes)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self._metodo_actual = None
+        self._stats_lock = threading.Lock()
+        self.hashes = 0
+        self.verificaciones = 0
+        self.rehashes = 0
+
+    def _get_executor(self):
+        # Un pool heredado de otro proceso (fork de gunicorn) no sirve: se crea uno por worker.
+        # Los procesos se arrancan con spawn y no con fork: el worker web ya tiene hilos corriendo
+        # y un fork copiaría locks tomados por otros hilos
+        if self._executor is None or self._pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._pid != os.getpid():
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                         mp_context=multiprocessing.get_context('spawn'))
+                    self._pid = os.getpid()
+        return self._executor
+
+    def _contar(self, campo, cantidad=1):
+        # Los contadores se comparten entre los hilos del worker
+        with self._stats_lock:
+            setattr(self, campo, getattr(self, campo) + cantidad)
+
+    def _ejecutar(self, fn, *args):
+        """Corre `fn` en el pool. TimeoutError si no hay cupo o si no termina en `timeout` segundos."""
+        if not self.workers:
+            return fn(*args)
+        if not self._cupos.acquire(timeout=self.timeout):
+            raise TimeoutError("Demasiadas operaciones de contraseña en espera.")
+        try:
+            futuro = self._get_executor().submit(fn, *args)
+        except BaseException:
+            self._cupos.release()
+            raise
+        # El cupo se devuelve cuando la tarea termina (o se cancela), no cuando el llamador deja de
+        # esperar: si no, las tareas vencidas seguirían en el pool sin contar para `max_pendientes`
+        futuro.add_done_callback(lambda _: self._cupos.release())
+        try:
+            return futuro.result(timeout=self.timeout)
+        except FuturoVencido:
+            futuro.cancel()
+            raise TimeoutError("La operación de contraseña no terminó a tiempo.") from None
+
+    def hashear(self, password):
+        self._contar('hashes')
+        return self._ejecutar(generate_password_hash, password, self.method, self.salt_length)
+
+    def hashear_lote(self, passwords):
+        """Hashea una lista de contraseñas repartiéndolas entre todos los procesos del pool."""
+        passwords = list(passwords)
+        self._contar('hashes', len(passwords))
+        metodos, salts = [self.method] * len(passwords), [self.salt_length] * len(passwords)
+        if not self.workers:
+            return list(map(generate_password_hash, passwords, metodos, salts))
+        chunksize = max(1, len(passwords) // (self.workers * 4))
+        return list(self._get_executor().map(generate_password_hash, passwords, metodos, salts, chunksize=chunksize))
+
+    def verificar(self, password_hash, password):
+        self._contar('verificaciones')
+        return self._ejecutar(check_password_hash, password_hash, password)
+
+    @property
+    def metodo_actual(self):
+        # "pbkdf2:sha256" se guarda con las iteraciones explícitas: se averigua una vez
+        if self._metodo_actual is None:
+            self._metodo_actual = _parametros(generate_password_hash('', self.method, self.salt_length))[0]
+        return self._metodo_actual
+
+    def necesita_rehash(self, password_hash):
+        """True si el hash se generó con otros parámetros que los configurados."""
+        metodo, salt_length = _parametros(password_hash)
+        return metodo != self.metodo_actual or salt_length != self.salt_length
+
+    def registrar_rehash(self):
+        self._contar('rehashes')
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                'method': self.metodo_actual,
+                'workers': self.workers,
+                'hashes': self.hashes,
+                'verificaciones': self.verificaciones,
+                'rehashes': self.rehashes,
+            }
+
+    def shutdown(self, wait=True):
+        if self._executor is not None and self._pid == os.getpid():
+            self._executor.shutdown(wait=wait)
+
+
+def crear_hasher(workers=None):
+    """Crea el Hasher según PASSWORD_METHOD, PASSWORD_SALT_LENGTH, PASSWORD_WORKERS y PASSWORD_MAX_PENDIENTES."""
+    return Hasher(method=os.getenv("PASSWORD_METHOD", "pbkdf2:sha256"),
+                  salt_length=int(os.getenv("PASSWORD_SALT_LENGTH", 16)),
+                  workers=int(os.getenv("PASSWORD_WORKERS", 1)) if workers is None else workers,
+                  max_pendientes=int(os.getenv("PASSWORD_MAX_PENDIENTES", 64)),
+                  timeout=float(os.getenv("PASSWORD_TIMEOUT", 30)))
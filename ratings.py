@@ -0,0 +1,70 @@
+# --- AGREGADOS DE RESEÑAS POR CUIDADOR ---
+# `cuidadores` guarda cantidad, suma e histograma de calificaciones, y `rating` es el
+# promedio derivado. Así el listado y el orden por rating cuestan O(1) por fila.
+
+CALIFICACIONES = range(1, 6)
+
+
+def validar_calificacion(calificacion):
+    calificacion = int(calificacion)
+    if calificacion not in CALIFICACIONES:
+        raise ValueError("La calificación debe estar entre 1 y 5.")
+    return calificacion
+
+
+def aplicar_calificacion(cursor, cuidador_id, calificacion, cantidad=1):
+    """
+    Suma (cantidad > 0) o resta (cantidad < 0) calificaciones a los agregados del cuidador.
+    Debe ejecutarse en la misma transacción que la escritura sobre `reseñas`.
+    """
+    calificacion = validar_calificacion(calificacion)
+    # MySQL evalúa las asignaciones de izquierda a derecha: `rating` ya ve total y suma actualizados
+    cursor.execute(f"""
+        UPDATE cuidadores
+        SET reseñas_total = reseñas_total + %s,
+            reseñas_suma = reseñas_suma + %s,
+            estrellas_{calificacion} = estrellas_{calificacion} + %s,
+            rating = IF(reseñas_total > 0, ROUND(reseñas_suma / reseñas_total, 2), 0)
+        WHERE usuario_id = %s
+    """, (cantidad, cantidad * calificacion, cantidad, cuidador_id))
+
+
+def recalcular_agregados(cursor, desde_id=None, hasta_id=None, ids=None):
+    """
+    Recalcula desde `reseñas` los agregados de los cuidadores con usuario_id en [desde_id, hasta_id]
+    y, si se pasa `ids`, solo los de esa lista.
+    """
+    condiciones, params = [], []
+    if desde_id is not None:
+        condiciones.append("cuidador_id >= %s")
+        params.append(desde_id)
+    if hasta_id is not None:
+        condiciones.append("cuidador_id <= %s")
+        params.append(hasta_id)
+    if ids is not None:
+        ids = list(ids)
+        if not ids:
+            return 0
+        condiciones.append(f"cuidador_id IN ({', '.join(['%s'] * len(ids))})")
+        params.extend(ids)
+    filtro_reseñas = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+    filtro_cuidadores = f"WHERE {' AND '.join(c.replace('cuidador_id', 'c.usuario_id') for c in condiciones)}" if condiciones else ""
+
+    histograma = ",\n".join(f"SUM(calificacion = {n}) AS e{n}" for n in CALIFICACIONES)
+    asignaciones = ",\n".join(f"c.estrellas_{n} = COALESCE(r.e{n}, 0)" for n in CALIFICACIONES)
+    cursor.execute(f"""
+        UPDATE cuidadores c
+        LEFT JOIN (
+            SELECT cuidador_id, COUNT(*) AS total, SUM(calificacion) AS suma,
+                   {histograma}
+            FROM reseñas
+            {filtro_reseñas}
+            GROUP BY cuidador_id
+        ) r ON r.cuidador_id = c.usuario_id
+        SET c.reseñas_total = COALESCE(r.total, 0),
+            c.reseñas_suma = COALESCE(r.suma, 0),
+            {asignaciones},
+            c.rating = IF(COALESCE(r.total, 0) > 0, ROUND(r.suma / r.total, 2), 0)
+        {filtro_cuidadores}
+    """, params * 2)
+    return cursor.rowcount
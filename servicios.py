@@ -0,0 +1,22 @@
+# --- CATÁLOGO DE SERVICIOS ---
+# `servicios` es el catálogo normalizado y servicios_cuidadores.servicio referencia su nombre.
+# Los servicios con `orden` son los que se ofrecen en formularios y filtros.
+
+
+def normalizar_servicios(nombres):
+    """Sin vacíos ni repetidos, respetando el orden."""
+    return list(dict.fromkeys(n.strip() for n in nombres if n and n.strip()))
+
+
+def registrar_en_catalogo(cursor, nombres):
+    """Agrega al catálogo los nombres que no estén. Debe correr antes de insertar en servicios_cuidadores."""
+    nombres = normalizar_servicios(nombres)
+    if nombres:
+        cursor.executemany("INSERT IGNORE INTO servicios (nombre) VALUES (%s)", [(n,) for n in nombres])
+    return nombres
+
+
+def cargar_catalogo(cursor):
+    """Los servicios ofrecidos en formularios y filtros, en su orden."""
+    cursor.execute("SELECT nombre FROM servicios WHERE orden IS NOT NULL ORDER BY orden, nombre")
+    return [row['nombre'] for row in cursor.fetchall()]
@@ -0,0 +1,98 @@
+import gzip
+import hashlib
+import os
+import posixpath
+import threading
+
+# Tipos que vale la pena precomprimir; las imágenes ya vienen comprimidas
+COMPRIMIBLES = ('.css', '.js', '.svg', '.json', '.txt', '.html', '.map', '.ico')
+
+# Orden de preferencia de las variantes precomprimidas
+CODIFICACIONES = (('br', '.br'), ('gzip', '.gz'))
+
+
+class StaticAssets:
+    """
+    Versiones por contenido de los archivos de static/ (para URLs con ?v=<hash> cacheables
+    sin vencimiento) y sus variantes precomprimidas .br/.gz generadas por `comprimir`.
+    """
+
+    def __init__(self, carpeta):
+        self.carpeta = carpeta
+        self._versiones = {}
+        self._lock = threading.Lock()
+
+    def normalizar(self, filename):
+        # Las plantillas usan './css/...' y '/assets/...': todas apuntan al mismo archivo
+        return posixpath.normpath(filename.replace('\\', '/')).lstrip('/')
+
+    def _ruta(self, filename):
+        ruta = os.path.realpath(os.path.join(self.carpeta, filename))
+        if not ruta.startswith(os.path.realpath(self.carpeta) + os.sep):
+            return None
+        return ruta
+
+    def version(self, filename):
+        """Hash corto del contenido; se recalcula solo si cambia la fecha de modificación."""
+        filename = self.normalizar(filename)
+        ruta = self._ruta(filename)
+        try:
+            mtime = os.path.getmtime(ruta) if ruta else None
+        except OSError:
+            return None
+        if mtime is None:
+            return None
+        guardada = self._versiones.get(filename)
+        if guardada and guardada[0] == mtime:
+            return guardada[1]
+        digest = hashlib.sha1()
+        with open(ruta, 'rb') as f:
+            for bloque in iter(lambda: f.read(64 * 1024), b''):
+                digest.update(bloque)
+        version = digest.hexdigest()[:12]
+        with self._lock:
+            self._versiones[filename] = (mtime, version)
+        return version
+
+    def variante_comprimida(self, filename, accept_encoding):
+        """(archivo, codificación) de la mejor variante precomprimida que acepta el cliente, o None."""
+        filename = self.normalizar(filename)
+        if not filename.endswith(COMPRIMIBLES):
+            return None
+        aceptadas = {parte.split(';')[0].strip().lower() for parte in (accept_encoding or '').split(',')}
+        ruta = self._ruta(filename)
+        if ruta is None:
+            return None
+        for codificacion, extension in CODIFICACIONES:
+            if codificacion in aceptadas and os.path.isfile(ruta + extension) \
+                    and os.path.getmtime(ruta + extension) >= os.path.getmtime(ruta):
+                return filename + extension, codificacion
+        return None
+
+    def comprimir(self):
+        """Genera .gz (y .br si está instalado el paquete `brotli`) de los archivos comprimibles. Devuelve los generados."""
+        try:
+            import brotli
+        except ImportError:
+            brotli = None
+
+        generados = []
+        for raiz, _, archivos in os.walk(self.carpeta):
+            for nombre in archivos:
+                if not nombre.endswith(COMPRIMIBLES):
+                    continue
+                ruta = os.path.join(raiz, nombre)
+                with open(ruta, 'rb') as f:
+                    contenido = f.read()
+                # mtime=0: el .gz no cambia si el contenido no cambia
+                variantes = [('.gz', gzip.compress(contenido, compresslevel=9, mtime=0))]
+                if brotli is not None:
+                    variantes.append(('.br', brotli.compress(contenido, quality=11)))
+                for extension, comprimido in variantes:
+                    # Si no achica, no se genera: se sirve el original
+                    if len(comprimido) >= len(contenido):
+                        continue
+                    with open(ruta + extension, 'wb') as f:
+                        f.write(comprimido)
+                    generados.append(os.path.relpath(ruta + extension, self.carpeta))
+        return generados
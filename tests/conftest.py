@@ -0,0 +1,112 @@
+import os
+import sys
+
+# Los módulos de la app están en la raíz del repositorio, sin paquete
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+# --- BASE FALSA ---
+# Conexiones y pools con la forma de PyMySQL, sin servidor. Cada test decide qué devuelve la
+# base con `responder(sql, params)`: las filas de un SELECT, o una excepción para simular un
+# error. Las filas de executemany quedan pendientes hasta el commit.
+def sin_filas(sql, params):
+    return []
+
+
+class CursorFalso:
+    def __init__(self, conn):
+        self.conn = conn
+        self.filas = []
+        self.rowcount = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.conn.ejecutadas.append((sql, params))
+        self.filas = list(self.conn.responder(sql, params) or [])
+        self.rowcount = len(self.filas)
+
+    def executemany(self, sql, filas):
+        filas = list(filas)
+        self.conn.ejecutadas.append((sql, filas))
+        self.conn.responder(sql, filas)
+        self.conn.pendientes.extend(filas)
+        self.rowcount = len(filas)
+
+    def fetchall(self):
+        return list(self.filas)
+
+    def fetchone(self):
+        return self.filas[0] if self.filas else None
+
+    def close(self):
+        pass
+
+
+class ConexionFalsa:
+    def __init__(self, responder=sin_filas):
+        self.responder = responder
+        self.ejecutadas = []
+        self.pendientes = []
+        self.confirmadas = []
+        self.commits = 0
+        self.rollbacks = 0
+        self.cerrada = False
+        self.falla_ping = False
+
+    def sentencias(self):
+        return [sql for sql, _ in self.ejecutadas]
+
+    def cursor(self):
+        return CursorFalso(self)
+
+    def commit(self):
+        self.commits += 1
+        self.confirmadas.extend(self.pendientes)
+        self.pendientes = []
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.pendientes = []
+
+    def ping(self, reconnect=False):
+        if self.falla_ping:
+            raise OSError("conexión perdida")
+
+    def close(self):
+        self.cerrada = True
+
+
+class Conector:
+    """Factory de conexiones falsas (como connect_db) que recuerda todas las que creó."""
+
+    def __init__(self, responder=sin_filas):
+        self.responder = responder
+        self.creadas = []
+
+    def __call__(self):
+        conn = ConexionFalsa(self.responder)
+        self.creadas.append(conn)
+        return conn
+
+
+class PoolFalso:
+    """Lo mínimo de ConnectionPool: cada acquire es una conexión nueva del `Conector`."""
+
+    def __init__(self, responder=sin_filas):
+        self.conector = Conector(responder)
+        self.descartadas = 0
+
+    @property
+    def confirmadas(self):
+        return [fila for conn in self.conector.creadas for fila in conn.confirmadas]
+
+    def acquire(self):
+        return self.conector()
+
+    def release(self, conn, discard=False):
+        self.descartadas += discard
@@ -0,0 +1,155 @@
+import re
+
+import pytest
+
+import app as aplicacion
+
+from conftest import ConexionFalsa
+
+ADMIN = {'id': 1, 'email': 'admin@example.com', 'nombre': 'Admin', 'tipo_usuario': 'admin'}
+
+
+class Tabla:
+    """Responder que resuelve las consultas del panel sobre una lista de ids."""
+
+    def __init__(self, ids):
+        self.ids = sorted(ids)
+
+    def __call__(self, sql, params):
+        if 'COUNT(*)' in sql:
+            return [{'count': len(self.ids), 'sin_leer': 0}]
+        ids = self.ids
+        condicion = re.search(r"\bid ([<>]) %s", sql)
+        if condicion:
+            valor = params[0]
+            ids = [id for id in ids if (id > valor if condicion.group(1) == '>' else id < valor)]
+        if re.search(r"ORDER BY \S+ DESC", sql):
+            ids = ids[::-1]
+        return [{'id': id} for id in ids[:params[-1]]]
+
+
+@pytest.fixture
+def panel(monkeypatch):
+    """Pide una página del panel como admin y devuelve la Pagination que llega al template."""
+    tabla = Tabla([])
+    monkeypatch.setattr(aplicacion, 'get_read_db', lambda: ConexionFalsa(tabla))
+    renderizados = []
+    monkeypatch.setattr(aplicacion, 'render_template', lambda nombre, **contexto: renderizados.append(contexto) or '')
+    aplicacion.cache.clear()
+    aplicacion.cache.set(f"usuario:{ADMIN['id']}", ADMIN, ttl=0)
+    cliente = aplicacion.app.test_client()
+    with cliente.session_transaction() as sesion:
+        sesion['_user_id'] = str(ADMIN['id'])
+
+    def pedir(page, ids=None, **args):
+        if ids is not None:
+            tabla.ids = sorted(ids)
+            aplicacion.cache.clear()
+            aplicacion.cache.set(f"usuario:{ADMIN['id']}", ADMIN, ttl=0)
+        respuesta = cliente.get(f"/admin/page/{page}", query_string=args)
+        if respuesta.status_code != 200:
+            return respuesta
+        contexto = renderizados[-1]
+        return contexto[contexto['type']]
+
+    yield pedir
+    aplicacion.cache.clear()
+
+
+def ids(pagina):
+    return [fila['id'] for fila in pagina.items]
+
+
+def recorrer(pedir, page_type, total):
+    """Ids del listado recorrido con 'siguiente' desde la primera y con 'anterior' desde la última."""
+    adelante, pagina = [], pedir(f"{page_type}-1", range(1, total + 1), per_page=20)
+    while True:
+        adelante.extend(ids(pagina))
+        if not pagina.has_next:
+            break
+        pagina = pedir(f"{page_type}-{pagina.next_num}", after=pagina.next_cursor, per_page=20)
+
+    atras, pagina = [], pedir(f"{page_type}-1", last=1, per_page=20)
+    while True:
+        atras[:0] = ids(pagina)
+        if not pagina.has_prev:
+            break
+        pagina = pedir(f"{page_type}-{pagina.prev_num}", before=pagina.prev_cursor, per_page=20)
+    return adelante, atras
+
+
+@pytest.mark.parametrize('total', [0, 1, 20, 40, 45])
+@pytest.mark.parametrize('page_type, descendente', [('cl', False), ('co', True)])
+def test_recorre_todo_en_los_dos_sentidos(panel, page_type, descendente, total):
+    esperados = sorted(range(1, total + 1), reverse=descendente)
+    adelante, atras = recorrer(panel, page_type, total)
+    assert adelante == esperados
+    assert atras == esperados
+
+
+def test_primera_pagina(panel):
+    pagina = panel('cl-7', range(1, 46), per_page=20)
+    assert ids(pagina) == list(range(1, 21))
+    # Sin cursor siempre es la página 1, diga lo que diga la URL
+    assert pagina.page == 1 and pagina.pages == 3
+    assert not pagina.has_prev and pagina.has_next
+
+
+def test_ultima_pagina_incompleta(panel):
+    pagina = panel('cl-1', range(1, 46), per_page=20, last=1)
+    assert ids(pagina) == list(range(26, 46))
+    assert pagina.page == 3
+    assert pagina.has_prev and not pagina.has_next
+
+
+def test_justo_antes_del_final_no_hay_siguiente(panel):
+    # 40 filas: la página después del id 20 trae exactamente per_page y no hay más
+    pagina = panel('cl-2', range(1, 41), per_page=20, after=20)
+    assert ids(pagina) == list(range(21, 41))
+    assert pagina.has_prev and not pagina.has_next
+
+
+def test_before_llega_al_principio(panel):
+    pagina = panel('cl-2', range(1, 46), per_page=20, before=15)
+    assert ids(pagina) == list(range(1, 15))
+    assert not pagina.has_prev and pagina.has_next
+
+
+def test_cursor_de_una_fila_borrada(panel):
+    # El cursor es un valor, no una posición: sigue sirviendo si esa fila ya no existe
+    pagina = panel('cl-2', [1, 2, 3, 5, 6], per_page=2, after=4)
+    assert ids(pagina) == [5, 6]
+    assert not pagina.has_next
+
+
+def test_orden_descendente_con_after(panel):
+    pagina = panel('co-2', range(1, 46), per_page=20, after=30)
+    assert ids(pagina) == list(range(29, 9, -1))
+    assert pagina.has_next
+
+
+@pytest.mark.parametrize('pedido, usado', [(1000, aplicacion.ADMIN_MAX_PER_PAGE), (0, 1), (-5, 1)])
+def test_per_page_acotado(panel, pedido, usado):
+    assert panel('cl-1', range(1, 200), per_page=pedido).per_page == usado
+
+
+@pytest.mark.parametrize('page, args', [('cl-x', {}), ('cl', {}), ('cl-1', {'per_page': 'muchos'})])
+def test_pagina_invalida_vuelve_al_panel(panel, page, args):
+    respuesta = panel(page, [], **args)
+    assert respuesta.status_code == 302
+    assert respuesta.headers['Location'].endswith('/admin/')
+
+
+def test_sql_descendente_invierte_comparacion_y_orden():
+    listado = aplicacion.ADMIN_LISTADOS['co']
+    sql, params = aplicacion.sql_pagina_admin(listado, after=30, per_page=10)
+    assert 'id < %s' in sql and 'ORDER BY id DESC' in sql and params == [30, 11]
+    sql, params = aplicacion.sql_pagina_admin(listado, before=30, per_page=10)
+    assert 'id > %s' in sql and 'ORDER BY id ASC' in sql and params == [30, 11]
+    sql, params = aplicacion.sql_pagina_admin(listado, ultima=True, per_page=10)
+    assert 'WHERE' not in sql and 'ORDER BY id ASC' in sql and params == [11]
+
+
+def test_sql_conserva_los_filtros_fijos():
+    sql, _ = aplicacion.sql_pagina_admin(aplicacion.ADMIN_LISTADOS['cl'], after=3)
+    assert "WHERE tipo_usuario = 'cliente' AND id > %s" in sql
@@ -0,0 +1,79 @@
+import pytest
+
+pytest.importorskip('starlette')
+pytest.importorskip('httpx')
+
+from starlette.testclient import TestClient
+
+import app as aplicacion
+import asgi
+from conftest import ConexionFalsa
+
+USUARIO = {'id': 1, 'email': 'cliente@example.com', 'nombre': 'Cliente', 'tipo_usuario': 'cliente'}
+
+
+def sin_cache():
+    # Las dos apps comparten el cache del proceso: cada una tiene que calcular su página
+    aplicacion.cache.clear()
+    aplicacion.cache.set(f"usuario:{USUARIO['id']}", USUARIO, ttl=0)
+
+
+@pytest.fixture
+def llamadas(monkeypatch):
+    """Registra con qué clave de cache y qué filtros piden la página las dos apps, sin base."""
+    registro = []
+    clave_listado = aplicacion.clave_listado
+
+    def espiar_clave(*partes):
+        registro.append(('clave', partes))
+        return clave_listado(*partes)
+
+    def espiar_pagina(*args):
+        registro.append(('pagina', args))
+        return [], None
+
+    for modulo in (aplicacion, asgi):
+        monkeypatch.setattr(modulo, 'ids_de_pagina', espiar_pagina)
+        monkeypatch.setattr(modulo, 'clave_listado', espiar_clave)
+    monkeypatch.setattr(aplicacion, 'get_read_db', ConexionFalsa)
+    sin_cache()
+    yield registro
+    aplicacion.cache.clear()
+
+
+def pedir_flask(ruta):
+    cliente = aplicacion.app.test_client()
+    with cliente.session_transaction() as sesion:
+        sesion['_user_id'] = str(USUARIO['id'])
+    return cliente.get(ruta)
+
+
+def pedir_asgi(ruta):
+    # Sin `with`: no corre el ciclo de vida, así que no se crea el pool de aiomysql
+    cliente = TestClient(asgi.app)
+    cliente.cookies.set(aplicacion.app.config['SESSION_COOKIE_NAME'],
+                        asgi._serializador.dumps({'_user_id': str(USUARIO['id'])}))
+    return cliente.get(ruta)
+
+
+@pytest.mark.parametrize('consulta', [
+    '/api/cuidadores?servicios=Paseos&servicios=%20Ba%C3%B1o%20&servicios=&servicios=Paseos',
+    '/api/cuidadores?q=lanus&servicios=%20Paseos&limit=5&after=10',
+    '/api/cuidadores?servicios=&servicios=%20',
+])
+def test_api_cuidadores_igual_en_flask_y_asgi(llamadas, consulta):
+    respuesta_flask = pedir_flask(consulta)
+    en_flask = list(llamadas)
+    llamadas.clear()
+    sin_cache()
+    respuesta_asgi = pedir_asgi(consulta)
+
+    assert respuesta_flask.status_code == respuesta_asgi.status_code == 200
+    assert respuesta_flask.get_json() == respuesta_asgi.json()
+    # Misma clave de cache y mismos filtros para los índices
+    assert en_flask == llamadas
+    assert all('' not in servicios and ' ' not in servicios for _, (_, servicios, *_) in llamadas)
+
+
+def test_api_cuidadores_sin_sesion_en_asgi():
+    assert TestClient(asgi.app).get('/api/cuidadores').status_code == 401
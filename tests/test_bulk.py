@@ -0,0 +1,66 @@
+from bulk import _upsert_usuarios
+from conftest import ConexionFalsa
+from passwords import Hasher
+
+
+class TablaUsuarios:
+    """Tabla usuarios en memoria: lo justo para _upsert_usuarios."""
+
+    def __init__(self, usuarios):
+        self.usuarios = {u['email']: dict(u) for u in usuarios}
+
+    def __call__(self, sql, params):
+        if sql.startswith('SELECT'):
+            return [dict(self.usuarios[email]) for email in params if email in self.usuarios]
+        if sql.strip().startswith('INSERT'):
+            for nombre, email, password, tipo in params:
+                self.usuarios.setdefault(email, {'id': len(self.usuarios) + 1, 'email': email, 'nombre': nombre,
+                                                 'password': password, 'tipo_usuario': tipo})
+        elif 'password' in sql:
+            for nombre, password, email, tipo in params:
+                if self.usuarios[email]['tipo_usuario'] == tipo:
+                    self.usuarios[email].update(nombre=nombre, password=password)
+        else:
+            for nombre, email, tipo in params:
+                if self.usuarios[email]['tipo_usuario'] == tipo:
+                    self.usuarios[email]['nombre'] = nombre
+        return []
+
+
+def test_solo_hashea_los_nuevos_y_las_contraseñas_provistas():
+    tabla = TablaUsuarios([
+        {'id': 1, 'email': 'a@x', 'nombre': 'A', 'password': 'hash-a', 'tipo_usuario': 'cliente'},
+        {'id': 2, 'email': 'b@x', 'nombre': 'B', 'password': 'hash-b', 'tipo_usuario': 'cliente'},
+    ])
+    cursor = ConexionFalsa(tabla).cursor()
+    hasher = Hasher(method='pbkdf2:sha256:1000', workers=0)
+    ids = _upsert_usuarios(cursor, [
+        {'email': 'a@x', 'nombre': 'A2'},
+        {'email': 'b@x', 'nombre': 'B', 'password': 'nueva'},
+        {'email': 'c@x', 'nombre': 'C'},
+        {'email': 'd@x', 'nombre': 'D'},
+    ], 'cliente', hasher)
+
+    assert ids == {'a@x': 1, 'b@x': 2, 'c@x': 3, 'd@x': 4}
+    assert hasher.hashes == 3
+    usuarios = tabla.usuarios
+    # El existente sin contraseña en el archivo conserva la suya
+    assert usuarios['a@x']['password'] == 'hash-a' and usuarios['a@x']['nombre'] == 'A2'
+    assert hasher.verificar(usuarios['b@x']['password'], 'nueva')
+    # Los nuevos reciben la contraseña inicial, cada uno con su salt
+    assert usuarios['c@x']['password'] != usuarios['d@x']['password']
+    assert hasher.verificar(usuarios['c@x']['password'], 'default_password')
+
+
+def test_no_toca_usuarios_de_otro_tipo():
+    admin = {'id': 1, 'email': 'admin@x', 'nombre': 'Admin', 'password': 'hash-admin', 'tipo_usuario': 'admin'}
+    tabla = TablaUsuarios([admin])
+    conn = ConexionFalsa(tabla)
+    cursor = conn.cursor()
+    hasher = Hasher(method='pbkdf2:sha256:1000', workers=0)
+    filas = [{'email': 'admin@x', 'nombre': 'Intruso', 'password': 'nueva'}]
+    assert _upsert_usuarios(cursor, filas, 'cuidador', hasher) == {}
+    assert tabla.usuarios['admin@x'] == admin
+    assert hasher.hashes == 0
+    # Ni siquiera se manda un UPDATE para ese email
+    assert all(sql.startswith('SELECT') for sql in conn.sentencias())
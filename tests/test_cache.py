@@ -0,0 +1,150 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+from markupsafe import Markup
+
+import cache as cache_mod
+from cache import MemoryCache, RedisCache
+
+
+class Reloj:
+    def __init__(self):
+        self.ahora = 1000.0
+
+    def __call__(self):
+        return self.ahora
+
+
+@pytest.fixture
+def reloj(monkeypatch):
+    reloj = Reloj()
+    monkeypatch.setattr(cache_mod.time, 'monotonic', reloj)
+    return reloj
+
+
+# --- MEMORIA ---
+def test_vence_con_el_ttl(reloj):
+    cache = MemoryCache(default_ttl=10)
+    cache.set('a', 1)
+    cache.set('b', 2, ttl=0.5)
+    reloj.ahora += 0.6
+    assert cache.get('a') == 1
+    assert cache.get('b') is None
+    reloj.ahora += 10
+    assert cache.get('a') is None
+
+
+def test_ttl_cero_no_vence(reloj):
+    cache = MemoryCache(default_ttl=0)
+    cache.set('a', 1)
+    reloj.ahora += 10 ** 6
+    assert cache.get('a') == 1
+
+
+def test_lru_desaloja_la_menos_usada():
+    cache = MemoryCache(max_items=2, default_ttl=0)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    assert cache.stats()['evictions'] == 1
+
+
+def test_get_or_set_calcula_una_vez():
+    cache = MemoryCache()
+    llamadas = []
+    for _ in range(3):
+        assert cache.get_or_set('k', lambda: llamadas.append(1) or 'v') == 'v'
+    assert len(llamadas) == 1
+
+
+def test_get_many_omite_las_que_faltan():
+    cache = MemoryCache()
+    cache.set_many({'a': 1, 'b': None})
+    assert cache.get_many(['a', 'b', 'c']) == {'a': 1, 'b': None}
+
+
+def test_contadores_sobreviven_a_clear_y_a_los_desalojos():
+    cache = MemoryCache(max_items=1)
+    cache.incr('gen')
+    cache.incr('gen', 2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.clear()
+    assert cache.get_counter('gen') == 3
+
+
+# --- REDIS ---
+class RedisFalso:
+    def __init__(self):
+        self.sets = []
+        self.datos = {}
+
+    def set(self, key, valor, ex=None, px=None):
+        assert isinstance(valor, bytes)
+        self.sets.append((key, ex, px))
+        self.datos[key] = valor
+
+    def get(self, key):
+        return self.datos.get(key)
+
+    def mget(self, keys):
+        return [self.datos.get(key) for key in keys]
+
+    def pipeline(self, transaction=True):
+        return PipelineFalso(self)
+
+
+class PipelineFalso:
+    def __init__(self, redis):
+        self.redis = redis
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, *args, **kwargs):
+        self.redis.set(*args, **kwargs)
+
+    def execute(self):
+        pass
+
+
+def redis_falso(default_ttl=60):
+    cache = RedisCache.__new__(RedisCache)
+    cache_mod._BaseCache.__init__(cache, default_ttl)
+    cache.prefix = 'p:'
+    cache._redis = RedisFalso()
+    return cache
+
+
+@pytest.mark.parametrize('ttl, px', [(0.2, 200), (0.0001, 1), (30, 30000), (0, None)])
+def test_redis_ttl_en_milisegundos(ttl, px):
+    cache = redis_falso()
+    cache.set('a', 1, ttl=ttl)
+    cache.set_many({'b': 2}, ttl=ttl)
+    assert cache._redis.sets == [('p:a', None, px), ('p:b', None, px)]
+
+
+def test_redis_devuelve_los_mismos_tipos():
+    cache = redis_falso()
+    fila = {'id': 1, 'rating': Decimal('4.50'), 'lat': Decimal('-34.700000'), 'fecha': datetime(2024, 5, 1, 12, 30),
+            'dia': date(2024, 5, 1), 'ids': (1, 2), 'html': Markup('<b>Ana</b>'), 'nada': None}
+    cache.set('fila', fila)
+    cache.set_many({'pagina': ([fila], 7, 'etag')})
+    assert cache.get('fila') == fila
+    assert type(cache.get('fila')['html']) is Markup and type(cache.get('fila')['ids']) is tuple
+    assert cache.get_many(['pagina', 'falta']) == {'pagina': ([fila], 7, 'etag')}
+
+
+def test_redis_valor_en_otro_formato_es_un_miss():
+    cache = redis_falso()
+    cache._redis.datos['p:viejo'] = b'{"id": 1}'
+    assert cache.get('viejo', 'default') == 'default'
+    assert cache.get_many(['viejo']) == {}
+    assert cache.get_or_set('viejo', lambda: 'nuevo') == 'nuevo'
@@ -0,0 +1,115 @@
+import json
+import os
+import time
+
+import pymysql
+import pytest
+
+import contacto
+from conftest import PoolFalso
+from contacto import ContactoBuffer
+
+
+class BaseQueFalla:
+    """Responde a los INSERT de contacto; con `error` los rechaza como lo haría MySQL."""
+
+    def __init__(self):
+        self.error = None
+
+    def __call__(self, sql, params):
+        if self.error is not None:
+            raise self.error
+        return []
+
+
+def esperar(condicion, timeout=2):
+    limite = time.monotonic() + timeout
+    while not condicion():
+        if time.monotonic() > limite:
+            raise AssertionError("no se cumplió a tiempo")
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def base():
+    return BaseQueFalla()
+
+
+@pytest.fixture
+def pool(base):
+    return PoolFalso(base)
+
+
+@pytest.fixture
+def buffer(pool, tmp_path):
+    guardados = []
+    buffer = ContactoBuffer(pool, str(tmp_path), lote=3, intervalo=0.05, al_guardar=guardados.append)
+    buffer.guardados = guardados
+    yield buffer
+    buffer.cerrar()
+
+
+def mensaje(n):
+    return (f'Nombre {n}', f'n{n}@example.com', 'Asunto', f'Mensaje {n}')
+
+
+def test_inserta_por_lotes_y_borra_los_archivos(buffer, pool, tmp_path):
+    for n in range(5):
+        buffer.agregar(*mensaje(n))
+    esperar(lambda: len(pool.confirmadas) == 5)
+    assert pool.confirmadas == [mensaje(n) for n in range(5)]
+    esperar(lambda: os.listdir(tmp_path) == [])
+    assert sum(buffer.guardados) == 5
+
+
+def test_el_archivo_abierto_se_aparta_con_rename(buffer, pool, base, tmp_path):
+    base.error = OSError("base caída")
+    buffer.agregar(*mensaje(1))
+    esperar(lambda: buffer.stats()['errores'] >= 1)
+    # El lote apartado queda en disco con el pid y una secuencia, listo para reintentar
+    archivos = os.listdir(tmp_path)
+    assert len(archivos) == 1 and archivos[0].startswith(f'contacto-{os.getpid()}-')
+    assert archivos[0].endswith('.enviando')
+
+    base.error = None
+    esperar(lambda: pool.confirmadas == [mensaje(1)])
+    esperar(lambda: os.listdir(tmp_path) == [])
+
+
+def test_recupera_los_archivos_de_procesos_muertos(pool, tmp_path, monkeypatch):
+    muerto = 999999
+    monkeypatch.setattr(contacto, '_proceso_vivo', lambda pid: pid != muerto)
+    with open(tmp_path / f'contacto-{muerto}.jsonl', 'w', encoding='utf-8') as f:
+        f.write(json.dumps(list(mensaje(1))) + '\n')
+        f.write('["a medio escri')
+    with open(tmp_path / f'contacto-{muerto}-4.enviando', 'w', encoding='utf-8') as f:
+        f.write(json.dumps(list(mensaje(2))) + '\n')
+    # De un proceso vivo: no se toca
+    vivo = tmp_path / 'contacto-1.jsonl'
+    vivo.write_text(json.dumps(list(mensaje(3))) + '\n', encoding='utf-8')
+
+    buffer = ContactoBuffer(pool, str(tmp_path), lote=10, intervalo=0.05)
+    try:
+        buffer.iniciar()
+        esperar(lambda: len(pool.confirmadas) == 2)
+        assert sorted(pool.confirmadas) == [mensaje(1), mensaje(2)]
+        assert buffer.stats()['recuperados'] == 2
+        esperar(lambda: os.listdir(tmp_path) == ['contacto-1.jsonl'])
+    finally:
+        buffer.cerrar()
+
+
+def test_lote_rechazado_por_la_base_queda_aparte(buffer, pool, base, tmp_path):
+    base.error = pymysql.err.DataError(1406, "Data too long")
+    buffer.agregar(*mensaje(1))
+    esperar(lambda: buffer.stats()['rechazados'] == 1)
+    archivos = os.listdir(tmp_path)
+    assert len(archivos) == 1 and archivos[0].endswith('.enviando.rechazado')
+    assert pool.confirmadas == [] and pool.descartadas == 1
+
+
+def test_cerrar_inserta_lo_pendiente(pool, tmp_path):
+    buffer = ContactoBuffer(pool, str(tmp_path), lote=100, intervalo=60)
+    buffer.agregar(*mensaje(1))
+    buffer.cerrar()
+    assert pool.confirmadas == [mensaje(1)]
@@ -0,0 +1,185 @@
+import types
+
+import pytest
+
+import db_pool
+from db_pool import ConnectionPool, PoolAgotado, ReplicaSet
+
+from conftest import Conector
+
+
+def test_reutiliza_la_conexion_devuelta():
+    conector = Conector()
+    pool = ConnectionPool(conector, max_size=2)
+    conn = pool.acquire()
+    pool.release(conn)
+    assert pool.acquire() is conn
+    assert len(conector.creadas) == 1
+    assert pool.stats()['reutilizadas'] == 1
+
+
+def test_release_hace_rollback():
+    pool = ConnectionPool(Conector(), max_size=1)
+    conn = pool.acquire()
+    pool.release(conn)
+    assert conn.rollbacks == 1
+    assert not conn.cerrada
+
+
+def test_release_con_discard_cierra_sin_rollback():
+    conector = Conector()
+    pool = ConnectionPool(conector, max_size=1)
+    conn = pool.acquire()
+    pool.release(conn, discard=True)
+    assert conn.cerrada and conn.rollbacks == 0
+    assert pool.acquire() is not conn
+
+
+def test_ping_fallido_descarta_y_crea_otra():
+    conector = Conector()
+    pool = ConnectionPool(conector, max_size=1)
+    conn = pool.acquire()
+    pool.release(conn)
+    conn.falla_ping = True
+    nueva = pool.acquire()
+    assert nueva is not conn and conn.cerrada
+    assert pool.stats()['ping_fallidos'] == 1
+
+
+def test_agotado_tras_el_timeout():
+    pool = ConnectionPool(Conector(), max_size=1, timeout=0.05)
+    pool.acquire()
+    with pytest.raises(PoolAgotado):
+        pool.acquire()
+    assert pool.stats()['timeouts'] == 1
+
+
+def test_despues_de_un_fork_no_reutiliza_las_heredadas(monkeypatch):
+    conector = Conector()
+    pool = ConnectionPool(conector, max_size=2)
+    heredada = pool.acquire()
+    pool.release(heredada)
+
+    monkeypatch.setattr(db_pool.os, 'getpid', lambda: -1)
+    nueva = pool.acquire()
+    assert nueva is not heredada
+    assert len(conector.creadas) == 2
+    # La del proceso padre se cierra si alguien la devuelve en el hijo
+    pool.release(heredada)
+    assert heredada.cerrada
+
+
+# --- RÉPLICAS ---
+class Reloj:
+    def __init__(self):
+        self.ahora = 1000.0
+
+    def __call__(self):
+        return self.ahora
+
+
+@pytest.fixture
+def reloj(monkeypatch):
+    reloj = Reloj()
+    monkeypatch.setattr(db_pool, 'time', types.SimpleNamespace(monotonic=reloj))
+    return reloj
+
+
+def replicas(*conectores, **kwargs):
+    return ReplicaSet([(f"r{i}", conector) for i, conector in enumerate(conectores, 1)], **kwargs)
+
+
+def de_quien(lectura, *conectores):
+    _, conn = lectura
+    return next(i for i, conector in enumerate(conectores, 1) if conn in conector.creadas)
+
+
+def atrasada(segundos, columna='Seconds_Behind_Source'):
+    def responder(sql, params):
+        return [{columna: segundos}] if 'STATUS' in sql else []
+    return responder
+
+
+class Caida:
+    """Factory de una réplica que no conecta hasta que se levanta."""
+
+    def __init__(self):
+        self.conector = Conector()
+        self.arriba = False
+
+    def __call__(self):
+        if not self.arriba:
+            raise OSError("Can't connect to MySQL server")
+        return self.conector()
+
+
+def test_reparte_en_round_robin():
+    a, b = Conector(), Conector()
+    conjunto = replicas(a, b)
+    lecturas = [conjunto.acquire() for _ in range(4)]
+    assert [de_quien(lectura, a, b) for lectura in lecturas] == [1, 2, 1, 2]
+    assert conjunto.stats()['lecturas'] == 4
+
+
+def test_replica_caida_queda_fuera_hasta_el_reintento(reloj):
+    caida, sana = Caida(), Conector()
+    conjunto = replicas(caida, sana, reintento=30)
+    assert [de_quien(conjunto.acquire(), caida.conector, sana) for _ in range(3)] == [2, 2, 2]
+    # Se probó una sola vez: mientras no vence el reintento ni se intenta conectar
+    assert conjunto.stats()['replicas'][0]['fallos'] == 1
+
+    caida.arriba = True
+    reloj.ahora += 31
+    lecturas = [de_quien(conjunto.acquire(), caida.conector, sana) for _ in range(2)]
+    assert sorted(lecturas) == [1, 2]
+    assert conjunto.stats()['replicas'][0]['sana']
+
+
+def test_sin_replicas_sanas_devuelve_none(reloj):
+    conjunto = replicas(Caida(), Caida())
+    assert conjunto.acquire() is None
+    assert conjunto.stats()['sin_replicas'] == 1
+
+
+def test_replica_atrasada_queda_fuera():
+    atrasada_30, al_dia = Conector(atrasada(30)), Conector(atrasada(0))
+    conjunto = replicas(atrasada_30, al_dia, max_retraso=10)
+    assert [de_quien(conjunto.acquire(), atrasada_30, al_dia) for _ in range(2)] == [2, 2]
+    estado = conjunto.stats()['replicas'][0]
+    assert not estado['sana'] and estado['retraso_s'] == 30
+    # La conexión que se usó para medir vuelve al pool de la réplica
+    assert not atrasada_30.creadas[0].cerrada
+
+
+@pytest.mark.parametrize('fila', [None, {'Seconds_Behind_Source': None}])
+def test_sin_replicacion_cuenta_como_atrasada(fila):
+    conjunto = replicas(Conector(lambda sql, params: [fila] if fila else []), max_retraso=10)
+    assert conjunto.acquire() is None
+    assert conjunto.stats()['replicas'][0]['retraso_s'] == float('inf')
+
+
+def test_retraso_con_show_slave_status():
+    def mysql_viejo(sql, params):
+        if sql == "SHOW REPLICA STATUS":
+            raise Exception("You have an error in your SQL syntax")
+        return atrasada(2, 'Seconds_Behind_Master')(sql, params)
+
+    conjunto = replicas(Conector(mysql_viejo), max_retraso=10)
+    assert conjunto.acquire() is not None
+    assert conjunto.stats()['replicas'][0]['retraso_s'] == 2
+
+
+def test_el_retraso_se_mide_cada_intervalo(reloj):
+    conector = Conector(atrasada(0))
+    conjunto = replicas(conector, intervalo_chequeo=5, max_retraso=10)
+
+    def chequeos():
+        return sum('STATUS' in sql for conn in conector.creadas for sql in conn.sentencias())
+
+    for _ in range(3):
+        pool, conn = conjunto.acquire()
+        pool.release(conn)
+    assert chequeos() == 1
+    reloj.ahora += 6
+    conjunto.acquire()
+    assert chequeos() == 2
@@ -0,0 +1,58 @@
+from fragmentos import FragmentCache, version_de
+
+FILA = {'id': 7, 'nombre': 'Ana', 'rating': 4.5, 'reseñas_total': 3, 'servicios': ['Paseos']}
+
+
+class Renderizador:
+    def __init__(self):
+        self.llamadas = 0
+
+    def __call__(self, fila):
+        self.llamadas += 1
+        return f"<div>{fila['nombre']} {fila['rating']}</div>"
+
+
+def test_version_depende_solo_de_los_valores():
+    assert version_de(FILA) == version_de(dict(reversed(list(FILA.items()))))
+    assert version_de(FILA) != version_de(dict(FILA, rating=4.6))
+
+
+def test_reutiliza_mientras_la_fila_no_cambia():
+    cache, renderizar = FragmentCache(), Renderizador()
+    assert cache.obtener('tarjeta', FILA, renderizar) == cache.obtener('tarjeta', dict(FILA), renderizar)
+    assert renderizar.llamadas == 1
+    assert cache.stats()['reutilizados'] == 1
+
+
+def test_fila_cambiada_se_vuelve_a_renderizar():
+    cache, renderizar = FragmentCache(), Renderizador()
+    cache.obtener('tarjeta', FILA, renderizar)
+    assert cache.obtener('tarjeta', dict(FILA, rating=5.0), renderizar) == "<div>Ana 5.0</div>"
+    assert renderizar.llamadas == 2
+    # El fragmento nuevo reemplazó al anterior
+    cache.obtener('tarjeta', dict(FILA, rating=5.0), renderizar)
+    assert renderizar.llamadas == 2
+
+
+def test_tipos_distintos_no_se_pisan():
+    cache, renderizar = FragmentCache(), Renderizador()
+    cache.obtener('tarjeta', FILA, renderizar)
+    cache.obtener('fila_cuidador', FILA, renderizar)
+    assert renderizar.llamadas == 2
+
+
+def test_tope_de_fragmentos():
+    cache, renderizar = FragmentCache(max_items=2), Renderizador()
+    for id in range(3):
+        cache.obtener('tarjeta', dict(FILA, id=id), renderizar)
+    assert cache.stats()['items'] == 2 and cache.stats()['evictions'] == 1
+
+
+def test_fila_cuidador_separa_rating_y_reseñas():
+    from app import app
+
+    with app.test_request_context():
+        fila_cuidador = app.jinja_env.get_template('_fragmentos.html').module.fila_cuidador
+        html = str(fila_cuidador(dict(FILA, email='ana@example.com', foto=None, lat=None, lng=None)))
+    assert 'data-rating="4.5"' in html
+    assert 'data-reseñas-total="3"' in html
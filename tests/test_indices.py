@@ -0,0 +1,244 @@
+import threading
+
+import pytest
+
+from indices import FacetIndex, GeoIndex, IndiceRefrescable, TextIndex, haversine_km, normalizar_texto, tokenizar
+
+
+def geo_con(puntos, **kwargs):
+    indice = GeoIndex(lambda: [{'id': id, 'lat': lat, 'lng': lng} for id, (lat, lng) in puntos.items()], **kwargs)
+    indice.asegurar()
+    return indice
+
+
+# --- BASE ---
+def test_un_indice_sin_reconstruir_no_se_puede_crear():
+    class SinReconstruir(IndiceRefrescable):
+        pass
+
+    with pytest.raises(TypeError):
+        SinReconstruir(lambda: [])
+
+
+def test_reconstruye_recien_despues_de_invalidar():
+    cargas = []
+
+    class Contador(IndiceRefrescable):
+        def reconstruir(self, filas):
+            cargas.append(filas)
+
+    indice = Contador(lambda: [len(cargas)], ttl=0)
+    indice.asegurar()
+    indice.asegurar()
+    assert cargas == [[0]]
+    indice.invalidar()
+    indice.asegurar()
+    assert cargas == [[0], [1]]
+
+
+# --- GEO: CERCANOS ---
+PUNTOS = {
+    1: (-34.700, -58.390),   # Lanús
+    2: (-34.705, -58.395),
+    3: (-34.660, -58.360),   # Avellaneda
+    4: (-34.580, -58.420),   # Palermo
+    5: (-31.420, -64.180),   # Córdoba
+}
+
+
+def test_cercanos_ordenados_por_distancia_y_dentro_del_radio():
+    indice = geo_con(PUNTOS)
+    resultado = indice.cercanos(-34.700, -58.390, 10, 10)
+    assert [id for id, _ in resultado] == [1, 2, 3]
+    distancias = [d for _, d in resultado]
+    assert distancias == sorted(distancias) and distancias[-1] <= 10
+
+
+def test_cercanos_respeta_el_limite():
+    indice = geo_con(PUNTOS)
+    assert [id for id, _ in indice.cercanos(-34.700, -58.390, 50, 2)] == [1, 2]
+
+
+def test_cercanos_coincide_con_fuerza_bruta():
+    import random
+    rnd = random.Random(7)
+    puntos = {i: (rnd.uniform(-35, -34), rnd.uniform(-59, -58)) for i in range(1, 500)}
+    indice = geo_con(puntos, celda=0.05)
+    esperado = sorted((haversine_km(-34.5, -58.5, lat, lng), id) for id, (lat, lng) in puntos.items())
+    esperado = [id for d, id in esperado if d <= 20][:15]
+    assert [id for id, _ in indice.cercanos(-34.5, -58.5, 20, 15)] == esperado
+
+
+def test_upsert_y_remove_se_ven_en_cercanos():
+    indice = geo_con(PUNTOS)
+    indice.upsert(6, -34.7001, -58.3901)
+    assert 6 in [id for id, _ in indice.cercanos(-34.700, -58.390, 1, 5)]
+    indice.remove(1)
+    indice.remove(6)
+    assert [id for id, _ in indice.cercanos(-34.700, -58.390, 1, 5)] == [2]
+
+
+# --- TEXTO ---
+CUIDADORES = [
+    {'id': 1, 'nombre': 'Ana Gómez', 'descripcion': 'Paseos largos por el parque', 'ubicacion': 'Lanús',
+     'servicios': 'Paseos|Baño'},
+    {'id': 2, 'nombre': 'Carlos Pérez', 'descripcion': 'Cuido gatos y perros', 'ubicacion': 'Avellaneda',
+     'servicios': ['Alojamiento']},
+    {'id': 3, 'nombre': 'Lanusa Díaz', 'descripcion': 'Un paseo tranquilo', 'ubicacion': 'Palermo',
+     'servicios': 'Paseos'},
+]
+
+
+def texto_con(filas=CUIDADORES):
+    indice = TextIndex(lambda: filas)
+    indice.asegurar()
+    return indice
+
+
+def test_tokenizar_sin_tildes_stopwords_ni_plurales():
+    assert tokenizar('Los Paseos por Lanús') == ['paseo', 'lanu']
+    assert normalizar_texto('Peluquería ÑANDÚ') == 'peluqueria nandu'
+
+
+def test_busqueda_ignora_tildes():
+    indice = texto_con()
+    assert indice.buscar('lanus ', 10) == indice.buscar('Lanús ', 10) == [1]
+    assert indice.buscar('gomez', 10) == [1]
+
+
+def test_plural_y_singular_son_el_mismo_termino():
+    indice = texto_con()
+    assert set(indice.buscar('gato ', 10)) == {2}
+    assert set(indice.buscar('paseo ', 10)) == set(indice.buscar('paseos ', 10)) == {1, 3}
+
+
+def test_ultimo_termino_es_prefijo():
+    indice = texto_con()
+    # 'lanusa' está en el nombre y pesa más que 'lanus' en la ubicación
+    assert indice.buscar('lan', 10) == [3, 1]
+    # Con un espacio al final la palabra está completa: no se expande
+    assert indice.buscar('lan ', 10) == []
+
+
+def test_exige_todos_los_terminos_y_filtra_por_servicios():
+    indice = texto_con()
+    assert indice.buscar('paseo parque', 10) == [1]
+    assert indice.buscar('paseo', 10, servicios=['Baño']) == [1]
+    assert indice.buscar('paseo', 10, servicios=['Alojamiento']) == []
+
+
+def test_el_nombre_pesa_mas_que_la_descripcion():
+    indice = texto_con([
+        {'id': 1, 'nombre': 'Pedro', 'descripcion': 'Trabajo con Sofía'},
+        {'id': 2, 'nombre': 'Sofía', 'descripcion': 'Cuidadora'},
+    ])
+    assert indice.buscar('sofia ', 10) == [2, 1]
+
+
+def test_upsert_y_remove_de_texto():
+    indice = texto_con()
+    indice.upsert(4, nombre='Bruno', descripcion='Adiestramiento', ubicacion='Quilmes', servicios=[])
+    assert indice.buscar('quilmes ', 10) == [4]
+    indice.remove(1)
+    assert indice.buscar('lanus ', 10) == []
+
+
+# --- FACETAS ---
+def facetas_con(filas):
+    indice = FacetIndex(lambda: filas)
+    indice.asegurar()
+    return indice
+
+
+def test_ids_ascendentes_con_cursor_y_limite():
+    ids = [1, 7, 8, 9, 63, 64, 65, 1000, 4096]
+    indice = facetas_con([{'id': id, 'servicios': 'Paseos'} for id in ids])
+    assert indice.ids(['Paseos']) == ids
+    assert indice.ids(['Paseos'], after=8, limite=3) == [9, 63, 64]
+    assert indice.ids(['Paseos'], after=4096) == []
+    assert indice.ids(['Paseos'], after=-10, limite=1) == [1]
+
+
+def test_ids_coincide_con_fuerza_bruta():
+    import random
+    rnd = random.Random(3)
+    filas = [{'id': id, 'servicios': rnd.sample(['a', 'b', 'c'], rnd.randint(0, 3))}
+             for id in rnd.sample(range(20000), 3000)]
+    indice = facetas_con(filas)
+    esperado = sorted(f['id'] for f in filas if {'a', 'b'} <= set(f['servicios']))
+    assert indice.ids(['a', 'b']) == esperado
+    assert indice.ids(['a', 'b'], after=esperado[10], limite=5) == esperado[11:16]
+
+
+def test_conteos_por_servicio():
+    indice = facetas_con([
+        {'id': 1, 'servicios': 'Paseos|Baño'},
+        {'id': 2, 'servicios': 'Paseos'},
+        {'id': 3, 'servicios': ''},
+    ])
+    assert indice.facetas(['Paseos', 'Baño', 'Otro']) == (3, {'Paseos': 2, 'Baño': 1, 'Otro': 0})
+    assert indice.facetas(['Paseos', 'Baño'], ['Paseos']) == (2, {'Paseos': 2, 'Baño': 1})
+    assert indice.facetas(['Baño'], base=FacetIndex.bitset([2, 3])) == (2, {'Baño': 0})
+
+
+def test_upsert_y_remove_de_facetas():
+    indice = facetas_con([{'id': 1, 'servicios': 'Paseos'}])
+    indice.upsert(2, ['Paseos', 'Baño'])
+    indice.upsert(1, ['Baño'])
+    assert indice.ids(['Paseos']) == [2]
+    assert indice.ids(['Baño']) == [1, 2]
+    indice.remove(2)
+    assert indice.ids(['Paseos']) == [] and indice.ids() == [1]
+
+
+# --- GEO: CLUSTERS ---
+def test_clusters_suman_todos_los_puntos_visibles():
+    indice = geo_con(PUNTOS)
+    # A zoom bajo una celda que toca el rectángulo entra entera (con Córdoba): se mira desde 8
+    for zoom in (8, 12, 18):
+        grupos = indice.clusters(zoom, -35, -59, -34, -58)
+        assert sum(cantidad for _, _, cantidad, _ in grupos) == 4
+    # A zoom bajo Lanús, Avellaneda y Palermo quedan en un mismo grupo
+    assert len(indice.clusters(4, -35, -59, -34, -58)) == 1
+
+
+def test_clusters_centroide_y_representantes():
+    indice = geo_con({1: (-34.70, -58.39), 2: (-34.72, -58.41)})
+    [(lat, lng, cantidad, ids)] = indice.clusters(6, -35, -59, -34, -58)
+    assert cantidad == 2 and sorted(ids) == [1, 2]
+    assert lat == pytest.approx(-34.71) and lng == pytest.approx(-58.40)
+
+
+def test_clusters_con_filtro_calcula_permitidos_fuera_del_lock():
+    indice = geo_con(PUNTOS)
+    llamadas = []
+
+    def permitidos():
+        # Si corriera con el lock tomado, otro hilo no podría tomarlo
+        libre = []
+
+        def probar():
+            if indice._lock.acquire(timeout=1):
+                indice._lock.release()
+                libre.append(True)
+
+        hilo = threading.Thread(target=probar)
+        hilo.start()
+        hilo.join()
+        llamadas.append(bool(libre))
+        return {1, 3}
+
+    grupos = indice.clusters(18, -35, -59, -34, -58, filtro=('Paseos',), permitidos=permitidos)
+    assert sorted(ids[0] for _, _, _, ids in grupos) == [1, 3]
+    # El nivel filtrado queda en cache: no vuelve a pedir los permitidos
+    indice.clusters(18, -35, -59, -34, -58, filtro=('Paseos',), permitidos=permitidos)
+    assert llamadas == [True]
+
+
+def test_clusters_se_actualizan_con_las_escrituras():
+    indice = geo_con(PUNTOS)
+    antes = sum(cantidad for _, _, cantidad, _ in indice.clusters(10, -35, -59, -34, -58))
+    indice.upsert(6, -34.6, -58.4)
+    indice.remove(1)
+    indice.remove(5)
+    assert sum(cantidad for _, _, cantidad, _ in indice.clusters(10, -35, -59, -34, -58)) == antes
@@ -0,0 +1,88 @@
+import time
+
+import pytest
+from flask import session
+
+import app as aplicacion
+from db_pool import ReplicaSet
+
+from conftest import Conector, PoolFalso
+
+
+@pytest.fixture
+def primario(monkeypatch):
+    pool = PoolFalso()
+    monkeypatch.setattr(aplicacion, 'db_pool', pool)
+    return pool.conector
+
+
+@pytest.fixture
+def replica(monkeypatch):
+    conector = Conector()
+    monkeypatch.setattr(aplicacion, 'db_replicas', ReplicaSet([('r1', conector)]))
+    aplicacion.cache.delete('db:escritura')
+    yield conector
+    aplicacion.cache.delete('db:escritura')
+
+
+def lee_de(conector, metodo='GET', **sesion):
+    """True si get_read_db(), en un request con `metodo` y `sesion`, devuelve una conexión de `conector`."""
+    with aplicacion.app.test_request_context('/', method=metodo):
+        session.update(sesion)
+        return aplicacion.get_read_db() in conector.creadas
+
+
+def test_sin_replicas_lee_del_primario(primario, monkeypatch):
+    monkeypatch.setattr(aplicacion, 'db_replicas', ReplicaSet([]))
+    assert lee_de(primario)
+
+
+def test_get_lee_de_la_replica(primario, replica):
+    assert lee_de(replica)
+    assert not primario.creadas
+
+
+def test_post_lee_del_primario(primario, replica):
+    assert lee_de(primario, 'POST')
+    assert not replica.creadas
+
+
+def test_despues_de_escribir_el_usuario_lee_del_primario(primario, replica):
+    assert lee_de(primario, primario_hasta=time.time() + 5)
+    assert lee_de(replica, primario_hasta=time.time() - 1)
+
+
+def test_en_el_mismo_request_que_uso_el_primario_no_cambia_de_conexion(primario, replica):
+    with aplicacion.app.test_request_context('/'):
+        db = aplicacion.get_db()
+        assert aplicacion.get_read_db() is db
+    assert not replica.creadas
+
+
+def test_sin_replica_disponible_lee_del_primario(primario, monkeypatch):
+    def caida():
+        raise OSError("Can't connect to MySQL server")
+
+    monkeypatch.setattr(aplicacion, 'db_replicas', ReplicaSet([('r1', caida)]))
+    assert lee_de(primario)
+
+
+@pytest.mark.parametrize('compartida', [True, False])
+def test_marca_global_solo_con_cache_compartido(primario, replica, monkeypatch, compartida):
+    monkeypatch.setattr(aplicacion, 'MARCA_ESCRITURA_COMPARTIDA', compartida)
+    with aplicacion.app.test_request_context('/', method='POST'):
+        aplicacion.get_db()
+        aplicacion.marcar_escritura(aplicacion.app.response_class())
+        assert session['primario_hasta'] > time.time()
+    assert (aplicacion.cache.get('db:escritura') is not None) == compartida
+    # Otro usuario, sin la marca en su sesión, lee del primario solo si la marca es global
+    assert lee_de(primario if compartida else replica)
+
+
+def test_un_get_no_marca_escritura(primario, replica, monkeypatch):
+    monkeypatch.setattr(aplicacion, 'MARCA_ESCRITURA_COMPARTIDA', True)
+    with aplicacion.app.test_request_context('/'):
+        aplicacion.get_db()
+        aplicacion.marcar_escritura(aplicacion.app.response_class())
+        assert 'primario_hasta' not in session
+    assert aplicacion.cache.get('db:escritura') is None
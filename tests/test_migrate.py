@@ -0,0 +1,75 @@
+import pymysql
+import pytest
+
+from conftest import ConexionFalsa
+from migrate import MIGRACIONES_DIR, aplicar_migraciones, listar_migraciones, sentencias
+
+
+class TablaMigraciones:
+    """Responde como schema_migrations; `errores` simula fallas de MySQL por sentencia."""
+
+    def __init__(self, aplicadas=(), errores=None):
+        self.aplicadas = set(aplicadas)
+        self.errores = errores or {}
+
+    def __call__(self, sql, params):
+        error = self.errores.get(sql.strip())
+        if error is not None:
+            raise pymysql.err.OperationalError(error, "falla simulada")
+        if sql.startswith("INSERT INTO schema_migrations"):
+            self.aplicadas.add(params[0])
+        if sql.startswith("SELECT version"):
+            return [{'version': version} for version in self.aplicadas]
+        return []
+
+
+def carpeta_con(tmp_path, archivos):
+    for nombre, sql in archivos.items():
+        (tmp_path / nombre).write_text(sql, encoding='utf-8')
+    return str(tmp_path)
+
+
+def test_ordena_por_version_numerica(tmp_path):
+    carpeta = carpeta_con(tmp_path, {'10_d.sql': '', '2_b.sql': '', '0001_a.sql': '', 'notas.txt': ''})
+    assert [(v, n) for v, n, _ in listar_migraciones(carpeta)] == [(1, '0001_a.sql'), (2, '2_b.sql'), (10, '10_d.sql')]
+
+
+def test_las_migraciones_del_repo_tienen_versiones_unicas():
+    versiones = [v for v, _, _ in listar_migraciones(MIGRACIONES_DIR)]
+    assert versiones and len(versiones) == len(set(versiones))
+
+
+def test_sentencias_sin_comentarios_ni_vacias():
+    sql = "-- comentario\nCREATE TABLE a (id INT);\n\n  -- otro\nALTER TABLE a ADD b INT;\n;"
+    assert sentencias(sql) == ["CREATE TABLE a (id INT)", "ALTER TABLE a ADD b INT"]
+
+
+def test_aplica_solo_las_pendientes_en_orden(tmp_path):
+    carpeta = carpeta_con(tmp_path, {'1_a.sql': 'CREATE TABLE a (id INT);', '2_b.sql': 'CREATE TABLE b (id INT);',
+                                     '3_c.sql': 'CREATE TABLE c (id INT);'})
+    tabla = TablaMigraciones(aplicadas={1})
+    conn = ConexionFalsa(tabla)
+    assert aplicar_migraciones(conn, carpeta, log=lambda *_: None) == ['2_b.sql', '3_c.sql']
+    assert tabla.aplicadas == {1, 2, 3}
+    assert aplicar_migraciones(conn, carpeta, log=lambda *_: None) == []
+
+
+@pytest.mark.parametrize('codigo', [1050, 1060, 1061, 1826])
+def test_cambios_ya_hechos_no_frenan_la_migracion(tmp_path, codigo):
+    carpeta = carpeta_con(tmp_path, {'1_fk.sql': 'ALTER TABLE a ADD CONSTRAINT fk FOREIGN KEY (b) REFERENCES b (id);'
+                                                 '\nCREATE TABLE c (id INT);'})
+    tabla = TablaMigraciones(errores={'ALTER TABLE a ADD CONSTRAINT fk FOREIGN KEY (b) REFERENCES b (id)': codigo})
+    conn = ConexionFalsa(tabla)
+    assert aplicar_migraciones(conn, carpeta, log=lambda *_: None) == ['1_fk.sql']
+    assert 'CREATE TABLE c (id INT)' in conn.sentencias()
+    assert tabla.aplicadas == {1}
+
+
+@pytest.mark.parametrize('codigo', [1064, 1022])
+def test_otro_error_hace_rollback_y_no_registra(tmp_path, codigo):
+    carpeta = carpeta_con(tmp_path, {'1_a.sql': 'CREATE TABLE a (id INT);'})
+    tabla = TablaMigraciones(errores={'CREATE TABLE a (id INT)': codigo})
+    conn = ConexionFalsa(tabla)
+    with pytest.raises(pymysql.err.OperationalError):
+        aplicar_migraciones(conn, carpeta, log=lambda *_: None)
+    assert conn.rollbacks == 1 and tabla.aplicadas == set()
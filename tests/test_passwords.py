@@ -0,0 +1,91 @@
+import threading
+
+import pytest
+
+from passwords import Hasher
+
+METODO = 'pbkdf2:sha256:1000'
+
+
+@pytest.fixture
+def hasher():
+    return Hasher(method=METODO, salt_length=16, workers=0)
+
+
+def test_hashear_y_verificar(hasher):
+    password_hash = hasher.hashear('secreto')
+    assert hasher.verificar(password_hash, 'secreto')
+    assert not hasher.verificar(password_hash, 'otro')
+
+
+def test_cada_hash_tiene_su_salt(hasher):
+    hashes = [hasher.hashear('default_password') for _ in range(5)] + hasher.hashear_lote(['default_password'] * 5)
+    salts = [h.split('$')[1] for h in hashes]
+    assert len(set(salts)) == len(salts)
+
+
+def test_necesita_rehash_con_otros_parametros(hasher):
+    assert not hasher.necesita_rehash(hasher.hashear('x'))
+    assert hasher.necesita_rehash(Hasher(method='pbkdf2:sha256:2000', workers=0).hashear('x'))
+    assert hasher.necesita_rehash(Hasher(method=METODO, salt_length=8, workers=0).hashear('x'))
+    assert hasher.necesita_rehash('hash-sin-formato')
+
+
+def test_contadores_con_varios_hilos(hasher):
+    def registrar():
+        for _ in range(1000):
+            hasher.registrar_rehash()
+
+    hilos = [threading.Thread(target=registrar) for _ in range(8)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    assert hasher.stats()['rehashes'] == 8000
+
+
+def test_pool_de_procesos():
+    hasher = Hasher(method=METODO, workers=1)
+    try:
+        hashes = hasher.hashear_lote(['a', 'b', 'c'])
+        assert [hasher.verificar(h, p) for h, p in zip(hashes, 'abc')] == [True, True, True]
+        assert hasher.stats()['hashes'] == 3 and hasher.stats()['verificaciones'] == 3
+    finally:
+        hasher.shutdown()
+
+
+def test_el_cupo_se_devuelve_cuando_termina_la_tarea(monkeypatch):
+    # Un pool de hilos alcanza para ver el manejo de cupos sin arrancar procesos
+    from concurrent.futures import ThreadPoolExecutor
+
+    hasher = Hasher(method=METODO, workers=1, max_pendientes=1, timeout=0.1)
+    executor = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(hasher, '_get_executor', lambda: executor)
+    liberar = threading.Event()
+    try:
+        with pytest.raises(TimeoutError):
+            hasher._ejecutar(liberar.wait)
+        # La tarea vencida sigue corriendo y sigue ocupando el único cupo
+        with pytest.raises(TimeoutError, match='en espera'):
+            hasher._ejecutar(lambda: 'no llega')
+        liberar.set()
+        assert hasher._ejecutar(lambda: 'ok') == 'ok'
+    finally:
+        liberar.set()
+        executor.shutdown(wait=True)
+
+
+def test_login_con_el_pool_saturado_devuelve_503(monkeypatch):
+    import app as aplicacion
+    from conftest import ConexionFalsa
+
+    fila = {'id': 1, 'email': 'cliente@example.com', 'password': 'hash', 'tipo_usuario': 'cliente'}
+
+    def saturado(*args):
+        raise TimeoutError("Demasiadas operaciones de contraseña en espera.")
+
+    monkeypatch.setattr(aplicacion, 'get_db', lambda: ConexionFalsa(lambda sql, params: [fila]))
+    monkeypatch.setattr(aplicacion.hasher, 'verificar', saturado)
+    respuesta = aplicacion.app.test_client().post('/login', data={'email': fila['email'], 'password': 'x'})
+    assert respuesta.status_code == 503
+    assert 'Intentá de nuevo' in respuesta.get_data(as_text=True)